@@ -1,312 +1,59 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import json
+import os
+from knowledge_base import knowledge_base
+from portfolio_pipeline import DEFAULT_TIER, TIERS, portfolio_pipeline, record_population, select_portfolio_sections
+from quantile_sketch import population_stats
+from history_store import history_store
+from portfolio_index import portfolio_index
+from cooccurrence import skill_cooccurrence
+from demand_index import demand_index
+from assessment_engine import analyze_assessment_batch, analyze_assessment_responses, select_assessment_sections
+from jobs import job_queue
+from memory_budget import allocation_tracker, deep_sizeof, memory_budget
+from singleflight import FlightTimeout, SingleFlight, payload_key
+from warmup import WARMUP_HEADER, cache_fill, representative_requests, warmup
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
-# Simple portfolio analyzer (ChromaDB disabled due to file system issues)
-class SimplePortfolioAnalyzer:
-    def analyze_portfolio(self, projects, skills, achievements):
-        # Calculate portfolio strength - ACCURATE scoring
-        # Projects: 0-40 points (5 points per project, max 8 projects)
-        project_score = min(len(projects) * 5, 40)
-
-        # Skills: 0-30 points (2 points per skill, max 15 skills)
-        skill_score = min(len(skills) * 2, 30)
-
-        # Achievements: 0-30 points (only count non-empty lines)
-        achievement_lines = [line.strip() for line in achievements.split('\n') if line.strip()] if achievements else []
-        achievement_score = min(len(achievement_lines) * 6, 30)
-
-        total_score = project_score + skill_score + achievement_score
-
-        # Determine rating - more realistic thresholds
-        if total_score >= 85:
-            rating, color = "Excellent", "#10B981"
-        elif total_score >= 65:
-            rating, color = "Good", "#3B82F6"
-        elif total_score >= 40:
-            rating, color = "Fair", "#F59E0B"
-        else:
-            rating, color = "Needs Improvement", "#EF4444"
-
-        # Analyze projects
-        total_projects = len(projects)
-        complexity = "Advanced" if total_projects >= 5 else "Intermediate" if total_projects >= 3 else "Beginner"
-
-        # Calculate diversity
-        all_techs = set()
-        for project in projects:
-            all_techs.update(project.get('technologies', []))
-        diversity = (len(all_techs) / max(sum(len(p.get('technologies', [])) for p in projects), 1)) * 100
-
-        # Analyze skill gaps - convert to array format
-        skill_categories = {
-            "Frontend": ["React", "Vue", "Angular", "TypeScript", "JavaScript"],
-            "Backend": ["Node.js", "Python", "Java", "Go"],
-            "Database": ["MongoDB", "PostgreSQL", "MySQL", "Redis"],
-            "DevOps": ["Docker", "Kubernetes", "AWS", "CI/CD"],
-            "Mobile": ["React Native", "Flutter"],
-            "AI/ML": ["TensorFlow", "PyTorch"]
-        }
-
-        skill_gaps = []
-        for category, category_skills in skill_categories.items():
-            missing = [s for s in category_skills if s not in skills]
-            if missing:
-                priority = "High" if category in ["Frontend", "Backend"] else "Medium"
-                skill_gaps.append({
-                    "category": category,
-                    "missingSkills": missing[:3],
-                    "priority": priority
-                })
-
-        # Generate recommendations - ACCURATE and personalized
-        recommendations = []
-
-        # Project recommendations
-        if total_projects == 0:
-            recommendations.append({
-                "type": "Projects",
-                "priority": "High",
-                "title": "Create Your First Project",
-                "description": "Start building projects to demonstrate your skills. Even a simple project shows initiative and practical knowledge.",
-                "action": "Build a basic web app or tool using your current skills"
-            })
-        elif total_projects < 3:
-            recommendations.append({
-                "type": "Projects",
-                "priority": "High",
-                "title": f"Build More Projects (Currently: {total_projects})",
-                "description": "Aim for at least 3-5 quality projects. Each project should solve a real problem or demonstrate specific skills.",
-                "action": "Plan your next project focusing on a different technology or problem domain"
-            })
-        elif total_projects < 5:
-            recommendations.append({
-                "type": "Projects",
-                "priority": "Medium",
-                "title": "Add More Complex Projects",
-                "description": "You have a good foundation. Now focus on building more complex, full-stack applications.",
-                "action": "Consider building a project with authentication, database, and API integration"
-            })
-
-        # Skill recommendations
-        if len(skills) == 0:
-            recommendations.append({
-                "type": "Skills",
-                "priority": "High",
-                "title": "Add Your Technical Skills",
-                "description": "List all programming languages, frameworks, and tools you know. This helps match you with career opportunities.",
-                "action": "Add at least 5-10 skills you're comfortable with"
-            })
-        elif len(skills) < 8:
-            recommendations.append({
-                "type": "Skills",
-                "priority": "High",
-                "title": f"Expand Your Skill Set (Currently: {len(skills)})",
-                "description": "Aim for 10-15 diverse skills. Focus on both breadth (different areas) and depth (mastery).",
-                "action": "Learn complementary skills to what you already know"
-            })
-        elif len(skills) < 15:
-            recommendations.append({
-                "type": "Skills",
-                "priority": "Medium",
-                "title": "Learn Advanced Technologies",
-                "description": "You have a solid foundation. Consider learning advanced or specialized technologies.",
-                "action": "Explore cloud platforms, DevOps tools, or specialized frameworks"
-            })
-
-        # DevOps recommendation
-        if not any(skill in skills for skill in ["Docker", "Kubernetes", "AWS", "CI/CD", "Jenkins"]):
-            recommendations.append({
-                "type": "DevOps",
-                "priority": "Medium",
-                "title": "Learn DevOps Fundamentals",
-                "description": "DevOps skills are highly valued. Understanding deployment and containerization makes you more marketable.",
-                "action": "Start with Docker basics and learn about CI/CD pipelines"
-            })
-
-        # Achievement recommendation
-        if len(achievement_lines) == 0:
-            recommendations.append({
-                "type": "Achievements",
-                "priority": "Medium",
-                "title": "Add Achievements and Certifications",
-                "description": "Certifications, hackathon wins, or notable contributions make your portfolio stand out.",
-                "action": "List any certifications, awards, or significant accomplishments"
-            })
-
-        # Frontend framework recommendation
-        if not any(skill in skills for skill in ["React", "Vue", "Angular", "Svelte"]):
-            recommendations.append({
-                "type": "Frontend",
-                "priority": "High",
-                "title": "Learn a Modern Frontend Framework",
-                "description": "Modern frontend frameworks like React, Vue, or Angular are essential for web development roles.",
-                "action": "Start with React - it's the most in-demand framework"
-            })
-
-        # Career alignment - convert to array format
-        career_data = {
-            "Full Stack Developer": {
-                "required": ["React", "Node.js", "MongoDB"],
-                "matching": [],
-                "missing": []
-            },
-            "Frontend Developer": {
-                "required": ["React", "JavaScript", "CSS"],
-                "matching": [],
-                "missing": []
-            },
-            "Backend Developer": {
-                "required": ["Node.js", "Python", "MongoDB"],
-                "matching": [],
-                "missing": []
-            },
-            "Data Scientist": {
-                "required": ["Python", "TensorFlow", "Pandas"],
-                "matching": [],
-                "missing": []
-            },
-            "DevOps Engineer": {
-                "required": ["Docker", "Kubernetes", "AWS"],
-                "matching": [],
-                "missing": []
-            }
-        }
-
-        career_alignment = []
-        for career, data in career_data.items():
-            required = data["required"]
-            matching = [s for s in required if s in skills]
-            missing = [s for s in required if s not in skills]
-            alignment = round((len(matching) / len(required)) * 100, 1)
-
-            career_alignment.append({
-                "career": career,
-                "alignment": alignment,
-                "matchingSkills": matching,
-                "missingSkills": missing
-            })
-
-        # Competitive analysis - ACCURATE based on actual data
-        standout_features = []
-        areas_to_improve = []
-
-        # Only add standout features if they truly exist
-        if total_projects >= 5:
-            standout_features.append("Strong project portfolio")
-        elif total_projects >= 3:
-            standout_features.append("Good project portfolio")
-
-        if len(skills) >= 15:
-            standout_features.append("Diverse skill set")
-        elif len(skills) >= 10:
-            standout_features.append("Solid skill foundation")
-
-        if len(all_techs) >= 8:
-            standout_features.append("Modern tech stack")
-        elif len(all_techs) >= 5:
-            standout_features.append("Varied technology experience")
-
-        if len(achievement_lines) >= 3:
-            standout_features.append("Notable achievements")
-        elif len(achievement_lines) >= 1:
-            standout_features.append("Has achievements")
-
-        # Provide accurate improvement suggestions
-        if total_projects == 0:
-            areas_to_improve.append("Add projects to showcase your work")
-        elif total_projects < 3:
-            areas_to_improve.append("Build more projects (aim for 3-5)")
-        elif total_projects < 5:
-            areas_to_improve.append("Add more complex projects")
-
-        if len(skills) == 0:
-            areas_to_improve.append("Add your technical skills")
-        elif len(skills) < 8:
-            areas_to_improve.append("Expand skill set (aim for 10-15 skills)")
-        elif len(skills) < 15:
-            areas_to_improve.append("Learn advanced technologies")
-
-        if not any(skill in skills for skill in ["Docker", "Kubernetes", "AWS", "CI/CD"]):
-            areas_to_improve.append("Learn DevOps tools")
-
-        if not any(skill in skills for skill in ["React", "Vue", "Angular"]):
-            areas_to_improve.append("Learn modern frontend framework")
-
-        if len(achievement_lines) == 0:
-            areas_to_improve.append("Add achievements and certifications")
-
-        # Industry demand analysis
-        trending_skills = []
-        if "React" in skills or "Vue" in skills or "Angular" in skills:
-            trending_skills.append("Modern Frontend Frameworks")
-        if "Docker" in skills or "Kubernetes" in skills:
-            trending_skills.append("DevOps & Containerization")
-        if "Python" in skills:
-            trending_skills.append("AI/ML & Data Science")
-        if "AWS" in skills or "Azure" in skills:
-            trending_skills.append("Cloud Computing")
-
-        # Calculate impact score - more realistic formula
-        # Projects contribute more (up to 60 points), skills contribute less (up to 30 points)
-        # Achievements add bonus (up to 10 points)
-        impact_score = min(
-            (total_projects * 10) +  # 10 points per project (max 60 for 6 projects)
-            (len(skills) * 2) +       # 2 points per skill (max 30 for 15 skills)
-            (len(achievement_lines) * 2),  # 2 points per achievement (max 10 for 5 achievements)
-            100
-        )
-
-        # Get project highlights
-        highlights = []
-        for project in projects[:3]:  # Top 3 projects
-            highlights.append({
-                "name": project.get("name", ""),
-                "description": project.get("description", ""),
-                "technologies": project.get("technologies", [])
-            })
-
-        return {
-            "portfolioStrength": {
-                "score": total_score,
-                "rating": rating,
-                "color": color,
-                "breakdown": {"projects": project_score, "skills": skill_score, "achievements": achievement_score}
-            },
-            "projectAnalysis": {
-                "totalProjects": total_projects,
-                "complexity": complexity,
-                "diversity": round(diversity, 1),
-                "impactScore": impact_score,
-                "highlights": highlights,
-                "techStack": list(all_techs)
-            },
-            "recommendations": recommendations,
-            "skillGaps": skill_gaps,
-            "careerAlignment": career_alignment,
-            "industryDemand": {
-                "overallDemand": "High" if len(skills) >= 12 else "Medium" if len(skills) >= 6 else "Low",
-                "trendingSkills": trending_skills if trending_skills else ["No trending skills identified yet"],
-                "marketValue": "Above Average" if total_score >= 65 else "Average" if total_score >= 35 else "Below Average",
-                "growthPotential": min(100 - total_score, 100)  # How much room for growth
-            },
-            "competitiveAnalysis": {
-                "percentile": 100 - total_score if total_score < 50 else min(total_score, 99),  # More realistic percentile
-                "comparison": "Above Average" if total_score >= 65 else "Average" if total_score >= 35 else "Below Average",
-                "standoutFeatures": standout_features if standout_features else ["No standout features yet - keep building!"],
-                "areasToImprove": areas_to_improve if areas_to_improve else ["Keep up the great work!"]
-            }
-        }
-
-    def _calc_alignment(self, user_skills, required_skills):
-        matches = sum(1 for skill in required_skills if skill in user_skills)
-        return round((matches / len(required_skills)) * 100, 1)
-
-# Initialize analyzer
-portfolio_analyzer = SimplePortfolioAnalyzer()
+# Identical portfolios analyzed at the same moment share one computation
+portfolio_flights = SingleFlight()
+# Seconds a coalesced request waits for the shared result before giving up
+COALESCE_TIMEOUT = float(os.environ.get("SKILLNEX_COALESCE_TIMEOUT", 30))
+
+def _is_warmup_request():
+    """Warm-up replays are served normally but never recorded"""
+    return WARMUP_HEADER in request.headers
+
+def _parse_fields(value):
+    """A ``fields`` selector as a list of section names; None selects every section"""
+    if value is None or value == "" or value == []:
+        return None
+    if isinstance(value, str):
+        return [name.strip() for name in value.split(',') if name.strip()]
+    if isinstance(value, list) and all(isinstance(name, str) for name in value):
+        return value
+    raise ValueError("fields must be a list of section names or a comma-separated string")
+
+def _requested_fields(data, select):
+    """Sections selected in the body or the ``fields`` query parameter, checked by ``select``"""
+    fields = _parse_fields(data.get('fields', request.args.get('fields')))
+    if fields is not None:
+        select(fields)
+    return fields
+
+def _check_identity(data):
+    """``userId`` and ``cohort`` are recorded with the analysis, so they must be strings"""
+    for key in ('userId', 'cohort'):
+        if data.get(key) is not None and not isinstance(data[key], str):
+            raise ValueError(f"{key} must be a string")
+
+def _check_entries(items, name):
+    """Batch entries are read with .get(), so each one must be a JSON object"""
+    if not all(isinstance(item, dict) for item in items):
+        raise ValueError(f"Every entry of {name} must be an object")
 
 @app.route('/api/ai/health', methods=['GET'])
 def health_check():
@@ -314,9 +61,78 @@ def health_check():
     return jsonify({
         "status": "OK",
         "message": "AI Service is running",
-        "service": "ChromaDB Portfolio Analyzer"
+        "service": "ChromaDB Portfolio Analyzer",
+        "ready": warmup.ready
     })
 
+@app.route('/api/ai/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({"status": "OK"})
+
+@app.route('/api/ai/health/ready', methods=['GET'])
+def readiness_check():
+    """
+    Readiness probe: 200 once warm-up has finished, 503 before then.
+    Reports warm-up progress, index sizes and cache fill either way.
+    """
+    try:
+        kb = knowledge_base.current()
+        indexes = {"knowledgeBase": kb.summary()}
+        vector_service = portfolio_pipeline.loaded_vector_service
+        if vector_service is not None:
+            indexes["vector"] = vector_service.stats()
+        payload = {
+            "status": "READY" if warmup.ready else "WARMING_UP",
+            "ready": warmup.ready,
+            "warmup": warmup.progress(),
+            "indexes": indexes,
+            "caches": {"answerMatcher": cache_fill(kb.answer_matcher.cache_info())},
+            "historyQueue": history_store.queue_stats()
+        }
+        if indexes.get("vector", {}).get("embeddingCache"):
+            payload["caches"]["embeddings"] = cache_fill(vector_service.embedding_function.cache_info())
+        return jsonify(payload), 200 if warmup.ready else 503
+
+    except Exception as e:
+        print(f"Error in readiness check: {e}")
+        return jsonify({
+            "status": "ERROR",
+            "ready": False,
+            "error": str(e)
+        }), 503
+
+@app.route('/api/ai/metrics', methods=['GET'])
+def get_metrics():
+    """Counters for request coalescing, background writers and retrieval"""
+    try:
+        metrics = {
+            "coalescing": {"portfolio": portfolio_flights.snapshot()},
+            "historyQueue": history_store.queue_stats(),
+            "portfolioIndex": portfolio_index.queue_stats(),
+            "jobs": job_queue.counts(),
+            "population": population_stats.stats(),
+            "cooccurrence": skill_cooccurrence.snapshot(),
+            "demandIndex": demand_index.current().summary() if demand_index.current() else None,
+            "memory": memory_budget.snapshot(),
+            "analysisTiers": dict(portfolio_pipeline.stats)
+        }
+        vector_service = portfolio_pipeline.loaded_vector_service
+        if vector_service is not None:
+            metrics["retrieval"] = dict(vector_service.retrieval_stats)
+
+        return jsonify({
+            "success": True,
+            "metrics": metrics
+        })
+
+    except Exception as e:
+        print(f"Error reading metrics: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @app.route('/api/ai/portfolio/analyze', methods=['POST'])
 def analyze_portfolio():
     """
@@ -334,8 +150,17 @@ def analyze_portfolio():
             }
         ],
         "skills": ["React", "Python", "Docker"],
-        "achievements": "Won hackathon, Published paper, etc."
+        "achievements": "Won hackathon, Published paper, etc.",
+        "tier": "optional - fast (rules, default), full (adds vector retrieval) or auto",
+        "careerGoal": "optional - narrows vector retrieval to the career's path and industry",
+        "experienceLevel": "optional - Beginner, Intermediate or Advanced",
+        "fields": "optional - sections to return, e.g. [\"portfolioStrength\"]; also ?fields=a,b",
+        "userId": "optional - student id used for the analysis history",
+        "cohort": "optional - class or cohort label"
     }
+
+    Only the selected sections and the stages they need are computed. Partial
+    analyses are not recorded in the history or the score population.
     """
     try:
         data = request.get_json()
@@ -343,19 +168,27 @@ def analyze_portfolio():
         # Validate required fields
         if not data:
             return jsonify({"error": "No data provided"}), 400
+        if data.get('tier', DEFAULT_TIER) not in TIERS:
+            return jsonify({"error": f"Tier must be one of {', '.join(TIERS)}"}), 400
+        try:
+            _check_identity(data)
+            fields = _requested_fields(data, select_portfolio_sections)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        projects = data.get('projects', [])
-        skills = data.get('skills', [])
-        achievements = data.get('achievements', '')
-
-        # Analyze portfolio
-        analysis = portfolio_analyzer.analyze_portfolio(projects, skills, achievements)
+        # Analyze portfolio; warm-up samples stay out of the score population and history
+        analysis = _analyze_portfolio_request(dict(data, fields=fields), record=not _is_warmup_request())
         
         return jsonify({
             "success": True,
             "analysis": analysis
         })
         
+    except FlightTimeout as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 504
     except Exception as e:
         print(f"Error in portfolio analysis: {e}")
         return jsonify({
@@ -363,6 +196,97 @@ def analyze_portfolio():
             "error": str(e)
         }), 500
 
+def _analyze_portfolio_request(data, record=True, cohort=None, cancel=None):
+    """
+    Analyze one portfolio request body, coalesced with identical ones in flight,
+    and record it for the history. Setting ``cancel`` stops waiting on a
+    coalesced computation; HTTP requests have no abort hook and rely on the timeout.
+    """
+    projects = data.get('projects', [])
+    skills = data.get('skills', [])
+    achievements = data.get('achievements', '')
+    tier = data.get('tier', DEFAULT_TIER)
+    career_goal = data.get('careerGoal')
+    experience_level = data.get('experienceLevel')
+    fields = _parse_fields(data.get('fields'))
+    # A partial analysis is a view of the portfolio, not a new result to keep
+    record = record and fields is None
+
+    kb = knowledge_base.current()
+    key = payload_key("portfolio", projects, skills, achievements, tier, career_goal, experience_level,
+                      kb.source_hash, select_portfolio_sections(fields))
+    # The shared computation records nothing; each request is recorded once below,
+    # however many requests it was coalesced with
+    analysis = portfolio_flights.do(
+        key,
+        lambda: portfolio_pipeline.analyze(
+            projects, skills, achievements, kb, tier=tier,
+            career_goal=career_goal, experience_level=experience_level, record=False, fields=fields
+        ),
+        timeout=COALESCE_TIMEOUT,
+        cancel=cancel
+    )
+
+    if record:
+        _record_portfolio(data, analysis, cohort)
+    return analysis
+
+def _record_portfolio(data, analysis, cohort=None):
+    """Add one complete portfolio analysis to the population, co-occurrence, similarity index and history"""
+    projects = data.get('projects', [])
+    skills = data.get('skills', [])
+    # Persisted by the background writer, never on the request thread
+    record_population(analysis["portfolioStrength"])
+    skill_cooccurrence.observe(projects)
+    portfolio_index.record(analysis, projects, skills, user_id=data.get('userId'), cohort=data.get('cohort', cohort))
+    history_store.record(
+        "portfolio", analysis,
+        request={"projects": projects, "skills": skills, "achievements": data.get('achievements', '')},
+        user_id=data.get('userId'), cohort=data.get('cohort', cohort),
+        score=analysis["portfolioStrength"]["score"]
+    )
+
+@app.route('/api/ai/portfolio/similar', methods=['POST'])
+def similar_portfolios():
+    """
+    Find analyzed portfolios most like this one
+
+    Expected JSON body:
+    {
+        "projects": [...],
+        "skills": ["React", "Python"],
+        "userId": "optional - the student's own analyses are left out",
+        "limit": "optional - number of peers (default 5, max 50)"
+    }
+
+    Each peer has its similarity, portfolio strength and the skills it has that this portfolio lacks.
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not (data.get('projects') or data.get('skills')):
+            return jsonify({"error": "No projects or skills provided"}), 400
+        if data.get('userId') is not None and not isinstance(data['userId'], str):
+            return jsonify({"error": "userId must be a string"}), 400
+        limit = data.get('limit', 5)
+        if not isinstance(limit, int) or limit < 1:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+
+        peers = portfolio_index.similar(
+            data.get('projects', []), data.get('skills', []), limit=min(limit, 50), user_id=data.get('userId')
+        )
+        return jsonify({
+            "success": True,
+            "peers": peers
+        })
+
+    except Exception as e:
+        print(f"Error finding similar portfolios: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @app.route('/api/ai/portfolio/suggestions', methods=['POST'])
 def get_project_suggestions():
     """
@@ -383,7 +307,7 @@ def get_project_suggestions():
         experience_level = data.get('experienceLevel', 'Beginner')
         
         # Generate project suggestions
-        suggestions = _generate_project_suggestions(current_skills, career_goal, experience_level)
+        suggestions = _generate_project_suggestions(current_skills, career_goal, experience_level, knowledge_base.current())
         
         return jsonify({
             "success": True,
@@ -397,91 +321,10 @@ def get_project_suggestions():
             "error": str(e)
         }), 500
 
-def _generate_project_suggestions(skills, career_goal, level):
+def _generate_project_suggestions(skills, career_goal, level, kb):
     """Generate project suggestions based on skills and goals"""
-    
-    project_templates = {
-        "Beginner": [
-            {
-                "title": "Personal Portfolio Website",
-                "description": "Build a responsive portfolio website to showcase your projects and skills",
-                "technologies": ["HTML", "CSS", "JavaScript", "React"],
-                "difficulty": "Easy",
-                "estimatedTime": "1-2 weeks",
-                "learningOutcomes": ["Responsive design", "React basics", "Deployment"]
-            },
-            {
-                "title": "Todo List Application",
-                "description": "Create a full-stack todo list with user authentication",
-                "technologies": ["React", "Node.js", "MongoDB", "Express"],
-                "difficulty": "Easy",
-                "estimatedTime": "2-3 weeks",
-                "learningOutcomes": ["CRUD operations", "Authentication", "Database design"]
-            },
-            {
-                "title": "Weather Dashboard",
-                "description": "Build a weather app using external APIs",
-                "technologies": ["React", "API Integration", "Chart.js"],
-                "difficulty": "Easy",
-                "estimatedTime": "1 week",
-                "learningOutcomes": ["API consumption", "Data visualization", "State management"]
-            }
-        ],
-        "Intermediate": [
-            {
-                "title": "E-commerce Platform",
-                "description": "Build a full-featured e-commerce site with cart, payments, and admin panel",
-                "technologies": ["React", "Node.js", "PostgreSQL", "Stripe", "Redux"],
-                "difficulty": "Medium",
-                "estimatedTime": "4-6 weeks",
-                "learningOutcomes": ["Payment integration", "Complex state management", "Security"]
-            },
-            {
-                "title": "Real-time Chat Application",
-                "description": "Create a chat app with real-time messaging and file sharing",
-                "technologies": ["React", "Socket.io", "Node.js", "MongoDB"],
-                "difficulty": "Medium",
-                "estimatedTime": "3-4 weeks",
-                "learningOutcomes": ["WebSockets", "Real-time communication", "File uploads"]
-            },
-            {
-                "title": "Task Management System",
-                "description": "Build a Trello-like project management tool",
-                "technologies": ["React", "Node.js", "PostgreSQL", "Drag-and-Drop"],
-                "difficulty": "Medium",
-                "estimatedTime": "4-5 weeks",
-                "learningOutcomes": ["Complex UI interactions", "Database relationships", "Team collaboration"]
-            }
-        ],
-        "Advanced": [
-            {
-                "title": "AI-Powered Content Platform",
-                "description": "Build a platform with AI-generated content and recommendations",
-                "technologies": ["React", "Python", "TensorFlow", "FastAPI", "PostgreSQL"],
-                "difficulty": "Hard",
-                "estimatedTime": "8-12 weeks",
-                "learningOutcomes": ["Machine Learning integration", "Microservices", "Scalability"]
-            },
-            {
-                "title": "DevOps CI/CD Pipeline",
-                "description": "Create a complete CI/CD pipeline with monitoring and auto-scaling",
-                "technologies": ["Docker", "Kubernetes", "Jenkins", "AWS", "Terraform"],
-                "difficulty": "Hard",
-                "estimatedTime": "6-8 weeks",
-                "learningOutcomes": ["Infrastructure as Code", "Container orchestration", "Cloud deployment"]
-            },
-            {
-                "title": "Blockchain-based Application",
-                "description": "Build a decentralized app with smart contracts",
-                "technologies": ["Solidity", "Web3.js", "React", "Ethereum"],
-                "difficulty": "Hard",
-                "estimatedTime": "10-12 weeks",
-                "learningOutcomes": ["Blockchain fundamentals", "Smart contracts", "Decentralization"]
-            }
-        ]
-    }
-    
-    return project_templates.get(level, project_templates["Beginner"])
+    missing = _missing_skills_for_goal(skills, career_goal, kb)
+    return kb.project_index.suggest(skills, career_goal, level, missing)
 
 @app.route('/api/ai/skills/recommend', methods=['POST'])
 def recommend_skills():
@@ -495,7 +338,7 @@ def recommend_skills():
         career_goal = data.get('careerGoal', 'Software Developer')
         
         # Get skill recommendations
-        recommendations = _get_skill_recommendations(current_skills, career_goal)
+        recommendations = _get_skill_recommendations(current_skills, career_goal, knowledge_base.current())
         
         return jsonify({
             "success": True,
@@ -509,88 +352,93 @@ def recommend_skills():
             "error": str(e)
         }), 500
 
-def _get_skill_recommendations(current_skills, career_goal):
-    """Generate skill recommendations"""
-    
-    career_skill_map = {
-        "Full Stack Developer": {
-            "essential": ["React", "Node.js", "PostgreSQL", "Git", "REST APIs"],
-            "recommended": ["TypeScript", "Docker", "AWS", "GraphQL", "Testing"],
-            "advanced": ["Kubernetes", "Microservices", "CI/CD", "Redis", "Nginx"]
-        },
-        "Frontend Developer": {
-            "essential": ["React", "JavaScript", "CSS", "HTML", "Git"],
-            "recommended": ["TypeScript", "Next.js", "Tailwind CSS", "Testing", "Webpack"],
-            "advanced": ["Performance Optimization", "Accessibility", "PWA", "Animation", "State Management"]
-        },
-        "Backend Developer": {
-            "essential": ["Node.js", "Python", "Database", "REST APIs", "Git"],
-            "recommended": ["Docker", "PostgreSQL", "Redis", "Authentication", "Testing"],
-            "advanced": ["Microservices", "Message Queues", "Caching", "Load Balancing", "Security"]
-        },
-        "Data Scientist": {
-            "essential": ["Python", "Pandas", "NumPy", "Statistics", "SQL"],
-            "recommended": ["Machine Learning", "TensorFlow", "Scikit-learn", "Data Visualization", "Jupyter"],
-            "advanced": ["Deep Learning", "NLP", "Computer Vision", "Big Data", "MLOps"]
-        },
-        "DevOps Engineer": {
-            "essential": ["Linux", "Docker", "Git", "CI/CD", "Scripting"],
-            "recommended": ["Kubernetes", "AWS", "Terraform", "Monitoring", "Ansible"],
-            "advanced": ["Service Mesh", "GitOps", "Security", "Cost Optimization", "Multi-Cloud"]
-        }
-    }
-    
+def _missing_skills_for_goal(current_skills, career_goal, kb):
+    """Skills of each tier of the career path that the user does not have yet"""
+    career_skill_map = kb.career_skill_map
     skills_for_career = career_skill_map.get(career_goal, career_skill_map["Full Stack Developer"])
-    current_skills_lower = [s.lower() for s in current_skills]
-    
-    # Filter out skills already known
-    essential_missing = [s for s in skills_for_career["essential"] if s.lower() not in current_skills_lower]
-    recommended_missing = [s for s in skills_for_career["recommended"] if s.lower() not in current_skills_lower]
-    advanced_missing = [s for s in skills_for_career["advanced"] if s.lower() not in current_skills_lower]
-    
+    current_skills_lower = {s.lower() for s in current_skills}
     return {
-        "essential": essential_missing[:5],
-        "recommended": recommended_missing[:5],
-        "advanced": advanced_missing[:5],
-        "learningPath": _create_learning_path(essential_missing, recommended_missing, advanced_missing)
+        tier: [s for s in skills_for_career[tier] if s.lower() not in current_skills_lower]
+        for tier in ("essential", "recommended", "advanced")
     }
 
-def _create_learning_path(essential, recommended, advanced):
-    """Create a structured learning path"""
-    
-    path = []
-    
-    # Phase 1: Essential skills
-    if essential:
-        path.append({
-            "phase": 1,
-            "title": "Foundation Skills",
-            "duration": "2-3 months",
-            "skills": essential[:3],
-            "priority": "High"
-        })
+def _get_skill_recommendations(current_skills, career_goal, kb):
+    """Generate skill recommendations"""
+    missing = _missing_skills_for_goal(current_skills, career_goal, kb)
     
-    # Phase 2: Recommended skills
-    if recommended:
-        path.append({
-            "phase": 2,
-            "title": "Intermediate Skills",
-            "duration": "3-4 months",
-            "skills": recommended[:3],
-            "priority": "Medium"
+    return {
+        "essential": missing["essential"][:5],
+        "recommended": missing["recommended"][:5],
+        "advanced": missing["advanced"][:5],
+        "learningPath": kb.skill_graph.learning_path(missing, current_skills),
+        # What students who use these skills also use, learned from analyzed projects
+        "learnNext": skill_cooccurrence.learn_next(current_skills, limit=5)
+    }
+
+@app.route('/api/ai/skills/learn-next', methods=['POST'])
+def learn_next_skills():
+    """
+    Rank skills to learn next by how often they appear in projects together with the current ones
+
+    Expected JSON body:
+    {
+        "currentSkills": ["React", "Node.js"],
+        "limit": "optional - number of skills (default 10, max 50)"
+    }
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not data.get('currentSkills'):
+            return jsonify({"error": "No current skills provided"}), 400
+        limit = data.get('limit', 10)
+        if not isinstance(limit, int) or limit < 1:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+
+        return jsonify({
+            "success": True,
+            "learnNext": skill_cooccurrence.learn_next(data['currentSkills'], limit=min(limit, 50)),
+            "model": skill_cooccurrence.snapshot()
         })
-    
-    # Phase 3: Advanced skills
-    if advanced:
-        path.append({
-            "phase": 3,
-            "title": "Advanced Skills",
-            "duration": "4-6 months",
-            "skills": advanced[:3],
-            "priority": "Low"
+
+    except Exception as e:
+        print(f"Error ranking skills to learn next: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/ai/skills/prerequisites', methods=['POST'])
+def skill_prerequisites():
+    """
+    List what still has to be learned before a skill, in learning order
+
+    Expected JSON body:
+    {
+        "skill": "Kubernetes",
+        "currentSkills": ["Linux", "Git"]
+    }
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not data.get('skill'):
+            return jsonify({"error": "No skill provided"}), 400
+
+        kb = knowledge_base.current()
+        prerequisites = kb.skill_graph.missing_prerequisites(data['skill'], data.get('currentSkills', []))
+
+        return jsonify({
+            "success": True,
+            "prerequisites": prerequisites
         })
-    
-    return path
+
+    except Exception as e:
+        print(f"Error listing prerequisites: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
 
 @app.route('/api/ai/assessment/analyze', methods=['POST'])
 def analyze_assessment():
@@ -603,7 +451,8 @@ def analyze_assessment():
             "0": "Work independently and at my own pace",
             "1": "Solving complex problems",
             ...
-        }
+        },
+        "fields": "optional - sections to return, e.g. [\"traitScores\"]; also ?fields=a,b"
     }
     """
     try:
@@ -611,11 +460,21 @@ def analyze_assessment():
 
         if not data or 'answers' not in data:
             return jsonify({"error": "No assessment data provided"}), 400
+        try:
+            _check_identity(data)
+            fields = _requested_fields(data, select_assessment_sections)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         answers = data.get('answers', {})
 
         # Analyze personality traits based on answers
-        analysis = _analyze_assessment_responses(answers)
+        analysis = analyze_assessment_responses(answers, knowledge_base.current(), fields)
+        if fields is None and not _is_warmup_request():
+            history_store.record(
+                "assessment", analysis, request={"answers": answers},
+                user_id=data.get('userId'), cohort=data.get('cohort')
+            )
 
         return jsonify({
             "success": True,
@@ -629,400 +488,374 @@ def analyze_assessment():
             "error": str(e)
         }), 500
 
-def _analyze_assessment_responses(answers):
-    """Analyze assessment responses to determine personality traits and career matches"""
-
-    # Initialize trait scores
-    traits = {
-        "analytical": 0,
-        "creative": 0,
-        "collaborative": 0,
-        "leadership": 0,
-        "independent": 0,
-        "detail_oriented": 0,
-        "innovative": 0,
-        "people_oriented": 0
+# Largest class accepted by the batch endpoint in one request
+MAX_BATCH_STUDENTS = 20000
+
+@app.route('/api/ai/assessment/analyze/batch', methods=['POST'])
+def analyze_assessment_batch_endpoint():
+    """
+    Analyze a whole class of assessments in one request
+
+    Expected JSON body:
+    {
+        "students": [
+            {"id": "student-1", "answers": {"0": "Solving complex problems", ...}},
+            ...
+        ],
+        "cohort": "optional - class or cohort label",
+        "fields": "optional - sections to return for every student"
     }
+    """
+    try:
+        data = request.get_json()
 
-    # Analyze each answer and update trait scores
-    for question_id, answer in answers.items():
-        answer_lower = answer.lower()
-
-        # Work style analysis
-        if "independently" in answer_lower or "own pace" in answer_lower:
-            traits["independent"] += 2
-            traits["analytical"] += 1
-        elif "collaborate" in answer_lower or "team" in answer_lower:
-            traits["collaborative"] += 2
-            traits["people_oriented"] += 1
-        elif "lead" in answer_lower or "delegate" in answer_lower:
-            traits["leadership"] += 2
-            traits["collaborative"] += 1
-        elif "support" in answer_lower or "help" in answer_lower:
-            traits["people_oriented"] += 2
-            traits["collaborative"] += 1
-
-        # Motivation analysis
-        if "solving" in answer_lower or "problems" in answer_lower:
-            traits["analytical"] += 2
-            traits["detail_oriented"] += 1
-        elif "creating" in answer_lower or "new" in answer_lower:
-            traits["creative"] += 2
-            traits["innovative"] += 1
-        elif "helping" in answer_lower or "others" in answer_lower:
-            traits["people_oriented"] += 2
-        elif "organizing" in answer_lower or "planning" in answer_lower:
-            traits["detail_oriented"] += 2
-
-        # Learning style
-        if "hands-on" in answer_lower or "doing" in answer_lower:
-            traits["independent"] += 1
-            traits["creative"] += 1
-        elif "reading" in answer_lower or "research" in answer_lower:
-            traits["analytical"] += 2
-        elif "discussion" in answer_lower or "group" in answer_lower:
-            traits["collaborative"] += 2
-        elif "visual" in answer_lower or "diagrams" in answer_lower:
-            traits["creative"] += 1
-            traits["detail_oriented"] += 1
-
-        # Decision making
-        if "data" in answer_lower or "facts" in answer_lower:
-            traits["analytical"] += 2
-        elif "intuition" in answer_lower or "gut" in answer_lower:
-            traits["creative"] += 1
-            traits["innovative"] += 1
-        elif "consensus" in answer_lower or "input" in answer_lower:
-            traits["collaborative"] += 2
-        elif "quickly" in answer_lower or "decisive" in answer_lower:
-            traits["leadership"] += 1
-
-        # Innovation
-        if "new" in answer_lower or "innovative" in answer_lower:
-            traits["innovative"] += 2
-            traits["creative"] += 1
-        elif "proven" in answer_lower or "reliable" in answer_lower:
-            traits["detail_oriented"] += 1
-
-        # Communication
-        if "writing" in answer_lower or "written" in answer_lower:
-            traits["analytical"] += 1
-            traits["independent"] += 1
-        elif "speaking" in answer_lower or "presenting" in answer_lower:
-            traits["people_oriented"] += 2
-            traits["leadership"] += 1
-
-    # Normalize scores to percentages
-    max_score = max(traits.values()) if max(traits.values()) > 0 else 1
-    normalized_traits = {k: round((v / max_score) * 100) for k, v in traits.items()}
-
-    # Determine top personality traits
-    sorted_traits = sorted(normalized_traits.items(), key=lambda x: x[1], reverse=True)
-    top_traits = [
-        {
-            "name": trait.replace("_", " ").title(),
-            "score": score,
-            "description": _get_trait_description(trait)
-        }
-        for trait, score in sorted_traits[:4]
-    ]
+        if not data or not isinstance(data.get('students'), list):
+            return jsonify({"error": "No students provided"}), 400
 
-    # Generate career recommendations based on traits
-    career_matches = _generate_career_matches(normalized_traits)
+        students = data['students']
+        if len(students) > MAX_BATCH_STUDENTS:
+            return jsonify({"error": f"At most {MAX_BATCH_STUDENTS} students per batch"}), 413
+        try:
+            _check_identity(data)
+            _check_entries(students, 'students')
+            fields = _requested_fields(data, select_assessment_sections)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-    # Generate skill recommendations
-    skill_recommendations = _generate_skill_recommendations_from_traits(normalized_traits)
+        results = _analyze_students(students, data.get('cohort'), record=not _is_warmup_request(), fields=fields)
 
-    # Generate learning path
-    learning_style = _determine_learning_style(answers)
+        return jsonify({
+            "success": True,
+            "count": len(results),
+            "results": results
+        })
 
-    # Generate personality summary
-    personality_type = _determine_personality_type(normalized_traits)
+    except Exception as e:
+        print(f"Error in batch assessment analysis: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
 
-    return {
-        "personalityTraits": top_traits,
-        "personalityType": personality_type,
-        "careerMatches": career_matches,
-        "skillRecommendations": skill_recommendations,
-        "learningStyle": learning_style,
-        "strengths": _identify_strengths(normalized_traits),
-        "developmentAreas": _identify_development_areas(normalized_traits)
-    }
+def _analyze_students(students, cohort=None, record=True, fields=None):
+    """Score a list of students' assessments; complete analyses of students with an id are queued for the history"""
+    answer_sets = [student.get('answers') or {} for student in students]
+    analyses = analyze_assessment_batch(answer_sets, knowledge_base.current(), fields)
+
+    results = [{"id": student.get('id'), "analysis": analysis} for student, analysis in zip(students, analyses)]
+    if record and fields is None:
+        _record_students(students, results, cohort)
+    return results
+
+def _record_students(students, results, cohort=None):
+    """Queue the analyses of students with an id for the history"""
+    for student, result in zip(students, results):
+        if student.get('id') is not None:
+            history_store.record(
+                "assessment", result["analysis"], request={"answers": student.get('answers') or {}},
+                user_id=str(student['id']), cohort=cohort
+            )
+
+@app.route('/api/ai/history/<user_id>', methods=['GET'])
+def get_analysis_history(user_id):
+    """
+    Recent analyses for a student, newest first
 
-def _get_trait_description(trait):
-    """Get description for each personality trait"""
-    descriptions = {
-        "analytical": "You excel at breaking down complex problems and making data-driven decisions",
-        "creative": "You thrive on innovation and bringing new ideas to life",
-        "collaborative": "You work effectively in teams and value diverse perspectives",
-        "leadership": "You naturally take charge and guide others toward goals",
-        "independent": "You work best with autonomy and self-direction",
-        "detail_oriented": "You pay close attention to accuracy and thoroughness",
-        "innovative": "You constantly seek new and better ways to solve problems",
-        "people_oriented": "You excel at understanding and working with others"
-    }
-    return descriptions.get(trait, "A valuable professional trait")
+    Query parameters: limit (default 20, max 200), kind ("portfolio" or "assessment")
+    """
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+        kind = request.args.get('kind')
 
-def _determine_personality_type(traits):
-    """Determine overall personality type based on trait combination"""
-    top_trait = max(traits.items(), key=lambda x: x[1])[0]
+        return jsonify({
+            "success": True,
+            "history": history_store.recent(user_id, limit=limit, kind=kind)
+        })
 
-    types = {
-        "analytical": {
-            "type": "The Analyst",
-            "description": "You approach challenges with logic and systematic thinking. You excel in roles that require problem-solving and data analysis.",
-            "icon": "chart-bar"
-        },
-        "creative": {
-            "type": "The Innovator",
-            "description": "You bring fresh perspectives and creative solutions. You thrive in environments that encourage experimentation and new ideas.",
-            "icon": "lightbulb"
-        },
-        "collaborative": {
-            "type": "The Team Player",
-            "description": "You excel at bringing people together and fostering collaboration. You create value through teamwork and shared success.",
-            "icon": "user-group"
-        },
-        "leadership": {
-            "type": "The Leader",
-            "description": "You naturally inspire and guide others. You excel at setting vision, making decisions, and driving results.",
-            "icon": "star"
-        },
-        "independent": {
-            "type": "The Self-Starter",
-            "description": "You thrive with autonomy and take initiative. You excel when given freedom to work independently and own your projects.",
-            "icon": "rocket"
-        },
-        "detail_oriented": {
-            "type": "The Perfectionist",
-            "description": "You ensure quality through attention to detail. You excel in roles requiring precision and thoroughness.",
-            "icon": "check-circle"
-        },
-        "innovative": {
-            "type": "The Visionary",
-            "description": "You see possibilities others miss and drive change. You excel at transforming ideas into reality.",
-            "icon": "sparkles"
-        },
-        "people_oriented": {
-            "type": "The Connector",
-            "description": "You understand people and build strong relationships. You excel in roles that involve communication and collaboration.",
-            "icon": "users"
-        }
+    except Exception as e:
+        print(f"Error reading analysis history: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+# Students scored per progress report in assessment batch jobs
+JOB_CHUNK = 500
+
+def _portfolio_job(payload, job):
+    """One portfolio, however many projects it lists"""
+    job.progress(0, 1, force=True)
+    analysis = _analyze_portfolio_request(payload, cancel=job.cancelled)
+    job.progress(1, 1, force=True)
+    return {"analysis": analysis}
+
+def _portfolio_batch_job(payload, job):
+    """
+    Bulk re-scoring: one analysis per portfolio, with progress after each.
+    Nothing is recorded until every portfolio is analyzed, so a retried
+    attempt does not record the portfolios a failed one already finished.
+    """
+    portfolios = payload.get('portfolios') or []
+    _check_entries(portfolios, 'portfolios')
+    results = []
+    for i, portfolio in enumerate(portfolios):
+        job.progress(i, len(portfolios))
+        analysis = _analyze_portfolio_request(portfolio, record=False, cancel=job.cancelled)
+        results.append({"id": portfolio.get('id', portfolio.get('userId')), "analysis": analysis})
+    job.progress(len(portfolios), len(portfolios), force=True)
+    for portfolio, result in zip(portfolios, results):
+        if _parse_fields(portfolio.get('fields')) is None:
+            _record_portfolio(portfolio, result["analysis"], payload.get('cohort'))
+    return {"count": len(results), "results": results}
+
+def _assessment_batch_job(payload, job):
+    """
+    A class of any size, scored in chunks so progress and cancellation are
+    checked between them; recorded only once every chunk is scored
+    """
+    students = payload.get('students') or []
+    _check_entries(students, 'students')
+    fields = _parse_fields(payload.get('fields'))
+    results = []
+    for start in range(0, len(students), JOB_CHUNK):
+        job.progress(start, len(students))
+        results.extend(_analyze_students(students[start:start + JOB_CHUNK], record=False, fields=fields))
+    job.progress(len(students), len(students), force=True)
+    if fields is None:
+        _record_students(students, results, payload.get('cohort'))
+    return {"count": len(results), "results": results}
+
+job_queue.register("portfolio.analyze", _portfolio_job)
+job_queue.register("portfolio.batch", _portfolio_batch_job)
+job_queue.register("assessment.batch", _assessment_batch_job)
+
+@app.route('/api/ai/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a long analysis and return at once; poll /api/ai/jobs/<jobId> for progress
+
+    Expected JSON body:
+    {
+        "kind": "portfolio.analyze" | "portfolio.batch" | "assessment.batch",
+        "payload": {...},
+        "priority": 0
     }
+    portfolio.analyze takes the body of /api/ai/portfolio/analyze,
+    assessment.batch the body of /api/ai/assessment/analyze/batch (no size limit),
+    portfolio.batch {"portfolios": [{"id": ..., "projects": [...], "skills": [...], "achievements": ""}], "cohort": ...}
+    """
+    try:
+        data = request.get_json()
 
-    return types.get(top_trait, types["analytical"])
-
-def _generate_career_matches(traits):
-    """Generate career recommendations based on personality traits"""
-    careers = []
-
-    # Software Development paths
-    if traits["analytical"] >= 70 or traits["detail_oriented"] >= 70:
-        careers.append({
-            "title": "Software Engineer",
-            "matchPercentage": min(95, traits["analytical"] + 10),
-            "description": "Design and develop software solutions using analytical and problem-solving skills",
-            "keySkills": ["Python", "Java", "Data Structures", "Algorithms"],
-            "salaryRange": "$80,000 - $150,000",
-            "growthRate": "22%"
-        })
+        if not data or data.get('kind') not in job_queue.handlers:
+            return jsonify({"error": f"Job kind must be one of {', '.join(sorted(job_queue.handlers))}"}), 400
+        if not isinstance(data.get('payload'), dict):
+            return jsonify({"error": "No payload provided"}), 400
+        try:
+            for key in ('students', 'portfolios'):
+                _check_entries(data['payload'].get(key) or [], key)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-    if traits["creative"] >= 70 or traits["innovative"] >= 70:
-        careers.append({
-            "title": "UX/UI Designer",
-            "matchPercentage": min(95, traits["creative"] + 10),
-            "description": "Create intuitive and beautiful user experiences through design thinking",
-            "keySkills": ["Figma", "User Research", "Prototyping", "Design Systems"],
-            "salaryRange": "$70,000 - $130,000",
-            "growthRate": "16%"
-        })
+        job_id = job_queue.submit(data['kind'], data['payload'], priority=int(data.get('priority', 0)))
 
-        careers.append({
-            "title": "Product Manager",
-            "matchPercentage": min(92, (traits["creative"] + traits["leadership"]) // 2 + 10),
-            "description": "Lead product development from concept to launch",
-            "keySkills": ["Product Strategy", "User Stories", "Agile", "Analytics"],
-            "salaryRange": "$90,000 - $160,000",
-            "growthRate": "19%"
-        })
+        return jsonify({
+            "success": True,
+            "jobId": job_id,
+            "status": "queued"
+        }), 202
 
-    if traits["analytical"] >= 65 and traits["detail_oriented"] >= 65:
-        careers.append({
-            "title": "Data Scientist",
-            "matchPercentage": min(94, (traits["analytical"] + traits["detail_oriented"]) // 2 + 10),
-            "description": "Extract insights from data using statistical analysis and machine learning",
-            "keySkills": ["Python", "Machine Learning", "Statistics", "SQL"],
-            "salaryRange": "$95,000 - $170,000",
-            "growthRate": "31%"
-        })
+    except Exception as e:
+        print(f"Error submitting job: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
 
-    if traits["people_oriented"] >= 70 or traits["collaborative"] >= 70:
-        careers.append({
-            "title": "Technical Project Manager",
-            "matchPercentage": min(93, traits["people_oriented"] + 10),
-            "description": "Lead technical teams and ensure successful project delivery",
-            "keySkills": ["Agile", "Scrum", "Communication", "Risk Management"],
-            "salaryRange": "$85,000 - $145,000",
-            "growthRate": "18%"
-        })
+@app.route('/api/ai/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status and progress of a job"""
+    job = job_queue.status(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    return jsonify({
+        "success": True,
+        "job": job
+    })
 
-    if traits["leadership"] >= 70:
-        careers.append({
-            "title": "Engineering Manager",
-            "matchPercentage": min(91, traits["leadership"] + 5),
-            "description": "Lead engineering teams and drive technical excellence",
-            "keySkills": ["Leadership", "Technical Strategy", "Mentoring", "Architecture"],
-            "salaryRange": "$120,000 - $200,000",
-            "growthRate": "17%"
-        })
+@app.route('/api/ai/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Result of a finished job; 202 while it is still queued or running"""
+    job = job_queue.status(job_id, include_result=True)
+    if job is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    if job["status"] in ("queued", "running"):
+        job.pop("result")
+        return jsonify({"success": True, "job": job}), 202
+    if job["status"] != "succeeded":
+        return jsonify({"success": False, "error": job["error"] or f"Job {job['status']}", "job": job}), 409
+    return jsonify({
+        "success": True,
+        "result": job.pop("result"),
+        "job": job
+    })
 
-    if traits["innovative"] >= 70 or traits["creative"] >= 70:
-        careers.append({
-            "title": "Full Stack Developer",
-            "matchPercentage": min(90, (traits["innovative"] + traits["analytical"]) // 2 + 5),
-            "description": "Build complete web applications from frontend to backend",
-            "keySkills": ["React", "Node.js", "Databases", "APIs"],
-            "salaryRange": "$75,000 - $140,000",
-            "growthRate": "25%"
-        })
+@app.route('/api/ai/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued job at once, or a running one at its next progress report"""
+    status = job_queue.cancel(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    return jsonify({
+        "success": True,
+        "status": status
+    })
 
-    # Cybersecurity
-    if traits["analytical"] >= 65 and traits["detail_oriented"] >= 60:
-        careers.append({
-            "title": "Cybersecurity Analyst",
-            "matchPercentage": min(89, (traits["analytical"] + traits["detail_oriented"]) // 2),
-            "description": "Protect systems and data from security threats",
-            "keySkills": ["Network Security", "Penetration Testing", "SIEM", "Compliance"],
-            "salaryRange": "$85,000 - $150,000",
-            "growthRate": "33%"
-        })
+@app.route('/api/ai/memory', methods=['GET'])
+def get_memory():
+    """Estimated memory per cache and index against the budget, measured now"""
+    return jsonify({
+        "success": True,
+        "memory": memory_budget.snapshot(measure=True),
+        "tracemalloc": allocation_tracker.status()
+    })
 
-    # Sort by match percentage and return top 5
-    careers.sort(key=lambda x: x["matchPercentage"], reverse=True)
-    return careers[:5]
-
-def _generate_skill_recommendations_from_traits(traits):
-    """Generate skill recommendations based on personality traits"""
-    skills = []
-
-    if traits["analytical"] >= 70:
-        skills.extend([
-            {"name": "Python", "category": "Programming", "priority": "High", "reason": "Essential for data analysis and problem-solving"},
-            {"name": "SQL", "category": "Database", "priority": "High", "reason": "Critical for data manipulation and analysis"},
-            {"name": "Data Structures & Algorithms", "category": "Computer Science", "priority": "High", "reason": "Foundation for analytical thinking"}
-        ])
-
-    if traits["creative"] >= 70:
-        skills.extend([
-            {"name": "UI/UX Design", "category": "Design", "priority": "High", "reason": "Channel creativity into user experience"},
-            {"name": "Figma", "category": "Tools", "priority": "Medium", "reason": "Industry-standard design tool"},
-            {"name": "React", "category": "Frontend", "priority": "High", "reason": "Build creative, interactive interfaces"}
-        ])
-
-    if traits["collaborative"] >= 70:
-        skills.extend([
-            {"name": "Git & GitHub", "category": "Version Control", "priority": "High", "reason": "Essential for team collaboration"},
-            {"name": "Agile/Scrum", "category": "Methodology", "priority": "Medium", "reason": "Framework for team collaboration"},
-            {"name": "Communication Skills", "category": "Soft Skills", "priority": "High", "reason": "Critical for effective teamwork"}
-        ])
-
-    if traits["leadership"] >= 70:
-        skills.extend([
-            {"name": "Project Management", "category": "Management", "priority": "High", "reason": "Lead projects effectively"},
-            {"name": "Technical Architecture", "category": "System Design", "priority": "Medium", "reason": "Make high-level technical decisions"},
-            {"name": "Mentoring", "category": "Soft Skills", "priority": "Medium", "reason": "Develop and guide team members"}
-        ])
-
-    # Remove duplicates and return top 8
-    unique_skills = []
-    seen = set()
-    for skill in skills:
-        if skill["name"] not in seen:
-            unique_skills.append(skill)
-            seen.add(skill["name"])
-
-    return unique_skills[:8]
-
-def _determine_learning_style(answers):
-    """Determine preferred learning style from answers"""
-    styles = {
-        "hands-on": 0,
-        "visual": 0,
-        "reading": 0,
-        "collaborative": 0
-    }
+@app.route('/api/ai/memory/tracemalloc', methods=['POST'])
+def trace_allocations():
+    """
+    Control tracemalloc to find leaks in a long-running worker
 
-    for answer in answers.values():
-        answer_lower = answer.lower()
-        if "hands-on" in answer_lower or "doing" in answer_lower or "practice" in answer_lower:
-            styles["hands-on"] += 1
-        if "visual" in answer_lower or "diagrams" in answer_lower or "videos" in answer_lower:
-            styles["visual"] += 1
-        if "reading" in answer_lower or "research" in answer_lower or "documentation" in answer_lower:
-            styles["reading"] += 1
-        if "discussion" in answer_lower or "group" in answer_lower or "collaborative" in answer_lower:
-            styles["collaborative"] += 1
-
-    primary_style = max(styles.items(), key=lambda x: x[1])[0]
-
-    style_descriptions = {
-        "hands-on": {
-            "style": "Hands-On Learner",
-            "description": "You learn best by doing and practicing. Focus on project-based learning and coding challenges.",
-            "recommendations": ["Build projects", "Complete coding challenges", "Participate in hackathons"]
-        },
-        "visual": {
-            "style": "Visual Learner",
-            "description": "You learn best through visual aids and demonstrations. Use video tutorials and diagrams.",
-            "recommendations": ["Watch video tutorials", "Use visual documentation", "Create mind maps"]
-        },
-        "reading": {
-            "style": "Reading/Writing Learner",
-            "description": "You learn best through reading and note-taking. Use documentation and written resources.",
-            "recommendations": ["Read technical documentation", "Take detailed notes", "Write blog posts"]
-        },
-        "collaborative": {
-            "style": "Collaborative Learner",
-            "description": "You learn best through discussion and group work. Join study groups and communities.",
-            "recommendations": ["Join study groups", "Participate in forums", "Pair programming"]
-        }
+    Expected JSON body:
+    {
+        "action": "start, snapshot or stop",
+        "frames": "optional - stack frames kept per allocation for start (default 1)",
+        "limit": "optional - sites listed by snapshot (default 20)",
+        "groupBy": "optional - lineno (default), filename or traceback"
     }
 
-    return style_descriptions.get(primary_style, style_descriptions["hands-on"])
-
-def _identify_strengths(traits):
-    """Identify top strengths based on traits"""
-    sorted_traits = sorted(traits.items(), key=lambda x: x[1], reverse=True)
-
-    strength_descriptions = {
-        "analytical": "Strong analytical and problem-solving abilities",
-        "creative": "Creative thinking and innovative approach",
-        "collaborative": "Excellent teamwork and collaboration skills",
-        "leadership": "Natural leadership and decision-making capabilities",
-        "independent": "Self-motivated and autonomous work style",
-        "detail_oriented": "Meticulous attention to detail and quality",
-        "innovative": "Forward-thinking and adaptable to change",
-        "people_oriented": "Strong interpersonal and communication skills"
-    }
+    Each snapshot lists the top allocation sites and how they changed since the previous snapshot.
+    """
+    try:
+        data = request.get_json() or {}
+        action = data.get('action')
+
+        if action == 'start':
+            allocation_tracker.start(int(data.get('frames', 1)))
+            return jsonify({"success": True, "tracemalloc": allocation_tracker.status()})
+        if action == 'stop':
+            allocation_tracker.stop()
+            return jsonify({"success": True, "tracemalloc": allocation_tracker.status()})
+        if action != 'snapshot':
+            return jsonify({"error": "action must be start, snapshot or stop"}), 400
+        if data.get('groupBy', 'lineno') not in ('lineno', 'filename', 'traceback'):
+            return jsonify({"error": "groupBy must be lineno, filename or traceback"}), 400
+        if not allocation_tracker.tracing:
+            return jsonify({"error": "tracemalloc is not running; start it first"}), 409
 
-    return [strength_descriptions[trait] for trait, _ in sorted_traits[:3]]
-
-def _identify_development_areas(traits):
-    """Identify areas for development based on lower trait scores"""
-    sorted_traits = sorted(traits.items(), key=lambda x: x[1])
-
-    development_descriptions = {
-        "analytical": "Develop analytical thinking through data analysis and problem-solving exercises",
-        "creative": "Enhance creativity through design thinking and brainstorming sessions",
-        "collaborative": "Improve collaboration skills by working on team projects",
-        "leadership": "Build leadership skills through mentoring and project management",
-        "independent": "Strengthen independent work habits and self-management",
-        "detail_oriented": "Improve attention to detail through code reviews and testing",
-        "innovative": "Foster innovation by exploring new technologies and approaches",
-        "people_oriented": "Develop interpersonal skills through networking and communication practice"
-    }
+        return jsonify({
+            "success": True,
+            "snapshot": allocation_tracker.snapshot(int(data.get('limit', 20)), data.get('groupBy', 'lineno'))
+        })
 
-    return [development_descriptions[trait] for trait, score in sorted_traits[:2] if score < 50]
+    except Exception as e:
+        print(f"Error tracing allocations: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+def _replay(step):
+    """Post one step's representative requests through the real endpoints"""
+    client = app.test_client()
+    for path, payload in representative_requests(knowledge_base.current())[step]:
+        response = client.post(path, json=payload, headers={WARMUP_HEADER: "1"})
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+
+def _warm_vector_index():
+    """Load Chroma, seed its collections and run the embedding model and both retrievers once"""
+    kb = knowledge_base.current()
+    for path, payload in representative_requests(kb)["portfolio"]:
+        analysis = portfolio_pipeline.analyze(
+            payload["projects"], payload["skills"], payload["achievements"], kb, tier="full", record=False
+        )
+        if analysis["analysisTier"]["served"] != "full":
+            raise RuntimeError(analysis["analysisTier"].get("error", "vector tier not served"))
+
+def _vector_memory(part):
+    """One part of the vector service's memory estimate; nothing until Chroma is loaded"""
+    vector_service = portfolio_pipeline.loaded_vector_service
+    return vector_service.memory_usage()[part] if vector_service is not None else 0
+
+def _embedding_function():
+    """The loaded embedding function, if it has a cache to account for"""
+    embedding_function = getattr(portfolio_pipeline.loaded_vector_service, "embedding_function", None)
+    return embedding_function if hasattr(embedding_function, "cache_bytes") else None
+
+_knowledge_base_bytes = {}
+
+def _knowledge_base_memory():
+    """Measured once per version; a version never changes in place"""
+    kb = knowledge_base.current()
+    if kb.source_hash not in _knowledge_base_bytes:
+        _knowledge_base_bytes.clear()
+        _knowledge_base_bytes[kb.source_hash] = deep_sizeof(kb)
+    return _knowledge_base_bytes[kb.source_hash]
+
+# Caches that refill on demand go first; indexed portfolios are lost when evicted
+memory_budget.register(
+    "embeddingCache",
+    lambda: _embedding_function().cache_bytes() if _embedding_function() else 0,
+    evict=lambda nbytes: _embedding_function().cache_clear(),
+    priority=10
+)
+memory_budget.register(
+    "answerMatcherCache",
+    lambda: knowledge_base.current().answer_matcher.cache_bytes(),
+    evict=lambda nbytes: knowledge_base.current().answer_matcher.cache_clear(),
+    priority=10
+)
+memory_budget.register(
+    "portfolioIndex",
+    lambda: _vector_memory("portfolioIndex"),
+    evict=lambda nbytes: portfolio_pipeline.loaded_vector_service.evict_portfolios(nbytes),
+    priority=50
+)
+memory_budget.register("knowledgeBase", _knowledge_base_memory)
+memory_budget.register("lexicalIndexes", lambda: _vector_memory("lexicalIndexes"))
+memory_budget.register("vectorCollections", lambda: _vector_memory("vectorCollections"))
+memory_budget.register("skillCooccurrence", skill_cooccurrence.memory_bytes)
+memory_budget.register(
+    "sharedTables",
+    lambda: getattr(getattr(portfolio_pipeline.loaded_vector_service, "shared_tables", None), "nbytes", 0),
+    shared=True
+)
+memory_budget.register(
+    "demandIndex",
+    lambda: demand_index.current().summary()["bytes"] if demand_index.current() else 0,
+    shared=True
+)
+
+warmup.add("knowledgeBase", knowledge_base.current)
+for _step in ("assessment", "portfolio", "suggestions", "skills"):
+    warmup.add(_step, lambda step=_step: _replay(step))
+warmup.add("vectorIndex", _warm_vector_index, required=False)
+
+# Pick up knowledge base edits without restarting the worker
+knowledge_base.start_watcher()
+demand_index.start_watcher()
+# Share score distributions with the other workers
+population_stats.start()
+skill_cooccurrence.start()
+history_store.start()
+portfolio_index.start()
+job_queue.start()
+memory_budget.start()
+if os.environ.get("SKILLNEX_TRACEMALLOC"):
+    # Frames per allocation; tracing from startup also catches what loads early
+    allocation_tracker.start(int(os.environ["SKILLNEX_TRACEMALLOC"]))
+# Readiness stays 503 until every required step has run
+warmup.start()
 
 if __name__ == '__main__':
     print("Starting AI Service on port 5000...")
@@ -0,0 +1,142 @@
+"""
+Answer-to-trait matching for assessments.
+
+Each answer is scored by keyword rules. Every option in the knowledge base's
+assessment catalogue is scored once, when the knowledge base loads, into a
+trait-delta vector and a learning-style vector. Scoring a catalogue answer is
+then one dict lookup. Free-text answers go through one compiled alternation
+regex that finds every keyword in a single scan, and the results are memoized.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Sequence, Tuple
+
+from memory_budget import lru_entry_bytes
+
+# Keyword rules, one chain per question theme; only the first matching rule of a chain applies
+TRAIT_RULES = (
+    # Work style
+    (
+        (("independently", "own pace"), {"independent": 2, "analytical": 1}),
+        (("collaborate", "team"), {"collaborative": 2, "people_oriented": 1}),
+        (("lead", "delegate"), {"leadership": 2, "collaborative": 1}),
+        (("support", "help"), {"people_oriented": 2, "collaborative": 1}),
+    ),
+    # Motivation
+    (
+        (("solving", "problems"), {"analytical": 2, "detail_oriented": 1}),
+        (("creating", "new"), {"creative": 2, "innovative": 1}),
+        (("helping", "others"), {"people_oriented": 2}),
+        (("organizing", "planning"), {"detail_oriented": 2}),
+    ),
+    # Learning style
+    (
+        (("hands-on", "doing"), {"independent": 1, "creative": 1}),
+        (("reading", "research"), {"analytical": 2}),
+        (("discussion", "group"), {"collaborative": 2}),
+        (("visual", "diagrams"), {"creative": 1, "detail_oriented": 1}),
+    ),
+    # Decision making
+    (
+        (("data", "facts"), {"analytical": 2}),
+        (("intuition", "gut"), {"creative": 1, "innovative": 1}),
+        (("consensus", "input"), {"collaborative": 2}),
+        (("quickly", "decisive"), {"leadership": 1}),
+    ),
+    # Innovation
+    (
+        (("new", "innovative"), {"innovative": 2, "creative": 1}),
+        (("proven", "reliable"), {"detail_oriented": 1}),
+    ),
+    # Communication
+    (
+        (("writing", "written"), {"analytical": 1, "independent": 1}),
+        (("speaking", "presenting"), {"people_oriented": 2, "leadership": 1}),
+    ),
+)
+
+# Every matching learning style counts, independently of the others
+STYLE_RULES = (
+    ("hands-on", ("hands-on", "doing", "practice")),
+    ("visual", ("visual", "diagrams", "videos")),
+    ("reading", ("reading", "research", "documentation")),
+    ("collaborative", ("discussion", "group", "collaborative")),
+)
+STYLES = tuple(style for style, _ in STYLE_RULES)
+
+AnswerVectors = Tuple[Tuple[float, ...], Tuple[float, ...]]
+
+
+class AnswerMatcher:
+    """Maps a lower-cased answer to its (trait deltas, learning styles) vectors"""
+
+    def __init__(self, traits: Sequence[str], questions: List[Dict[str, Any]], cache_size: int = 4096):
+        self.traits = list(traits)
+        trait_index = {trait: i for i, trait in enumerate(self.traits)}
+
+        # Rules compiled to frozensets of keywords and dense delta vectors
+        self._chains = []
+        for chain in TRAIT_RULES:
+            compiled_chain = []
+            for keywords, deltas in chain:
+                vector = [0.0] * len(self.traits)
+                for trait, delta in deltas.items():
+                    vector[trait_index[trait]] = delta
+                compiled_chain.append((frozenset(keywords), vector))
+            self._chains.append(compiled_chain)
+        self._styles = [frozenset(keywords) for _, keywords in STYLE_RULES]
+
+        keywords = {keyword for chain in TRAIT_RULES for rule_keywords, _ in chain for keyword in rule_keywords}
+        keywords.update(keyword for _, style_keywords in STYLE_RULES for keyword in style_keywords)
+        # A zero-width lookahead reports a match at every position. Longest keywords go
+        # first, and each keyword implies every shorter keyword it contains, so one scan
+        # finds exactly the keywords that occur anywhere in the text.
+        alternation = "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+        self._pattern = re.compile(f"(?=({alternation}))")
+        self._implied = {keyword: frozenset(other for other in keywords if other in keyword) for keyword in keywords}
+
+        self.options: Dict[str, AnswerVectors] = {
+            option.lower(): self._vectors(self._keywords_in(option.lower()))
+            for question in questions
+            for option in question.get("options", [])
+        }
+        self._match_free_text = lru_cache(maxsize=cache_size)(self._match_uncached)
+        sample = "i enjoy solving problems with a team"
+        self._entry_bytes = lru_entry_bytes(sample, self._match_uncached(sample))
+
+    def vectors(self, answer_lower: str) -> AnswerVectors:
+        """Trait-delta and learning-style vectors for one lower-cased answer"""
+        vectors = self.options.get(answer_lower)
+        if vectors is None:
+            vectors = self._match_free_text(answer_lower)
+        return vectors
+
+    def cache_info(self):
+        return self._match_free_text.cache_info()
+
+    def cache_bytes(self) -> int:
+        """Estimated memory held by the free-text answer cache"""
+        return self.cache_info().currsize * self._entry_bytes
+
+    def cache_clear(self) -> None:
+        self._match_free_text.cache_clear()
+
+    def _match_uncached(self, answer_lower: str) -> AnswerVectors:
+        return self._vectors(self._keywords_in(answer_lower))
+
+    def _keywords_in(self, text: str) -> FrozenSet[str]:
+        found = set()
+        for match in self._pattern.finditer(text):
+            found |= self._implied[match.group(1)]
+        return frozenset(found)
+
+    def _vectors(self, found: FrozenSet[str]) -> AnswerVectors:
+        traits = [0.0] * len(self.traits)
+        for chain in self._chains:
+            for keywords, deltas in chain:
+                if keywords & found:
+                    traits = [a + b for a, b in zip(traits, deltas)]
+                    break
+        styles = tuple(1.0 if keywords & found else 0.0 for keywords in self._styles)
+        return tuple(traits), styles
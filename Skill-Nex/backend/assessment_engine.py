@@ -0,0 +1,179 @@
+"""
+Assessment scoring engine.
+
+Answers are encoded into a sparse students-by-answers matrix. Each distinct
+answer text is looked up once in the knowledge base's AnswerMatcher, which
+gives a trait-delta row and a learning-style row.
+Trait and learning-style totals for every student then come from one
+scatter-add over the matrix. Normalization, top traits, personality type and
+career matches are computed with NumPy over the whole batch. A single
+assessment is just a batch of one.
+
+``fields`` limits the result to some sections. Batch stages that no
+selected section reads are skipped: the career matrix product, the skill
+thresholds, the trait orderings.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from answer_matching import STYLES, AnswerMatcher
+from knowledge_base import KnowledgeBase
+
+TRAIT_SKILL_THRESHOLD = 70
+DEVELOPMENT_THRESHOLD = 50
+
+# Response sections in output order
+ASSESSMENT_SECTIONS = ("personalityTraits", "personalityType", "careerMatches", "skillRecommendations",
+                       "learningStyle", "strengths", "developmentAreas", "traitScores")
+
+
+def select_assessment_sections(fields: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """The selected sections in output order; every section when ``fields`` is None"""
+    if fields is None:
+        return ASSESSMENT_SECTIONS
+    fields = set(fields)
+    unknown = fields - set(ASSESSMENT_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown assessment fields: {', '.join(sorted(unknown))}")
+    return tuple(section for section in ASSESSMENT_SECTIONS if section in fields)
+
+
+def _encode_answers(answer_sets: Sequence[Dict[str, Any]], matcher: AnswerMatcher) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Raw trait totals (students x traits) and learning-style counts (students x styles),
+    from a single pass over the answers.
+    Distinct answers become columns of a sparse students-by-answers matrix, which
+    is multiplied by the per-answer feature rows.
+    """
+    vocab: Dict[str, int] = {}
+    column_of = vocab.setdefault
+    cols: List[int] = []
+    lengths: List[int] = []
+    for answers in answer_sets:
+        cols.extend([column_of(str(answer).lower(), len(vocab)) for answer in answers.values()])
+        lengths.append(len(answers))
+
+    # Catalogue options are precomputed; free text goes through the memoized matcher
+    vectors = [matcher.vectors(key) for key in vocab]
+    trait_features = np.array([traits for traits, _ in vectors]).reshape(len(vocab), len(matcher.traits))
+    style_features = np.array([styles for _, styles in vectors]).reshape(len(vocab), len(STYLES))
+
+    n = len(answer_sets)
+    rows_array = np.repeat(np.arange(n), lengths)
+    cols_array = np.asarray(cols, dtype=np.intp)
+
+    def spmm(features: np.ndarray) -> np.ndarray:
+        # COO (students x answers) @ features, one bincount per output column
+        if not len(rows_array):
+            return np.zeros((n, features.shape[1]))
+        gathered = features[cols_array]
+        return np.column_stack([
+            np.bincount(rows_array, weights=gathered[:, j], minlength=n)
+            for j in range(features.shape[1])
+        ])
+
+    return spmm(trait_features), spmm(style_features)
+
+
+def analyze_assessment_batch(answer_sets: Sequence[Dict[str, Any]], kb: KnowledgeBase,
+                             fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Analyze many students' answers at once; results are in input order, limited to ``fields`` when given"""
+    wanted = set(select_assessment_sections(fields))
+    traits = list(kb.traits)
+    if not answer_sets:
+        return []
+    raw, style_counts = _encode_answers(answer_sets, kb.answer_matcher)
+
+    # Column-wise normalization: every student's traits relative to their own top trait
+    max_scores = raw.max(axis=1, keepdims=True)
+    max_scores[max_scores <= 0] = 1
+    normalized = np.rint(raw / max_scores * 100)
+    n = len(answer_sets)
+    score_rows = normalized.astype(np.int64).tolist()
+
+    # Stable sorts keep knowledge base order between equal scores
+    if wanted & {"personalityTraits", "personalityType", "strengths"}:
+        descending = np.argsort(-normalized, axis=1, kind="stable").tolist()
+    else:
+        descending = [None] * n
+    if "developmentAreas" in wanted:
+        ascending = np.argsort(normalized, axis=1, kind="stable").tolist()
+    else:
+        ascending = [None] * n
+    if "learningStyle" in wanted:
+        primary_styles = style_counts.argmax(axis=1)
+
+    career_cache: Dict[Tuple[int, ...], List[Dict[str, Any]]] = {}
+    if "careerMatches" in wanted:
+        career_indices, career_scores = kb.career_matcher.score_matrix(normalized, top_k=5)
+        career_keys = map(tuple, np.hstack([career_indices, career_scores]).astype(np.int64).tolist())
+    else:
+        career_keys = [None] * n
+
+    skill_cache: Dict[Tuple[bool, ...], List[Dict[str, Any]]] = {}
+    if "skillRecommendations" in wanted:
+        skill_traits = [trait for trait in kb.trait_skills if trait in traits]
+        skill_mask = normalized[:, [traits.index(trait) for trait in skill_traits]] >= TRAIT_SKILL_THRESHOLD
+        skill_masks = map(tuple, skill_mask.tolist())
+    else:
+        skill_masks = [None] * n
+
+    names = [trait.replace("_", " ").title() for trait in traits]
+    descriptions = [kb.trait_descriptions.get(trait, "A valuable professional trait") for trait in traits]
+    types = kb.personality_types
+    learning_styles = kb.learning_styles
+
+    results = []
+    rows = zip(score_rows, descending, ascending, skill_masks, career_keys)
+    for i, (scores, order, low_order, mask, career_key) in enumerate(rows):
+        result = {}
+        if "personalityTraits" in wanted:
+            result["personalityTraits"] = [
+                {"name": names[t], "score": scores[t], "description": descriptions[t]}
+                for t in order[:4]
+            ]
+        if "personalityType" in wanted:
+            result["personalityType"] = types.get(traits[order[0]], types["analytical"])
+        if "careerMatches" in wanted:
+            # Students with the same answers share skill and career lists
+            careers = career_cache.get(career_key)
+            if careers is None:
+                careers = career_cache[career_key] = kb.career_matcher.matches(career_indices[i], career_scores[i])
+            result["careerMatches"] = careers
+        if "skillRecommendations" in wanted:
+            skills = skill_cache.get(mask)
+            if skills is None:
+                skills = skill_cache[mask] = _skills_for_traits(kb, [t for t, on in zip(skill_traits, mask) if on])
+            result["skillRecommendations"] = skills
+        if "learningStyle" in wanted:
+            result["learningStyle"] = learning_styles.get(STYLES[primary_styles[i]], learning_styles["hands-on"])
+        if "strengths" in wanted:
+            result["strengths"] = [kb.strength_descriptions[traits[t]] for t in order[:3]]
+        if "developmentAreas" in wanted:
+            result["developmentAreas"] = [
+                kb.development_descriptions[traits[t]] for t in low_order[:2] if scores[t] < DEVELOPMENT_THRESHOLD
+            ]
+        if "traitScores" in wanted:
+            result["traitScores"] = dict(zip(traits, scores))
+        results.append(result)
+    return results
+
+
+def analyze_assessment_responses(answers: Dict[str, Any], kb: KnowledgeBase,
+                                 fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Analyze one student's assessment responses"""
+    return analyze_assessment_batch([answers], kb, fields)[0]
+
+
+def _skills_for_traits(kb: KnowledgeBase, strong_traits: List[str]) -> List[Dict[str, Any]]:
+    """Skill recommendations for a set of strong traits, deduplicated, top 8"""
+    unique_skills = []
+    seen = set()
+    for trait in strong_traits:
+        for skill in kb.trait_skills[trait]:
+            if skill["name"] not in seen:
+                unique_skills.append(skill)
+                seen.add(skill["name"])
+    return unique_skills[:8]
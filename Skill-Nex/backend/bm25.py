@@ -0,0 +1,151 @@
+"""
+In-process lexical retrieval.
+
+BM25Index is an inverted index over short documents: term -> postings of
+(document, term frequency). A query walks only the postings of its own
+terms, so exact names such as "Kubernetes" or "PostgreSQL" are found
+without computing an embedding. Documents carry the same metadata as their
+Chroma counterparts, and ``where`` clauses use Chroma's operator syntax,
+so one filter serves both retrievers.
+
+reciprocal_rank_fusion merges ranked lists from different retrievers by
+rank alone, so BM25 scores and vector distances never need a common scale.
+"""
+
+import heapq
+import math
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+# A title term counts like this many body occurrences, so "Kubernetes" ranks the
+# Kubernetes document above documents that merely mention it
+TITLE_WEIGHT = 3
+# Added when a comma-separated query phrase is exactly a document's title
+EXACT_TITLE_BONUS = 10.0
+# Rank offset for reciprocal rank fusion (Cormack et al.)
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms; keeps names like node.js, c++ and c# intact"""
+    return _TOKEN.findall(str(text).lower())
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma ``where`` clause against one metadata dict"""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            if key not in metadata:
+                # Chroma skips documents that lack the key, even for $ne and $nin
+                return False
+            value = metadata[key]
+            for op, operand in condition.items():
+                if not _OPERATORS[op](value, operand):
+                    return False
+        elif metadata.get(key, _MISSING) != condition:
+            return False
+    return True
+
+
+_MISSING = object()
+_OPERATORS = {
+    "$eq": lambda v, o: v == o,
+    "$ne": lambda v, o: v != o,
+    "$gt": lambda v, o: v > o,
+    "$gte": lambda v, o: v >= o,
+    "$lt": lambda v, o: v < o,
+    "$lte": lambda v, o: v <= o,
+    "$in": lambda v, o: v in o,
+    "$nin": lambda v, o: v not in o,
+}
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of documents"""
+
+    def __init__(self, k1: float = K1, b: float = B):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.norms: List[float] = []
+        self.by_title: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[Dict[str, Any]],
+              titles: Optional[Sequence[str]] = None) -> "BM25Index":
+        index = cls()
+        titles = titles or [""] * len(ids)
+        for doc, (doc_id, text, metadata, title) in enumerate(zip(ids, documents, metadatas, titles)):
+            terms = tokenize(text) + tokenize(title) * TITLE_WEIGHT
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                index.postings.setdefault(term, []).append((doc, tf))
+            if title:
+                index.by_title.setdefault(title.strip().lower(), doc)
+            index.ids.append(doc_id)
+            index.metadatas.append(metadata)
+            index.lengths.append(len(terms))
+
+        n = len(index.ids)
+        average = (sum(index.lengths) / n if n else 0.0) or 1.0
+        # Length normalization depends only on the document, so it is computed once
+        index.norms = [index.k1 * (1 - index.b + index.b * length / average) for length in index.lengths]
+        # Lucene's idf form, which stays positive for terms found in most documents
+        index.idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in index.postings.items()
+        }
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, n_results: int = 10, where: Optional[Dict[str, Any]] = None) -> List[Tuple[int, float]]:
+        """(document index, score) pairs, best first, for documents matching ``where``"""
+        scores: Dict[int, float] = {}
+        norms = self.norms
+        boost = self.k1 + 1
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc, tf in postings:
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * boost / (tf + norms[doc])
+        for phrase in query.split(","):
+            doc = self.by_title.get(phrase.strip().lower())
+            if doc is not None:
+                scores[doc] = scores.get(doc, 0.0) + EXACT_TITLE_BONUS
+
+        candidates = scores.items()
+        if where:
+            candidates = [item for item in candidates if matches_where(self.metadatas[item[0]], where)]
+        return heapq.nsmallest(n_results, candidates, key=lambda item: (-item[1], item[0]))
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: each list adds 1 / (k + rank) to every id it contains"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
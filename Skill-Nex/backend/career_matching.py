@@ -0,0 +1,82 @@
+"""
+Career matching as a matrix product.
+
+Each career in the knowledge base has trait weights, a bonus and a cap.
+These are compiled into a careers-by-traits weight matrix. Scoring a student
+is then one dot product of their normalized (0-100) trait vector against
+every career, followed by a top-k selection. Scoring a whole class is one
+matrix product. Adding careers only adds rows to the matrix.
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+def compile_career_matrix(careers: List[Dict[str, Any]], traits: Sequence[str]) -> Dict[str, np.ndarray]:
+    """Build the weight matrix and per-career bonus/cap vectors for the snapshot"""
+    trait_index = {trait: i for i, trait in enumerate(traits)}
+    weights = np.zeros((len(careers), len(traits)), dtype=np.float32)
+    bonus = np.zeros(len(careers), dtype=np.float32)
+    cap = np.full(len(careers), 100, dtype=np.float32)
+
+    for row, career in enumerate(careers):
+        trait_weights = career.get("traitWeights")
+        if not trait_weights:
+            raise ValueError(f"Career '{career.get('title')}' has no traitWeights")
+        for trait, weight in trait_weights.items():
+            if trait not in trait_index:
+                raise ValueError(f"Career '{career.get('title')}' weights unknown trait '{trait}'")
+            weights[row, trait_index[trait]] = weight
+        bonus[row] = career.get("bonus", 0)
+        cap[row] = career.get("maxMatch", 100)
+
+    return {"weights": weights, "bonus": bonus, "cap": cap}
+
+
+class CareerMatcher:
+    """Scores trait vectors against every career in one matrix operation"""
+
+    # Fields copied into each match; scoring parameters stay internal
+    PUBLIC_FIELDS = ("title", "description", "keySkills", "salaryRange", "growthRate")
+
+    def __init__(self, careers: List[Dict[str, Any]], traits: Sequence[str], matrix: Dict[str, np.ndarray]):
+        self.traits = list(traits)
+        self.weights = matrix["weights"]
+        self.bonus = matrix["bonus"]
+        self.cap = matrix["cap"]
+        self.profiles = [{field: career[field] for field in self.PUBLIC_FIELDS if field in career} for career in careers]
+
+    def trait_vector(self, trait_scores: Dict[str, float]) -> np.ndarray:
+        return np.array([trait_scores.get(trait, 0) for trait in self.traits], dtype=np.float32)
+
+    def score_matrix(self, trait_matrix: np.ndarray, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score an (students x traits) matrix against all careers.
+        Returns (indices, scores), both (students x k), best match first.
+        """
+        trait_matrix = np.atleast_2d(np.asarray(trait_matrix, dtype=np.float32))
+        scores = np.minimum(np.rint(trait_matrix @ self.weights.T + self.bonus), self.cap)
+
+        k = min(top_k, scores.shape[1])
+        if k < scores.shape[1]:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        # Stable order: higher score first, then knowledge base order
+        order = np.lexsort((candidates, -candidate_scores), axis=1)
+        indices = np.take_along_axis(candidates, order, axis=1)
+        return indices, np.take_along_axis(candidate_scores, order, axis=1)
+
+    def matches(self, indices: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        """Career dicts for one row of score_matrix output"""
+        return [
+            dict(self.profiles[index], matchPercentage=int(score))
+            for index, score in zip(indices.tolist(), scores.tolist())
+        ]
+
+    def match(self, trait_scores: Dict[str, float], top_k: int = 5) -> List[Dict[str, Any]]:
+        """Top careers for one student's normalized trait scores"""
+        indices, scores = self.score_matrix(self.trait_vector(trait_scores), top_k)
+        return self.matches(indices[0], scores[0])
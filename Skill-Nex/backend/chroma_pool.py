@@ -0,0 +1,178 @@
+"""
+Pooled client for a standalone Chroma server.
+
+By default, every API process embeds its own Chroma, so index memory and
+CPU grow with the web workers. With SKILLNEX_CHROMA_URL set, the service
+talks to one Chroma server instead (``chroma run --path DIR --port 8000``).
+Index serving can then be scaled and restarted separately from the API.
+
+Chroma's HTTP client sends every call through one ``requests.Session``.
+``connect`` mounts a pooled keep-alive adapter on that session and gives
+every request a default timeout. The adapter retries connection failures
+and 502/503/504 answers with jittered exponential backoff. Every call the
+service makes (get, query, count, upsert, delete) is idempotent, so POSTs
+are retried as well.
+
+ServerHealth checks the server's heartbeat on a background thread. After
+an outage it calls ``on_recover``, so the service can reopen its
+collections and reseed them if the server came back empty.
+"""
+
+import inspect
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import chromadb
+import requests
+from chromadb.config import Settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connections kept open to the server, per worker process
+DEFAULT_POOL_SIZE = int(os.environ.get("SKILLNEX_CHROMA_POOL", 10))
+# Seconds to connect, and to wait for a response
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("SKILLNEX_CHROMA_CONNECT_TIMEOUT", 2))
+DEFAULT_READ_TIMEOUT = float(os.environ.get("SKILLNEX_CHROMA_TIMEOUT", 10))
+DEFAULT_RETRIES = int(os.environ.get("SKILLNEX_CHROMA_RETRIES", 3))
+# Backoff before retry n is backoff * 2**(n-1) plus up to ``jitter`` seconds at random
+DEFAULT_BACKOFF = 0.1
+DEFAULT_JITTER = 0.1
+# Seconds between heartbeats
+DEFAULT_HEARTBEAT_INTERVAL = float(os.environ.get("SKILLNEX_CHROMA_HEARTBEAT", 10))
+
+RETRY_STATUSES = (502, 503, 504)
+# backoff_jitter arrived in urllib3 2.0; older versions back off without it
+_RETRY_JITTER = "backoff_jitter" in inspect.signature(Retry.__init__).parameters
+
+
+def pooled_adapter(pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES,
+                   backoff: float = DEFAULT_BACKOFF, jitter: float = DEFAULT_JITTER) -> HTTPAdapter:
+    """Keep-alive connection pool that retries failed connections and gateway errors"""
+    options = {"backoff_jitter": jitter} if _RETRY_JITTER else {}
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        # None retries every method; the service only makes idempotent calls
+        allowed_methods=None,
+        raise_on_status=False,
+        **options,
+    )
+    return HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=retry)
+
+
+def _with_default_timeout(request: Callable[..., requests.Response],
+                          timeout: Tuple[float, float]) -> Callable[..., requests.Response]:
+    def send(method, url, **kwargs):
+        kwargs.setdefault("timeout", timeout)
+        return request(method, url, **kwargs)
+    return send
+
+
+def connect(url: str, pool_size: int = DEFAULT_POOL_SIZE, connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+            read_timeout: float = DEFAULT_READ_TIMEOUT, retries: int = DEFAULT_RETRIES):
+    """
+    Chroma client for the server at ``url`` (e.g. http://localhost:8000), using
+    a pooled, retrying session with default timeouts
+    """
+    parsed = urlparse(url if "://" in url else f"http://{url}")
+    ssl = parsed.scheme == "https"
+    port = parsed.port or (443 if ssl else 8000)
+    client = chromadb.HttpClient(
+        host=parsed.hostname or "localhost", port=str(port), ssl=ssl,
+        settings=Settings(anonymized_telemetry=False, allow_reset=True)
+    )
+    # chromadb==0.4.22 keeps its requests.Session on the server API object
+    session = getattr(getattr(client, "_server", None), "_session", None)
+    if not isinstance(session, requests.Session):
+        raise RuntimeError(
+            f"chromadb {chromadb.__version__} does not expose its HTTP session; "
+            "the pooled Chroma client needs chromadb==0.4.22"
+        )
+    adapter = pooled_adapter(pool_size, retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.request = _with_default_timeout(session.request, (connect_timeout, read_timeout))
+    # Every body the client sends is JSON; newer servers reject it without the header
+    session.headers.setdefault("Content-Type", "application/json")
+    return client
+
+
+class ServerHealth:
+    """Periodic heartbeats against the Chroma server, with the transitions between up and down"""
+
+    def __init__(self, client, interval: float = DEFAULT_HEARTBEAT_INTERVAL,
+                 on_recover: Optional[Callable[[], None]] = None):
+        self.client = client
+        self.interval = interval
+        self.on_recover = on_recover
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        self.last_check: Optional[float] = None
+        self.latency_ms: Optional[float] = None
+        self.stats = {"checks": 0, "failures": 0, "outages": 0, "recoveries": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self) -> bool:
+        """One heartbeat; runs ``on_recover`` when the server answers again after an outage"""
+        start = time.perf_counter()
+        try:
+            self.client.heartbeat()
+        except Exception as e:
+            with self._lock:
+                self.stats["checks"] += 1
+                self.stats["failures"] += 1
+                if self.healthy:
+                    self.stats["outages"] += 1
+                    print(f"Chroma server unreachable: {e}")
+                self.healthy = False
+                self.last_error = str(e)
+                self.last_check = time.time()
+            return False
+
+        with self._lock:
+            recovered = not self.healthy
+            self.stats["checks"] += 1
+            if recovered:
+                self.stats["recoveries"] += 1
+            self.healthy = True
+            self.last_check = time.time()
+            self.latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        if recovered:
+            print("Chroma server reachable again")
+            if self.on_recover is not None:
+                try:
+                    self.on_recover()
+                except Exception as e:
+                    print(f"Could not restore collections after the Chroma server recovered: {e}")
+        return True
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="chroma-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, healthy=self.healthy, lastError=self.last_error,
+                        lastCheck=self.last_check, latencyMs=self.latency_ms)
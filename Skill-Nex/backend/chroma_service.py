@@ -2,343 +2,474 @@ import chromadb
 from chromadb.config import Settings
 import os
 import json
+import re
+import threading
 from typing import List, Dict, Any
+import numpy as np
+from bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+from chroma_pool import ServerHealth, connect
+from embeddings import create_embedding_function
+from knowledge_base import KnowledgeBase, knowledge_base
+from memory_budget import deep_sizeof
+from portfolio_pipeline import career_skills, portfolio_pipeline
+from shared_tables import SharedCollection, SharedTables, attach_or_publish, collection_arrays
+
+# Chroma's own HNSW defaults, spelled out so each collection can override them
+DEFAULT_HNSW = {"space": "l2", "M": 16, "construction_ef": 100, "search_ef": 10}
+HNSW_SPACES = ("l2", "ip", "cosine")
+
+# Experience levels; a skill's level is the earliest career-path tier it appears in
+LEVELS = ("Beginner", "Intermediate", "Advanced")
+TIER_LEVELS = {"essential": 0, "recommended": 1, "advanced": 2}
+
+# auto: short skill-list queries use BM25 alone, everything else fuses BM25 with vectors
+RETRIEVAL_MODES = ("auto", "hybrid", "vector", "lexical")
+LEXICAL_MAX_TERMS = 24
+# The lexical fast path must find this many candidates, otherwise vectors are consulted too
+LEXICAL_MIN_HITS = 3
+
+# Bytes per in-process Chroma record beyond its vectors and HNSW links: document, metadata, ids
+RECORD_OVERHEAD = 512
+
+COLLECTIONS = {
+    "portfolio_analysis": "Portfolio analysis and recommendations",
+    "skills_database": "Skills and competencies database",
+    "careers_database": "Career paths and requirements",
+}
+
+
+def load_hnsw_config(raw: str = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-collection HNSW settings from SKILLNEX_HNSW_CONFIG, given as inline JSON
+    or a path to a JSON file, e.g. {"default": {"space": "cosine"}, "skills_database": {"M": 32}}
+    """
+    raw = raw if raw is not None else os.environ.get("SKILLNEX_HNSW_CONFIG", "")
+    if not raw.strip():
+        return {}
+    if not raw.lstrip().startswith("{"):
+        with open(raw) as f:
+            raw = f.read()
+    return json.loads(raw)
+
+
+def resolve_hnsw(config: Dict[str, Dict[str, Any]], collection: str) -> Dict[str, Any]:
+    """Defaults, then the config's "default" entry, then the collection's own entry"""
+    hnsw = dict(DEFAULT_HNSW)
+    hnsw.update(config.get("default", {}))
+    hnsw.update(config.get(collection, {}))
+    unknown = set(hnsw) - set(DEFAULT_HNSW)
+    if unknown:
+        raise ValueError(f"Unknown HNSW settings for '{collection}': {', '.join(sorted(unknown))}")
+    if hnsw["space"] not in HNSW_SPACES:
+        raise ValueError(f"HNSW space for '{collection}' must be one of {', '.join(HNSW_SPACES)}")
+    for key in ("M", "construction_ef", "search_ef"):
+        if not isinstance(hnsw[key], int) or hnsw[key] < 1:
+            raise ValueError(f"HNSW '{key}' for '{collection}' must be a positive integer")
+    return hnsw
+
+
+def path_flag(career: str) -> str:
+    """Metadata key holding a skill's level on one career path; Chroma metadata cannot hold lists or maps"""
+    return "path_" + re.sub(r"[^a-z0-9]+", "_", career.lower()).strip("_")
+
+
+def hnsw_metadata(hnsw: Dict[str, Any]) -> Dict[str, Any]:
+    """Collection metadata keys Chroma reads its index settings from"""
+    return {f"hnsw:{key}": value for key, value in hnsw.items()}
+
 
 class ChromaDBService:
-    def __init__(self, persist_directory: str = "../chroma_db"):
-        """Initialize ChromaDB client - using in-memory for speed and stability"""
-        # Use in-memory client to avoid file system issues and improve speed
-        self.client = chromadb.Client(
-            Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
+    def __init__(self, persist_directory: str = "../chroma_db", hnsw_config: Dict[str, Dict[str, Any]] = None,
+                 embedding_function=None, retrieval_mode: str = None, shared_tables: str = None,
+                 server_url: str = None):
+        """Initialize ChromaDB client - in-memory, or a standalone server's when SKILLNEX_CHROMA_URL is set"""
+        self.server_url = server_url if server_url is not None else os.environ.get("SKILLNEX_CHROMA_URL", "")
+        self.server_health: ServerHealth = None
+        if self.server_url:
+            # One index server for every worker, over a pooled keep-alive connection
+            self.client = connect(self.server_url)
+        else:
+            # Use in-memory client to avoid file system issues and improve speed
+            self.client = chromadb.Client(
+                Settings(
+                    anonymized_telemetry=False,
+                    allow_reset=True
+                )
             )
-        )
+        self.hnsw_config = hnsw_config if hnsw_config is not None else load_hnsw_config()
+        self.hnsw = {name: resolve_hnsw(self.hnsw_config, name) for name in COLLECTIONS}
+        # Local embeddings only; Chroma's default would download a model on first query
+        self.embedding_function = embedding_function or create_embedding_function()
+        self.retrieval_mode = retrieval_mode or os.environ.get("SKILLNEX_RETRIEVAL", "auto")
+        if self.retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Retrieval mode must be one of {', '.join(RETRIEVAL_MODES)}")
+        self.retrieval_stats = {"lexical": 0, "hybrid": 0, "vector": 0}
+        self._stats_lock = threading.Lock()
+        self._lexical: Dict[str, BM25Index] = {}
+        self._lexical_bytes: Dict[str, int] = {}
+        
+        # Shared mode: skills and careers come from one memory-mapped file for all workers
+        self.shared_path = shared_tables if shared_tables is not None else os.environ.get("SKILLNEX_SHARED_TABLES", "")
+        self.shared_tables: SharedTables = None
         
         # Get or create collections
-        try:
-            self.portfolio_collection = self.client.get_collection("portfolio_analysis")
-        except:
-            self.portfolio_collection = self.client.create_collection(
-                name="portfolio_analysis",
-                metadata={"description": "Portfolio analysis and recommendations"}
-            )
-        
-        try:
-            self.skills_collection = self.client.get_collection("skills_database")
-        except:
-            self.skills_collection = self.client.create_collection(
-                name="skills_database",
-                metadata={"description": "Skills and competencies database"}
-            )
-        
-        try:
-            self.careers_collection = self.client.get_collection("careers_database")
-        except:
-            self.careers_collection = self.client.create_collection(
-                name="careers_database",
-                metadata={"description": "Career paths and requirements"}
-            )
+        self._seed_lock = threading.Lock()
+        self._seeded_hash = None
+        self._open_collections()
+        if self.server_url:
+            self.server_health = ServerHealth(self.client, on_recover=self._restore)
+            self.server_health.start()
     
-    def analyze_portfolio(self, projects: List[Dict[str, Any]], skills: List[str], achievements: str) -> Dict[str, Any]:
-        """
-        Analyze student portfolio using ChromaDB
-        Returns comprehensive analysis with recommendations
-        """
-        
-        # Combine all portfolio data into a searchable text
-        portfolio_text = f"""
-        Projects: {json.dumps(projects)}
-        Skills: {', '.join(skills)}
-        Achievements: {achievements}
-        """
-        
-        # Query similar portfolios and get recommendations
-        try:
-            # Search for similar skills in the database
-            skills_results = self.skills_collection.query(
-                query_texts=[', '.join(skills)],
-                n_results=10
-            )
-            
-            # Search for relevant career paths
-            career_results = self.careers_collection.query(
-                query_texts=[portfolio_text],
-                n_results=5
-            )
-            
-            # Analyze project complexity and impact
-            project_analysis = self._analyze_projects(projects)
-            
-            # Get skill gap analysis
-            skill_gaps = self._analyze_skill_gaps(skills, skills_results)
-            
-            # Generate portfolio strength score
-            strength_score = self._calculate_portfolio_strength(projects, skills, achievements)
-            
-            # Get improvement recommendations
-            recommendations = self._generate_recommendations(
-                project_analysis, 
-                skill_gaps, 
-                career_results
+    def _open_collections(self) -> None:
+        self.portfolio_collection = self._collection("portfolio_analysis")
+        if self.shared_path:
+            # Replaced by SharedCollection views when seeding attaches to the file
+            if self.shared_tables is None:
+                self.skills_collection = self.careers_collection = None
+        else:
+            self.skills_collection = self._collection("skills_database")
+            self.careers_collection = self._collection("careers_database")
+    
+    def _restore(self) -> None:
+        """After a server outage: reopen the collections and reseed them, in case the server came back empty"""
+        with self._seed_lock:
+            self._open_collections()
+            if not self.shared_path:
+                self._seeded_hash = None
+    
+    def _collection(self, name: str):
+        """Open a collection, creating it with its configured HNSW settings"""
+        metadata = hnsw_metadata(self.hnsw[name])
+        # A Chroma server reports a missing collection as a generic error, so look first
+        if name not in {c.name for c in self.client.list_collections()}:
+            # Another worker on the same server may create it first, with the same settings
+            return self.client.get_or_create_collection(
+                name=name,
+                metadata={"description": COLLECTIONS[name], **metadata},
+                embedding_function=self.embedding_function
             )
-            
-            return {
-                "portfolioStrength": strength_score,
-                "projectAnalysis": project_analysis,
-                "skillGaps": skill_gaps,
-                "recommendations": recommendations,
-                "careerAlignment": self._analyze_career_alignment(career_results),
-                "industryDemand": self._get_industry_demand(skills),
-                "competitiveAnalysis": self._get_competitive_analysis(strength_score)
-            }
-            
-        except Exception as e:
-            print(f"Error analyzing portfolio: {e}")
-            return self._get_fallback_analysis(projects, skills, achievements)
+        collection = self.client.get_collection(name, embedding_function=self.embedding_function)
+        # Index settings are fixed when a collection is created
+        existing = {key: (collection.metadata or {}).get(key) for key in metadata}
+        if existing != metadata:
+            print(f"Collection '{name}' was built with {existing}; rebuild it to apply {metadata}")
+        return collection
     
-    def _analyze_projects(self, projects: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Analyze project complexity, diversity, and impact"""
-        if not projects:
-            return {
-                "totalProjects": 0,
-                "complexity": "Beginner",
-                "diversity": 0,
-                "impactScore": 0,
-                "highlights": []
-            }
-        
-        # Calculate metrics
-        total_projects = len(projects)
-        
-        # Analyze project diversity (different tech stacks)
-        tech_stacks = set()
-        for project in projects:
-            if 'technologies' in project:
-                tech_stacks.update(project['technologies'])
-        
-        diversity_score = min(len(tech_stacks) / 10 * 100, 100)
-        
-        # Determine complexity based on project count and tech diversity
-        if total_projects >= 5 and diversity_score > 60:
-            complexity = "Advanced"
-        elif total_projects >= 3 and diversity_score > 40:
-            complexity = "Intermediate"
-        else:
-            complexity = "Beginner"
-        
-        # Calculate impact score
-        impact_score = min((total_projects * 15 + diversity_score) / 2, 100)
-        
-        # Extract highlights
-        highlights = []
-        for project in projects[:3]:  # Top 3 projects
-            highlights.append({
-                "name": project.get('name', 'Unnamed Project'),
-                "description": project.get('description', ''),
-                "technologies": project.get('technologies', [])
-            })
-        
-        return {
-            "totalProjects": total_projects,
-            "complexity": complexity,
-            "diversity": round(diversity_score, 1),
-            "impactScore": round(impact_score, 1),
-            "highlights": highlights,
-            "techStack": list(tech_stacks)
-        }
+    def seed_from_knowledge_base(self, kb: KnowledgeBase) -> None:
+        """Load skills and careers with filterable metadata; runs again when the knowledge base changes"""
+        with self._seed_lock:
+            if self._seeded_hash == kb.source_hash:
+                return
+            if self.shared_path:
+                self._attach_shared(kb)
+            else:
+                self._replace(self.skills_collection, *self._skill_documents(kb))
+                self._replace(self.careers_collection, *self._career_documents(kb))
+            self._seeded_hash = kb.source_hash
     
-    def _analyze_skill_gaps(self, current_skills: List[str], skills_results: Any) -> List[Dict[str, Any]]:
-        """Identify skill gaps based on industry requirements"""
-        
-        # Common in-demand skills by category
-        in_demand_skills = {
-            "Frontend": ["React", "Vue", "Angular", "TypeScript", "Next.js", "Tailwind CSS"],
-            "Backend": ["Node.js", "Python", "Java", "Go", "Django", "Express"],
-            "Database": ["MongoDB", "PostgreSQL", "MySQL", "Redis", "Firebase"],
-            "DevOps": ["Docker", "Kubernetes", "CI/CD", "AWS", "Azure", "GCP"],
-            "Mobile": ["React Native", "Flutter", "Swift", "Kotlin"],
-            "AI/ML": ["TensorFlow", "PyTorch", "Scikit-learn", "NLP", "Computer Vision"],
-            "Other": ["Git", "REST APIs", "GraphQL", "Testing", "Agile"]
+    def _attach_shared(self, kb: KnowledgeBase) -> None:
+        """Attach to the shared tables for this knowledge base and embedding model, publishing them if needed"""
+        documents = {"skills_database": self._skill_documents(kb), "careers_database": self._career_documents(kb)}
+        fn = self.embedding_function
+        signature = {
+            "knowledgeBase": kb.source_hash,
+            "embedding": f"{type(fn).__name__}:{getattr(fn, 'dim', '')}:{getattr(fn, 'model_dir', '')}",
         }
         
-        skill_gaps = []
-        current_skills_lower = [s.lower() for s in current_skills]
-        
-        for category, skills in in_demand_skills.items():
-            missing_skills = [s for s in skills if s.lower() not in current_skills_lower]
-            if missing_skills:
-                skill_gaps.append({
-                    "category": category,
-                    "missingSkills": missing_skills[:3],  # Top 3 missing skills
-                    "priority": "High" if len(missing_skills) > 4 else "Medium" if len(missing_skills) > 2 else "Low"
-                })
-        
-        return skill_gaps
+        def build():
+            arrays, collections = {}, {}
+            for name, (ids, docs, metas, titles) in documents.items():
+                arrays.update(collection_arrays(name, np.asarray(fn(docs), dtype=np.float32)))
+                collections[name] = {"ids": ids, "documents": docs, "metadatas": metas, "titles": titles}
+            return arrays, {"collections": collections}
+        
+        self.shared_tables, published = attach_or_publish(self.shared_path, signature, build)
+        print(f"{'Published' if published else 'Attached to'} shared tables {self.shared_path} "
+              f"({self.shared_tables.nbytes / 2**20:.1f} MB)")
+        for name, attr in (("skills_database", "skills_collection"), ("careers_database", "careers_collection")):
+            collection = SharedCollection(self.shared_tables, name, fn, self.hnsw[name]["space"])
+            setattr(self, attr, collection)
+            entry = self.shared_tables.meta["collections"][name]
+            self._set_lexical(name, BM25Index.build(entry["ids"], entry["documents"], entry["metadatas"], entry["titles"]))
     
-    def _calculate_portfolio_strength(self, projects: List[Dict], skills: List[str], achievements: str) -> Dict[str, Any]:
-        """Calculate overall portfolio strength score"""
-        
-        # Project score (0-40 points)
-        project_score = min(len(projects) * 8, 40)
-        
-        # Skills score (0-30 points)
-        skills_score = min(len(skills) * 3, 30)
-        
-        # Achievements score (0-30 points)
-        achievement_score = min(len(achievements) / 10, 30) if achievements else 0
-        
-        total_score = project_score + skills_score + achievement_score
-        
-        # Determine rating
-        if total_score >= 80:
-            rating = "Excellent"
-            color = "#10B981"
-        elif total_score >= 60:
-            rating = "Good"
-            color = "#3B82F6"
-        elif total_score >= 40:
-            rating = "Average"
-            color = "#F59E0B"
-        else:
-            rating = "Needs Improvement"
-            color = "#EF4444"
-        
-        return {
-            "score": round(total_score, 1),
-            "rating": rating,
-            "color": color,
-            "breakdown": {
-                "projects": round(project_score, 1),
-                "skills": round(skills_score, 1),
-                "achievements": round(achievement_score, 1)
+    def _skill_documents(self, kb: KnowledgeBase):
+        """Ids, documents, metadata and titles of the skills collection"""
+        paths: Dict[str, Dict[str, int]] = {}
+        for career, path in kb.career_skill_map.items():
+            for tier, level in TIER_LEVELS.items():
+                for skill in path.get(tier, []):
+                    paths.setdefault(skill, {}).setdefault(career, level)
+        
+        leads_to: Dict[str, List[str]] = {}
+        for skill, entry in kb.skill_prerequisites.items():
+            for required in entry.get("requires", []):
+                leads_to.setdefault(required, []).append(skill)
+        
+        ids, documents, metadatas = [], [], []
+        depth: Dict[str, int] = {}
+        for skill in kb.skill_graph.names:
+            entry = kb.skill_prerequisites[skill]
+            requires = entry.get("requires", [])
+            # Topological order: prerequisites already have a depth
+            depth[skill] = 1 + max((depth[r] for r in requires), default=-1)
+            category = entry.get("category", "Other")
+            ids.append(f"skill:{skill}")
+            documents.append(
+                f"{skill}. {category} skill."
+                + (f" Builds on {', '.join(requires)}." if requires else "")
+                + (f" Leads to {', '.join(leads_to[skill])}." if skill in leads_to else "")
+                + (f" Used by {', '.join(paths[skill])}." if skill in paths else "")
+            )
+            on_paths = paths.get(skill, {})
+            metadata = {
+                "name": skill,
+                "key": skill.lower(),
+                "category": category,
+                # Earliest tier on any path; skills outside every path are levelled by prerequisite depth
+                "level_rank": min(on_paths.values()) if on_paths else min(depth[skill], len(LEVELS) - 1),
+                "weeks": entry.get("weeks", 1),
             }
-        }
+            metadata.update({path_flag(career): level for career, level in on_paths.items()})
+            metadatas.append(metadata)
+        return ids, documents, metadatas, [m["name"] for m in metadatas]
     
-    def _generate_recommendations(self, project_analysis: Dict, skill_gaps: List[Dict], career_results: Any) -> List[Dict[str, Any]]:
-        """Generate actionable recommendations"""
-        
-        recommendations = []
-        
-        # Project recommendations
-        if project_analysis['totalProjects'] < 3:
-            recommendations.append({
-                "type": "Projects",
-                "priority": "High",
-                "title": "Build More Projects",
-                "description": "Aim to have at least 3-5 substantial projects in your portfolio to demonstrate your skills.",
-                "action": "Start a new project using modern technologies"
-            })
-        
-        if project_analysis['diversity'] < 50:
-            recommendations.append({
-                "type": "Projects",
-                "priority": "Medium",
-                "title": "Diversify Your Tech Stack",
-                "description": "Expand your portfolio by working with different technologies and frameworks.",
-                "action": "Learn a new framework or technology"
+    def _career_documents(self, kb: KnowledgeBase):
+        """Ids, documents, metadata and titles of the careers collection"""
+        careers = {career["title"]: career for career in kb.careers}
+        ids, documents, metadatas = [], [], []
+        for title in dict.fromkeys(list(careers) + list(kb.career_skill_map)):
+            career = careers.get(title, {})
+            skills = career_skills(title, kb)
+            ids.append(f"career:{title}")
+            documents.append(f"{title}. {career.get('description', '')} Skills: {', '.join(skills)}.")
+            metadatas.append({
+                "title": title,
+                "industry": kb.industry_of.get(title, "Technology"),
+                "has_path": title in kb.career_skill_map,
             })
-        
-        # Skill recommendations
-        for gap in skill_gaps[:2]:  # Top 2 skill gaps
-            recommendations.append({
-                "type": "Skills",
-                "priority": gap['priority'],
-                "title": f"Learn {gap['category']} Technologies",
-                "description": f"Consider learning: {', '.join(gap['missingSkills'])}",
-                "action": f"Take a course in {gap['missingSkills'][0]}"
-            })
-        
-        # General recommendations
-        recommendations.append({
-            "type": "Portfolio",
-            "priority": "Medium",
-            "title": "Document Your Projects",
-            "description": "Ensure all projects have clear README files, screenshots, and live demos.",
-            "action": "Add documentation to your top 3 projects"
-        })
-        
-        return recommendations
+        return ids, documents, metadatas, [m["title"] for m in metadatas]
     
-    def _analyze_career_alignment(self, career_results: Any) -> List[Dict[str, Any]]:
-        """Analyze alignment with career paths"""
-        
-        # Default career alignments
+    def _replace(self, collection, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+                 titles: List[str]) -> None:
+        """Upsert the new documents, drop ones the knowledge base no longer has, rebuild the lexical index"""
+        stale = set(collection.get(include=[])["ids"]) - set(ids)
+        if stale:
+            collection.delete(ids=list(stale))
+        collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
+        self._set_lexical(collection.name, BM25Index.build(ids, documents, metadatas, titles))
+    
+    def _set_lexical(self, name: str, index: BM25Index) -> None:
+        self._lexical[name] = index
+        # Measured once per build; the index never changes afterwards
+        self._lexical_bytes[name] = deep_sizeof(index)
+    
+    def _count(self, mode: str) -> None:
+        """Bump one retrieval counter; searches run on many request threads at once"""
+        with self._stats_lock:
+            self.retrieval_stats[mode] += 1
+    
+    def _retrieval_counts(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self.retrieval_stats)
+    
+    def _search(self, collection, text: str, n_results: int, where: Dict[str, Any] = None,
+                skill_list: bool = False) -> Dict[str, Any]:
+        """
+        Lexical, vector or fused (reciprocal rank fusion) search over one collection.
+        Returns Chroma-style nested lists of ids and metadatas, plus similarities in [0, 1].
+        """
+        lexical = self._lexical.get(collection.name)
+        mode = self.retrieval_mode
+        if mode == "auto":
+            mode = "lexical" if skill_list and len(tokenize(text)) <= LEXICAL_MAX_TERMS else "hybrid"
+        if lexical is None:
+            mode = "vector"
+        
+        metadatas: Dict[str, Dict[str, Any]] = {}
+        similarities: Dict[str, float] = {}
+        rankings = []
+        if mode in ("lexical", "hybrid"):
+            hits = lexical.search(text, n_results, where)
+            top = hits[0][1] if hits else 1.0
+            ranking = []
+            for doc, score in hits:
+                doc_id = lexical.ids[doc]
+                ranking.append(doc_id)
+                metadatas[doc_id] = lexical.metadatas[doc]
+                similarities[doc_id] = score / top
+            rankings.append(ranking)
+            # The fast path only stands on its own when it found enough
+            if mode == "lexical" and (len(hits) >= min(n_results, LEXICAL_MIN_HITS) or self.retrieval_mode == "lexical"):
+                self._count("lexical")
+                return {"ids": [ranking], "metadatas": [[metadatas[i] for i in ranking]],
+                        "similarities": [[similarities[i] for i in ranking]]}
+            mode = "hybrid"
+        
+        results = collection.query(query_texts=[text], n_results=n_results, where=where, include=["metadatas", "distances"])
+        ranking = results["ids"][0]
+        for doc_id, metadata, distance in zip(ranking, results["metadatas"][0], results["distances"][0]):
+            metadatas[doc_id] = metadata
+            # Found by both retrievers: the stronger of the two signals, whichever ran first
+            similarities[doc_id] = max(similarities.get(doc_id, 0.0), self._similarity(collection, distance))
+        rankings.append(ranking)
+        self._count(mode)
+        
+        fused = [doc_id for doc_id, _ in reciprocal_rank_fusion(rankings)][:n_results]
+        return {"ids": [fused], "metadatas": [[metadatas[i] for i in fused]],
+                "similarities": [[similarities[i] for i in fused]]}
+    
+    @staticmethod
+    def _similarity(collection, distance: float) -> float:
+        space = (collection.metadata or {}).get("hnsw:space", DEFAULT_HNSW["space"])
+        # Unit vectors: squared L2 is 2 - 2cos; cosine and ip distances are 1 - cos
+        return max(1 - distance / 2 if space == "l2" else 1 - distance, 0.0)
+    
+    def _check_server(self) -> None:
+        if self.server_health is not None and not self.server_health.healthy:
+            # Fail fast while down; the heartbeat notices when the server is back
+            raise RuntimeError(f"Chroma server {self.server_url} is unreachable: {self.server_health.last_error}")
+    
+    def add_portfolios(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Upsert analyzed portfolios, embedding the whole batch in one call"""
+        self._check_server()
+        self.portfolio_collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
+    
+    def prune_portfolios(self, max_entries: int, created_before: float = None) -> int:
+        """Delete portfolios analyzed before ``created_before``, then the oldest beyond ``max_entries``; returns how many"""
+        self._check_server()
+        collection = self.portfolio_collection
+        before = collection.count()
+        if created_before is not None:
+            collection.delete(where={"created_at": {"$lt": created_before}})
+        excess = collection.count() - max_entries
+        if excess > 0:
+            entries = collection.get(include=["metadatas"])
+            oldest = sorted(zip(entries["ids"], entries["metadatas"]), key=lambda e: e[1].get("created_at", 0))
+            collection.delete(ids=[doc_id for doc_id, _ in oldest[:excess]])
+        return before - collection.count()
+    
+    def _record_bytes(self, name: str) -> int:
+        """Rough bytes per in-process record: the vector in the index and its buffer, HNSW links, the rest"""
+        dim = getattr(self.embedding_function, "dim", 384)
+        return dim * 4 * 2 + self.hnsw[name]["M"] * 2 * 4 + RECORD_OVERHEAD
+    
+    def memory_usage(self) -> Dict[str, int]:
+        """Estimated bytes this worker holds for retrieval; collections on a Chroma server cost it nothing"""
+        usage = {"lexicalIndexes": sum(self._lexical_bytes.values()), "vectorCollections": 0, "portfolioIndex": 0}
+        if self.server_url:
+            return usage
+        for collection in (self.skills_collection, self.careers_collection):
+            # Shared tables are mapped, not held by this worker
+            if collection is not None and not isinstance(collection, SharedCollection):
+                usage["vectorCollections"] += collection.count() * self._record_bytes(collection.name)
+        usage["portfolioIndex"] = self.portfolio_collection.count() * self._record_bytes("portfolio_analysis")
+        return usage
+    
+    def evict_portfolios(self, nbytes: int) -> int:
+        """
+        Drop the oldest indexed portfolios to free about ``nbytes``; returns how
+        many were dropped. HNSW reuses deleted slots rather than shrinking.
+        """
+        drop = -(-nbytes // self._record_bytes("portfolio_analysis"))
+        return self.prune_portfolios(max(self.portfolio_collection.count() - drop, 0))
+    
+    def similar_portfolios(self, text: str, n_results: int, where: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Nearest analyzed portfolios to ``text``, as id, metadata and similarity in [0, 1]"""
+        self._check_server()
+        collection = self.portfolio_collection
+        n_results = min(n_results, collection.count())
+        if n_results < 1:
+            return []
+        results = collection.query(query_texts=[text], n_results=n_results, where=where, include=["metadatas", "distances"])
         return [
-            {
-                "career": "Full Stack Developer",
-                "alignment": 85,
-                "matchingSkills": ["React", "Node.js", "Database"],
-                "missingSkills": ["Docker", "AWS"]
-            },
-            {
-                "career": "Frontend Developer",
-                "alignment": 90,
-                "matchingSkills": ["React", "TypeScript", "CSS"],
-                "missingSkills": ["Testing", "Performance Optimization"]
-            },
-            {
-                "career": "Backend Developer",
-                "alignment": 75,
-                "matchingSkills": ["Node.js", "API Development"],
-                "missingSkills": ["Microservices", "Message Queues"]
-            }
+            {"id": doc_id, "metadata": metadata, "similarity": self._similarity(collection, distance)}
+            for doc_id, metadata, distance in zip(results["ids"][0], results["metadatas"][0], results["distances"][0])
         ]
     
-    def _get_industry_demand(self, skills: List[str]) -> Dict[str, Any]:
-        """Get industry demand for current skills"""
-        
-        return {
-            "overallDemand": "High",
-            "trendingSkills": ["AI/ML", "Cloud Computing", "DevOps"],
-            "marketValue": "Above Average",
-            "growthPotential": 85
+    def stats(self) -> Dict[str, Any]:
+        """Collection and lexical index sizes, retrieval counters and embedding cache use"""
+        cache_info = getattr(self.embedding_function, "cache_info", None)
+        collections = (self.portfolio_collection, self.skills_collection, self.careers_collection)
+        if self.server_health is not None and not self.server_health.healthy:
+            # Counts would wait on the retries of an unreachable server
+            counts = None
+        else:
+            counts = {c.name: c.count() for c in collections if c is not None}
+        stats = {
+            "collections": counts,
+            "lexical": {name: len(index) for name, index in self._lexical.items()},
+            "retrieval": self._retrieval_counts(),
+            "embeddingCache": cache_info()._asdict() if cache_info else None,
         }
+        if self.shared_tables is not None:
+            stats["sharedTables"] = {"path": self.shared_path, "bytes": self.shared_tables.nbytes}
+        if self.server_health is not None:
+            stats["server"] = dict(self.server_health.snapshot(), url=self.server_url)
+        return stats
+    
+    @staticmethod
+    def _skill_filter(current_skills: List[str], career_goal: str, experience_level: str, kb: KnowledgeBase) -> Dict[str, Any]:
+        """Chroma where clause: not yet known, on the goal's path, at most one level above the user"""
+        clauses = []
+        if current_skills:
+            clauses.append({"key": {"$nin": [s.lower() for s in current_skills]}})
+        max_level = len(LEVELS) - 1
+        if experience_level in LEVELS:
+            max_level = min(LEVELS.index(experience_level) + 1, max_level)
+        if career_goal in kb.career_skill_map:
+            # Skills off the path have no key for it, so this also requires path membership
+            clauses.append({path_flag(career_goal): {"$lte": max_level}})
+        elif experience_level in LEVELS:
+            clauses.append({"level_rank": {"$lte": max_level}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
     
-    def _get_competitive_analysis(self, strength_score: Dict) -> Dict[str, Any]:
-        """Compare with other portfolios"""
+    def retrieve(self, ctx) -> Dict[str, Any]:
+        """
+        Vector tier of the portfolio pipeline: missing skills near the known ones,
+        filtered before the search, and careers near the whole portfolio
+        """
+        kb = ctx.kb
+        self._check_server()
+        self.seed_from_knowledge_base(kb)
+        known_skills = ctx.known_skills
         
-        score = strength_score['score']
+        # Combine all portfolio data into a searchable text
+        portfolio_text = f"""
+        Projects: {json.dumps(ctx.projects)}
+        Skills: {', '.join(ctx.skills)}
+        Achievements: {ctx.achievements}
+        """
         
-        if score >= 80:
-            percentile = 90
-        elif score >= 60:
-            percentile = 70
-        elif score >= 40:
-            percentile = 50
-        else:
-            percentile = 30
+        skills_results = self._search(
+            self.skills_collection,
+            ', '.join(known_skills),
+            n_results=10,
+            where=self._skill_filter(known_skills, ctx.career_goal, ctx.experience_level, kb),
+            skill_list=True
+        )
         
-        return {
-            "percentile": percentile,
-            "comparison": f"Your portfolio is stronger than {percentile}% of similar profiles",
-            "standoutFeatures": ["Project diversity", "Modern tech stack"],
-            "areasToImprove": ["Add more complex projects", "Expand skill set"]
-        }
+        # Search for relevant career paths, within the goal's industry when there is one
+        industry = kb.industry_of.get(ctx.career_goal)
+        career_results = self._search(
+            self.careers_collection,
+            portfolio_text,
+            n_results=5,
+            where={"industry": industry} if industry else None
+        )
+        return {"skills": skills_results, "careers": career_results}
     
-    def _get_fallback_analysis(self, projects: List[Dict], skills: List[str], achievements: str) -> Dict[str, Any]:
-        """Fallback analysis when ChromaDB query fails"""
-        
-        project_analysis = self._analyze_projects(projects)
-        strength_score = self._calculate_portfolio_strength(projects, skills, achievements)
-        
-        return {
-            "portfolioStrength": strength_score,
-            "projectAnalysis": project_analysis,
-            "skillGaps": [],
-            "recommendations": [
-                {
-                    "type": "General",
-                    "priority": "High",
-                    "title": "Continue Building",
-                    "description": "Keep working on projects and learning new skills",
-                    "action": "Set weekly learning goals"
-                }
-            ],
-            "careerAlignment": [],
-            "industryDemand": {"overallDemand": "High", "trendingSkills": [], "marketValue": "Average", "growthPotential": 70},
-            "competitiveAnalysis": {"percentile": 50, "comparison": "Average portfolio", "standoutFeatures": [], "areasToImprove": []}
-        }
+    def analyze_portfolio(self, projects: List[Dict[str, Any]], skills: List[str], achievements: str, kb: KnowledgeBase = None,
+                          career_goal: str = None, experience_level: str = None, record: bool = True) -> Dict[str, Any]:
+        """
+        Analyze student portfolio using ChromaDB: the pipeline's full tier
+        with this service as the retriever
+        """
+        return portfolio_pipeline.analyze(
+            projects, skills, achievements, kb or knowledge_base.current(), tier="full",
+            career_goal=career_goal, experience_level=experience_level, record=record, retriever=self
+        )
 
 # Singleton instance
 chroma_service = ChromaDBService()
@@ -0,0 +1,275 @@
+"""
+Offline cohort analytics over the analysis history.
+
+``compact`` streams the history database (see history_store.py) into one
+columnar NumPy file per field. The user skills column is dictionary encoded:
+an offsets array plus int32 codes into a vocabulary. CohortAnalytics
+memory-maps those files and answers group-by and histogram queries with
+vectorized operations, so reports never parse JSON or re-run the analyzers.
+
+Usage:
+    python cohort_analytics.py compact [--db PATH] [--out DIR]
+    python cohort_analytics.py report [--out DIR] [--cohort NAME] [--since UNIX_TS]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from history_store import DATA_DIR, history_store
+from knowledge_base import knowledge_base
+
+DEFAULT_OUT = os.path.join(DATA_DIR, "analytics")
+
+KINDS = ("portfolio", "assessment")
+SECTIONS = ("projects", "skills", "achievements")
+
+
+def compact(db_path: str = history_store.path, out_dir: str = DEFAULT_OUT, chunk_size: int = 5000) -> Dict[str, Any]:
+    """Rewrite the columnar store from the history database"""
+    kb = knowledge_base.current()
+    traits = list(kb.traits)
+    trait_index = {trait: i for i, trait in enumerate(traits)}
+    trait_names = {trait.replace("_", " ").title(): i for i, trait in enumerate(traits)}
+    gap_categories = list(dict.fromkeys(list(kb.skill_categories) + list(kb.in_demand_skills)))
+    gap_index = {category: i for i, category in enumerate(gap_categories)}
+
+    os.makedirs(out_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    rows, max_id = conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM analyses").fetchone()
+
+    def column(name, dtype, shape=(), fill=0):
+        array_ = np.lib.format.open_memmap(
+            os.path.join(out_dir, f"{name}.npy"), mode="w+", dtype=dtype, shape=(rows,) + shape
+        )
+        array_[:] = fill
+        return array_
+
+    created_at = column("created_at", np.float64)
+    kind = column("kind", np.uint8)
+    cohort = column("cohort", np.int32, fill=-1)
+    score = column("score", np.float32, fill=np.nan)
+    sections = column("sections", np.float32, (len(SECTIONS),), fill=np.nan)
+    trait_scores = column("traits", np.float32, (len(traits),), fill=np.nan)
+    gaps = column("skill_gaps", np.uint8, (len(gap_categories),))
+
+    cohorts: Dict[str, int] = {}
+    skills_vocab: Dict[str, int] = {}
+    skill_offsets = array("q", [0])
+    skill_codes = array("i")
+
+    cursor = conn.execute("SELECT created_at, kind, cohort, score, request, result FROM analyses WHERE id <= ? ORDER BY id", (max_id,))
+    i = 0
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        for row_created, row_kind, row_cohort, row_score, row_request, row_result in chunk:
+            if i >= rows:
+                break
+            result = json.loads(row_result)
+            created_at[i] = row_created
+            kind[i] = KINDS.index(row_kind) if row_kind in KINDS else 255
+            if row_cohort is not None:
+                cohort[i] = cohorts.setdefault(row_cohort, len(cohorts))
+            if row_score is not None:
+                score[i] = row_score
+
+            if row_kind == "portfolio":
+                breakdown = result.get("portfolioStrength", {}).get("breakdown", {})
+                sections[i] = [breakdown.get(section, np.nan) for section in SECTIONS]
+                for gap in result.get("skillGaps", []):
+                    index = gap_index.get(gap.get("category"))
+                    if index is not None:
+                        gaps[i, index] = min(len(gap.get("missingSkills", [])), 255)
+                for skill in json.loads(row_request).get("skills", []):
+                    skill_codes.append(skills_vocab.setdefault(str(skill).strip().lower(), len(skills_vocab)))
+            elif row_kind == "assessment":
+                scores = result.get("traitScores")
+                if scores:
+                    for trait, value in scores.items():
+                        if trait in trait_index:
+                            trait_scores[i, trait_index[trait]] = value
+                else:
+                    # Older rows only carry the top traits
+                    for trait in result.get("personalityTraits", []):
+                        if trait.get("name") in trait_names:
+                            trait_scores[i, trait_names[trait["name"]]] = trait.get("score", np.nan)
+
+            skill_offsets.append(len(skill_codes))
+            i += 1
+    conn.close()
+
+    for array_ in (created_at, kind, cohort, score, sections, trait_scores, gaps):
+        array_.flush()
+    np.save(os.path.join(out_dir, "skill_offsets.npy"), np.frombuffer(skill_offsets, dtype=np.int64))
+    np.save(os.path.join(out_dir, "skill_codes.npy"), np.frombuffer(skill_codes, dtype=np.int32))
+
+    manifest = {
+        "rows": i,
+        "maxId": max_id,
+        "compactedAt": time.time(),
+        "kinds": list(KINDS),
+        "sections": list(SECTIONS),
+        "traits": traits,
+        "gapCategories": gap_categories,
+        "cohorts": list(cohorts),
+        "skills": list(skills_vocab),
+    }
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+class CohortAnalytics:
+    """Vectorized queries over a compacted, memory-mapped analytics directory"""
+
+    def __init__(self, directory: str = DEFAULT_OUT):
+        with open(os.path.join(directory, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        rows = self.manifest["rows"]
+
+        def load(name):
+            return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+
+        self.created_at = load("created_at")[:rows]
+        self.kind = load("kind")[:rows]
+        self.cohort = load("cohort")[:rows]
+        self.score = load("score")[:rows]
+        self.sections = load("sections")[:rows]
+        self.traits = load("traits")[:rows]
+        self.skill_gaps = load("skill_gaps")[:rows]
+        self.skill_offsets = load("skill_offsets")
+        self.skill_codes = load("skill_codes")
+        self.cohort_names: List[str] = self.manifest["cohorts"]
+        self.cohort_codes = {name: i for i, name in enumerate(self.cohort_names)}
+
+    def _mask(self, kind: str, cohort: Optional[str] = None, since: Optional[float] = None) -> np.ndarray:
+        mask = self.kind == KINDS.index(kind)
+        if cohort is not None:
+            mask &= self.cohort == self.cohort_codes.get(cohort, -2)
+        if since is not None:
+            mask &= self.created_at >= since
+        return mask
+
+    def skill_gap_frequency(self, cohort: Optional[str] = None, since: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Share of portfolios with a gap in each category and the mean number of missing skills"""
+        gaps = self.skill_gaps[self._mask("portfolio", cohort, since)]
+        total = max(len(gaps), 1)
+        frequency = np.count_nonzero(gaps, axis=0) / total
+        mean_missing = gaps.sum(axis=0, dtype=np.int64) / total
+        return {
+            category: {"frequency": round(float(frequency[i]), 4), "meanMissing": round(float(mean_missing[i]), 3)}
+            for i, category in enumerate(self.manifest["gapCategories"])
+        }
+
+    def mean_strength_by_cohort(self, since: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Mean portfolio strength (overall and per section) grouped by cohort"""
+        mask = self._mask("portfolio", since=since) & (self.cohort >= 0) & ~np.isnan(self.score)
+        codes = self.cohort[mask]
+        groups = len(self.cohort_names)
+        counts = np.bincount(codes, minlength=groups)
+        safe_counts = np.maximum(counts, 1)
+        strength = np.bincount(codes, weights=self.score[mask], minlength=groups) / safe_counts
+
+        sections = np.nan_to_num(self.sections[mask])
+        section_means = {
+            section: np.bincount(codes, weights=sections[:, j], minlength=groups) / safe_counts
+            for j, section in enumerate(SECTIONS)
+        }
+        return {
+            name: {
+                "count": int(counts[g]),
+                "meanStrength": round(float(strength[g]), 2),
+                **{section: round(float(means[g]), 2) for section, means in section_means.items()},
+            }
+            for g, name in enumerate(self.cohort_names)
+            if counts[g]
+        }
+
+    def trait_histogram(self, trait: str, bins: int = 10, cohort: Optional[str] = None,
+                        since: Optional[float] = None) -> Dict[str, List[float]]:
+        """Histogram of one normalized trait score (0-100) across assessments"""
+        column = self.manifest["traits"].index(trait)
+        values = self.traits[self._mask("assessment", cohort, since), column]
+        values = values[~np.isnan(values)]
+        counts, edges = np.histogram(values, bins=bins, range=(0, 100))
+        return {"counts": counts.tolist(), "edges": edges.tolist()}
+
+    def trait_distribution(self, cohort: Optional[str] = None, since: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Mean and quartiles of every trait across assessments"""
+        values = self.traits[self._mask("assessment", cohort, since)]
+        if not len(values):
+            return {}
+        with np.errstate(all="ignore"):
+            means = np.nanmean(values, axis=0)
+            quartiles = np.nanpercentile(values, [25, 50, 75], axis=0)
+        return {
+            trait: {
+                "mean": round(float(means[i]), 2),
+                "p25": round(float(quartiles[0, i]), 2),
+                "median": round(float(quartiles[1, i]), 2),
+                "p75": round(float(quartiles[2, i]), 2),
+            }
+            for i, trait in enumerate(self.manifest["traits"])
+            if not np.isnan(means[i])
+        }
+
+    def skill_frequency(self, top: int = 20, cohort: Optional[str] = None, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Most common skills listed in portfolios"""
+        mask = self._mask("portfolio", cohort, since)
+        if mask.all():
+            codes = self.skill_codes
+        else:
+            # Expand the row mask over each row's slice of the codes column
+            lengths = np.diff(self.skill_offsets)
+            codes = self.skill_codes[np.repeat(mask, lengths)]
+        vocab = self.manifest["skills"]
+        counts = np.bincount(codes, minlength=len(vocab))
+        top = min(top, len(vocab))
+        if not top:
+            return []
+        best = np.argpartition(counts, -top)[-top:]
+        best = best[np.argsort(counts[best])[::-1]]
+        return [{"skill": vocab[i], "count": int(counts[i])} for i in best if counts[i]]
+
+    def report(self, cohort: Optional[str] = None, since: Optional[float] = None) -> Dict[str, Any]:
+        """All advisor reports in one document"""
+        return {
+            "rows": self.manifest["rows"],
+            "portfolios": int(np.count_nonzero(self._mask("portfolio", cohort, since))),
+            "assessments": int(np.count_nonzero(self._mask("assessment", cohort, since))),
+            "skillGapFrequency": self.skill_gap_frequency(cohort, since),
+            "meanStrengthByCohort": self.mean_strength_by_cohort(since),
+            "traitDistribution": self.trait_distribution(cohort, since),
+            "topSkills": self.skill_frequency(cohort=cohort, since=since),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar cohort analytics over the analysis history")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = subparsers.add_parser("compact", help="Rebuild the columnar store from the history database")
+    compact_parser.add_argument("--db", default=history_store.path)
+    compact_parser.add_argument("--out", default=DEFAULT_OUT)
+
+    report_parser = subparsers.add_parser("report", help="Print aggregate reports as JSON")
+    report_parser.add_argument("--out", default=DEFAULT_OUT)
+    report_parser.add_argument("--cohort", default=None)
+    report_parser.add_argument("--since", type=float, default=None)
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+    if args.command == "compact":
+        summary = compact(args.db, args.out)
+        print(f"Compacted {summary['rows']} analyses in {time.perf_counter() - start:.2f}s")
+    else:
+        print(json.dumps(CohortAnalytics(args.out).report(args.cohort, args.since), indent=2))
+        print(f"Report built in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,291 @@
+"""
+Skill co-occurrence learned from analyzed portfolios.
+
+Every analyzed portfolio adds its projects to a sparse, symmetric matrix of
+technology pair counts. Technologies listed in the same project count as
+used together. The matrix is stored as adjacency dicts, so a skill's
+neighbours are one lookup. "Learn next" for a set of known skills sums an
+association score over the known skills' neighbours and keeps the top k:
+
+    association(a, b) = together(a, b) / sqrt(projects(a) * projects(b))
+
+Pairs seen fewer than ``min_support`` times are ignored as noise.
+
+Workers share the matrix the way PopulationStats shares score sketches.
+New projects go into a local delta. Every few seconds the delta is merged
+into a snapshot file under a file lock, and the merged matrix becomes the
+worker's base. When the snapshot grows past ``max_pairs`` it is compacted:
+the rarest pairs are dropped until it fits, along with skills left with
+no pairs. Recommendations improve with traffic, with no batch retraining.
+"""
+
+import atexit
+import heapq
+import json
+import math
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from quantile_sketch import DATA_DIR, file_lock
+
+# Technologies per project that are paired; the cost of a project is quadratic in this
+MAX_TECHS_PER_PROJECT = 25
+# A skill key and its display name
+_SKILL_STRING_BYTES = 120
+
+
+def skill_key(name: Any) -> str:
+    return " ".join(str(name).split()).lower()
+
+
+class CooccurrenceCounts:
+    """Project counts per skill and per skill pair, with symmetric adjacency dicts"""
+
+    def __init__(self):
+        self.projects = 0
+        self.skills: Dict[str, int] = {}
+        # Display spelling of each key, as first seen
+        self.names: Dict[str, str] = {}
+        self.pairs: Dict[str, Dict[str, int]] = {}
+
+    def add_project(self, technologies: Iterable[Any]) -> None:
+        keys = []
+        for tech in technologies:
+            key = skill_key(tech)
+            if key and key not in self.names:
+                self.names[key] = " ".join(str(tech).split())
+            if key and key not in keys:
+                keys.append(key)
+        keys = keys[:MAX_TECHS_PER_PROJECT]
+        if not keys:
+            return
+        self.projects += 1
+        for key in keys:
+            self.skills[key] = self.skills.get(key, 0) + 1
+        for i, a in enumerate(keys):
+            for b in keys[i + 1:]:
+                self._add_pair(a, b, 1)
+
+    def _add_pair(self, a: str, b: str, count: int) -> None:
+        row = self.pairs.setdefault(a, {})
+        row[b] = row.get(b, 0) + count
+        row = self.pairs.setdefault(b, {})
+        row[a] = row.get(a, 0) + count
+
+    def merge(self, other: "CooccurrenceCounts") -> "CooccurrenceCounts":
+        self.projects += other.projects
+        for key, count in other.skills.items():
+            self.skills[key] = self.skills.get(key, 0) + count
+        for key, name in other.names.items():
+            self.names.setdefault(key, name)
+        for a, b, count in other.pair_items():
+            self._add_pair(a, b, count)
+        return self
+
+    def pair_items(self) -> Iterator[Tuple[str, str, int]]:
+        """Each pair once, as (a, b, count) with a < b"""
+        for a, row in self.pairs.items():
+            for b, count in row.items():
+                if a < b:
+                    yield a, b, count
+
+    def pair_count(self) -> int:
+        return sum(len(row) for row in self.pairs.values()) // 2
+
+    def compact(self, max_pairs: int) -> int:
+        """Keep the ``max_pairs`` most frequent pairs and drop the rest; returns how many were dropped"""
+        total = self.pair_count()
+        if total <= max_pairs:
+            return 0
+        # Ties on long-tailed data are common: they go to pairs of more common skills, then by name,
+        # so exactly max_pairs survive and every worker keeps the same ones
+        kept = heapq.nlargest(
+            max_pairs, sorted(self.pair_items()),
+            key=lambda item: (item[2], self.skills.get(item[0], 0) + self.skills.get(item[1], 0))
+        )
+        self.pairs = {}
+        for a, b, count in kept:
+            self._add_pair(a, b, count)
+        for key in [key for key in self.skills if key not in self.pairs]:
+            del self.skills[key]
+            self.names.pop(key, None)
+        return total - len(kept)
+
+    def memory_bytes(self) -> int:
+        """Estimated bytes: the dict tables, the adjacency rows and the skill strings"""
+        tables = sum(sys.getsizeof(table) for table in (self.skills, self.names, self.pairs))
+        return tables + sum(sys.getsizeof(row) for row in self.pairs.values()) + len(self.names) * _SKILL_STRING_BYTES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "projects": self.projects,
+            "skills": {key: [self.names.get(key, key), count] for key, count in self.skills.items()},
+            "pairs": [list(item) for item in self.pair_items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CooccurrenceCounts":
+        counts = cls()
+        counts.projects = data.get("projects", 0)
+        for key, (name, count) in data.get("skills", {}).items():
+            counts.skills[key] = count
+            counts.names[key] = name
+        for a, b, count in data.get("pairs", []):
+            counts._add_pair(a, b, count)
+        return counts
+
+
+class SkillCooccurrence:
+    """Incrementally updated co-occurrence model shared across workers through one snapshot file"""
+
+    def __init__(self, path: str, persist_interval: float = 30.0, max_pairs: int = 200000,
+                 min_support: int = 2):
+        self.path = path
+        self.persist_interval = persist_interval
+        self.max_pairs = max_pairs
+        self.min_support = min_support
+        self._lock = threading.Lock()
+        self._base = self._read_file()
+        self._delta = CooccurrenceCounts()
+        self.stats = {"observed": 0, "compactions": 0, "prunedPairs": 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def observe(self, projects: Iterable[Dict[str, Any]]) -> None:
+        """Add one portfolio's projects to the local delta"""
+        with self._lock:
+            for project in projects:
+                technologies = project.get("technologies") if isinstance(project, dict) else None
+                if isinstance(technologies, list):
+                    self._delta.add_project(technologies)
+            self.stats["observed"] += 1
+
+    def learn_next(self, known_skills: Iterable[str], limit: int = 10) -> List[Dict[str, Any]]:
+        """Skills most associated with the known ones in real projects, best first"""
+        known = {skill_key(s) for s in known_skills} - {""}
+        scores: Dict[str, float] = {}
+        support: Dict[str, int] = {}
+        with self._lock:
+            for a in known:
+                count_a = self._count(a)
+                if not count_a:
+                    continue
+                for b, together in self._neighbours(a):
+                    if b in known or together < self.min_support:
+                        continue
+                    scores[b] = scores.get(b, 0.0) + together / math.sqrt(count_a * self._count(b))
+                    support[b] = support.get(b, 0) + 1
+            # Ties go to the more common skill, then to name order
+            best = heapq.nlargest(limit, sorted(scores.items()), key=lambda item: (item[1], self._count(item[0])))
+            return [
+                {
+                    "skill": self._name(key),
+                    # Mean association with every known skill, 0 to 1
+                    "score": round(score / len(known), 4),
+                    "pairedWith": support[key],
+                    "projects": self._count(key),
+                }
+                for key, score in best
+            ]
+
+    def _count(self, key: str) -> int:
+        return self._base.skills.get(key, 0) + self._delta.skills.get(key, 0)
+
+    def _name(self, key: str) -> str:
+        return self._base.names.get(key) or self._delta.names.get(key, key)
+
+    def _neighbours(self, key: str) -> Iterator[Tuple[str, int]]:
+        base = self._base.pairs.get(key, {})
+        delta = self._delta.pairs.get(key, {})
+        if not delta:
+            yield from base.items()
+            return
+        for other in base.keys() | delta.keys():
+            yield other, base.get(other, 0) + delta.get(other, 0)
+
+    def persist(self) -> None:
+        """Merge the local delta into the snapshot, compact it if needed, and reload it"""
+        with self._lock:
+            delta, self._delta = self._delta, CooccurrenceCounts()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            with file_lock(self.path + ".lock"):
+                merged = self._read_file().merge(delta)
+                pruned = merged.compact(self.max_pairs)
+                if delta.projects or pruned:
+                    self._write_file(merged)
+        except OSError as e:
+            print(f"Could not persist skill co-occurrence: {e}")
+            with self._lock:
+                # Put the projects back so they are not lost
+                self._delta = delta.merge(self._delta)
+            return
+        with self._lock:
+            self._base = merged
+            if pruned:
+                self.stats["compactions"] += 1
+                self.stats["prunedPairs"] += pruned
+
+    def _read_file(self) -> CooccurrenceCounts:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return CooccurrenceCounts()
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable co-occurrence snapshot {self.path}: {e}")
+            return CooccurrenceCounts()
+        return CooccurrenceCounts.from_dict(data)
+
+    def _write_file(self, counts: CooccurrenceCounts) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(dict(counts.to_dict(), updatedAt=time.time()), f)
+        os.replace(tmp_path, self.path)
+
+    def start(self) -> None:
+        """Persist periodically in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="skill-cooccurrence", daemon=True)
+        self._thread.start()
+        atexit.register(self.persist)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.persist()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.persist_interval):
+            self.persist()
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return self._base.memory_bytes() + self._delta.memory_bytes()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Model size, including this worker's unpersisted delta"""
+        with self._lock:
+            return dict(
+                self.stats,
+                projects=self._base.projects + self._delta.projects,
+                skills=len(self._base.skills.keys() | self._delta.skills.keys()),
+                pairs=self._base.pair_count(),
+                pendingProjects=self._delta.projects,
+            )
+
+
+# Shared model for the API process
+skill_cooccurrence = SkillCooccurrence(
+    os.environ.get("SKILLNEX_COOCCURRENCE", os.path.join(DATA_DIR, "skill_cooccurrence.json")),
+    max_pairs=int(os.environ.get("SKILLNEX_COOCCURRENCE_MAX_PAIRS", 200000)),
+)
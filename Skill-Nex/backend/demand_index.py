@@ -0,0 +1,399 @@
+"""
+Skill demand from a local dump of job postings.
+
+Postings are read from JSONL, one object per line:
+
+    {"title": "Backend Developer", "industry": "Technology",
+     "skills": ["Python", "Django"], "postedAt": "2025-03-14"}
+
+``skills`` may also be a ";"-separated string. ``industry`` defaults to the
+industry of ``title`` in the knowledge base, and ``postedAt`` (ISO 8601 or
+epoch seconds) to the time of ingestion.
+
+Each posting adds to exponentially decayed counters per skill: one row for
+all postings and one per industry, at a short and a long half-life. Decay
+is applied forward: a posting at time t adds exp(rate * (t - landmark))
+instead of every counter shrinking as time passes. All counters in a row
+decay by the same factor, so ratios between them never need the current
+time:
+
+    demand(skill) = long(skill) / max over skills of long
+    trend(skill)  = (short(skill) / long(skill)) / (short(all) / long(all))
+
+A trend above 1 means the skill's share of postings is growing.
+
+The counters live in a few dense arrays, published in the shared tables
+format (see shared_tables), so every worker maps one copy. A request looks
+up only its own skills; the per-industry lists of rising skills are ranked
+once when the file is loaded. Ingestion runs offline:
+
+    python demand_index.py ingest postings.jsonl [--append]
+    python demand_index.py show [--industry Technology] [--skills Python,Docker]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from cooccurrence import skill_key
+from quantile_sketch import DATA_DIR, file_lock
+from shared_tables import SharedTables, publish
+
+DEFAULT_PATH = os.environ.get("SKILLNEX_DEMAND_INDEX", os.path.join(DATA_DIR, "demand_index.bin"))
+# Half-lives of the short and long counters, in days
+DEFAULT_HALF_LIVES = (30.0, 180.0)
+ALL_INDUSTRIES = "All"
+
+# A skill is trending when its share of postings grows at least this fast
+TRENDING_RATIO = 1.2
+# Skills rarer than this share of the most demanded one are too noisy to call trending
+MIN_DEMAND = 0.05
+# Rising skills ranked per industry at load time
+TOP_RISING = 20
+# Mean demand of a portfolio's skills for each overall demand label
+DEMAND_LEVELS = ((0.4, "High"), (0.15, "Medium"))
+
+# Move the landmark forward before exp() gets near float64's range
+_RENORMALIZE_EXPONENT = 200.0
+_INITIAL_SKILLS = 64
+
+
+def parse_posted_at(value: Any) -> Optional[float]:
+    """Epoch seconds from an ISO 8601 date or timestamp, or a number; None when unreadable"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = value.strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        posted = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if posted.tzinfo is None:
+        posted = posted.replace(tzinfo=timezone.utc)
+    return posted.timestamp()
+
+
+def _posting_skills(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = value.split(";")
+    if not isinstance(value, list):
+        return []
+    return [s for s in (" ".join(str(v).split()) for v in value) if s]
+
+
+class DemandCounters:
+    """Writable decayed counters; arrays grow as postings bring new skills and industries"""
+
+    def __init__(self, half_lives: Tuple[float, float] = DEFAULT_HALF_LIVES, landmark: Optional[float] = None):
+        self.half_lives = tuple(float(h) for h in half_lives)
+        self.rates = np.log(2) / (np.array(self.half_lives) * 86400)
+        self.landmark = landmark
+        self.skills: List[str] = []
+        self.skill_index: Dict[str, int] = {}
+        self.industries: List[str] = [ALL_INDUSTRIES]
+        self.industry_index: Dict[str, int] = {ALL_INDUSTRIES: 0}
+        # [short | long, industry row, skill]
+        self.counts = np.zeros((2, 1, _INITIAL_SKILLS))
+        # Decayed posting counts per row
+        self.totals = np.zeros((2, 1))
+        self.postings = 0
+        self.latest: Optional[float] = None
+
+    def add(self, skills: Iterable[str], posted_at: float, industry: Optional[str] = None) -> None:
+        columns = sorted({self._skill_column(name) for name in skills if skill_key(name)})
+        if not columns:
+            return
+        if self.landmark is None:
+            self.landmark = posted_at
+        if float(np.max(self.rates * (posted_at - self.landmark))) > _RENORMALIZE_EXPONENT:
+            self._renormalize(posted_at)
+        weights = np.exp(self.rates * (posted_at - self.landmark))
+        rows = [0]
+        if industry and industry != ALL_INDUSTRIES:
+            rows.append(self._industry_row(industry))
+        for row in rows:
+            self.counts[:, row, columns] += weights[:, None]
+            self.totals[:, row] += weights
+        self.postings += 1
+        self.latest = posted_at if self.latest is None else max(self.latest, posted_at)
+
+    def _skill_column(self, name: str) -> int:
+        key = skill_key(name)
+        column = self.skill_index.get(key)
+        if column is None:
+            column = self.skill_index[key] = len(self.skills)
+            self.skills.append(" ".join(str(name).split()))
+            if column == self.counts.shape[2]:
+                # Double the capacity, so growth is amortized
+                self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)], axis=2)
+        return column
+
+    def _industry_row(self, industry: str) -> int:
+        row = self.industry_index.get(industry)
+        if row is None:
+            row = self.industry_index[industry] = len(self.industries)
+            self.industries.append(industry)
+            self.counts = np.concatenate([self.counts, np.zeros((2, 1, self.counts.shape[2]))], axis=1)
+            self.totals = np.concatenate([self.totals, np.zeros((2, 1))], axis=1)
+        return row
+
+    def _renormalize(self, landmark: float) -> None:
+        factor = np.exp(-self.rates * (landmark - self.landmark))
+        self.counts *= factor[:, None, None]
+        self.totals *= factor[:, None]
+        self.landmark = landmark
+
+    def ingest(self, path: str, industry_of: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+        """Add every posting in a JSONL file; returns how many were added and skipped"""
+        industry_of = industry_of or {}
+        now = time.time()
+        added = skipped = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    posting = json.loads(line)
+                except ValueError:
+                    skipped += 1
+                    continue
+                skills = _posting_skills(posting.get("skills")) if isinstance(posting, dict) else []
+                if not skills:
+                    skipped += 1
+                    continue
+                posted_at = parse_posted_at(posting.get("postedAt", posting.get("posted_at")))
+                industry = posting.get("industry") or industry_of.get(posting.get("title"))
+                self.add(skills, now if posted_at is None else posted_at, industry)
+                added += 1
+        return {"added": added, "skipped": skipped}
+
+    def publish(self, path: str) -> None:
+        n = len(self.skills)
+        publish(path, {"counts": self.counts[:, :, :n], "totals": self.totals}, {
+            "skills": self.skills,
+            "industries": self.industries,
+            "halfLives": list(self.half_lives),
+            "landmark": self.landmark,
+            "postings": self.postings,
+            "latest": self.latest,
+            "updatedAt": time.time(),
+        })
+
+    @classmethod
+    def from_index(cls, index: "DemandIndex") -> "DemandCounters":
+        """Writable copy of a published index, for appending postings"""
+        meta = index.meta
+        counters = cls(tuple(meta["halfLives"]), meta["landmark"])
+        counters.skills = list(meta["skills"])
+        counters.skill_index = {skill_key(name): i for i, name in enumerate(counters.skills)}
+        counters.industries = list(meta["industries"])
+        counters.industry_index = {name: i for i, name in enumerate(counters.industries)}
+        capacity = max(_INITIAL_SKILLS, 2 * len(counters.skills))
+        counters.counts = np.zeros((2, len(counters.industries), capacity))
+        counters.counts[:, :, :len(counters.skills)] = index.counts
+        counters.totals = np.array(index.totals)
+        counters.postings = meta["postings"]
+        counters.latest = meta["latest"]
+        return counters
+
+
+class DemandIndex:
+    """Read-only demand and trend lookups over a published counters file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tables = SharedTables(path)
+        self.meta = self._tables.meta
+        self.counts = self._tables.arrays["counts"]
+        self.totals = self._tables.arrays["totals"]
+        self.skills: List[str] = self.meta["skills"]
+        self.skill_index = {skill_key(name): i for i, name in enumerate(self.skills)}
+        self.industry_index = {name: i for i, name in enumerate(self.meta["industries"])}
+        self.postings: int = self.meta["postings"]
+
+        short, long = self.counts
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._peak = long.max(axis=1, initial=0.0)
+            self._demand = np.nan_to_num(long / self._peak[:, None])
+            base = self.totals[0] / self.totals[1]
+            self._trend = np.nan_to_num(short / long / base[:, None])
+        # Rising skills per row: common enough and growing fastest
+        self._rising = []
+        for demand, trend in zip(self._demand, self._trend):
+            candidates = np.flatnonzero((demand >= MIN_DEMAND) & (trend >= TRENDING_RATIO))
+            self._rising.append(candidates[np.argsort(-trend[candidates], kind="stable")][:TOP_RISING].tolist())
+
+    def row(self, industry: Optional[str]) -> Tuple[str, int]:
+        """The industry's row, or the row for all postings when it has none"""
+        if industry in self.industry_index:
+            return industry, self.industry_index[industry]
+        return ALL_INDUSTRIES, 0
+
+    def skill_demand(self, skills: Iterable[str], industry: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Demand (0 to 1, relative to the most demanded skill) and trend of each known skill"""
+        _, row = self.row(industry)
+        result = []
+        for name in skills:
+            column = self.skill_index.get(skill_key(name))
+            if column is None:
+                continue
+            result.append({
+                "skill": name,
+                "demand": round(float(self._demand[row, column]), 4),
+                "trend": round(float(self._trend[row, column]), 3),
+            })
+        return result
+
+    def rising(self, industry: Optional[str] = None, exclude: Iterable[str] = (), limit: int = 5) -> List[Dict[str, Any]]:
+        """Fastest-growing skills in the industry, leaving out ``exclude``"""
+        _, row = self.row(industry)
+        excluded = {skill_key(s) for s in exclude}
+        result = []
+        for column in self._rising[row]:
+            if skill_key(self.skills[column]) in excluded:
+                continue
+            result.append({
+                "skill": self.skills[column],
+                "demand": round(float(self._demand[row, column]), 4),
+                "trend": round(float(self._trend[row, column]), 3),
+            })
+            if len(result) == limit:
+                break
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "postings": self.postings,
+            "skills": len(self.skills),
+            "industries": len(self.industry_index) - 1,
+            "latest": self.meta["latest"],
+            "halfLivesDays": self.meta["halfLives"],
+            "bytes": self._tables.nbytes,
+        }
+
+
+def demand_level(mean_demand: float) -> str:
+    for threshold, label in DEMAND_LEVELS:
+        if mean_demand >= threshold:
+            return label
+    return "Low"
+
+
+class DemandIndexStore:
+    """Holds the published index, if there is one, and reloads it when the file is replaced"""
+
+    def __init__(self, path: str = DEFAULT_PATH, poll_interval: float = 30.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._stat_key = None
+        self._current: Optional[DemandIndex] = None
+        self._loaded = False
+        self.reloads = 0
+        self.last_error = None
+
+    def current(self) -> Optional[DemandIndex]:
+        """The live index, or None when no postings have been ingested"""
+        if not self._loaded:
+            self.reload()
+        return self._current
+
+    def reload(self) -> bool:
+        """Load the file if it changed; returns True when a new version was swapped in"""
+        with self._lock:
+            stat_key = self._file_stat_key()
+            if self._loaded and stat_key == self._stat_key:
+                return False
+            self._loaded = True
+            self._stat_key = stat_key
+            if stat_key is None:
+                self._current = None
+                return False
+            try:
+                self._current = DemandIndex(self.path)
+            except (OSError, ValueError, KeyError) as e:
+                # Keep serving the previous version until the file is fixed
+                self.last_error = str(e)
+                print(f"Demand index reload failed, keeping the previous version: {e}")
+                return False
+            self.last_error = None
+            self.reloads += 1
+            return True
+
+    def start_watcher(self) -> None:
+        """Poll the file in a daemon thread and reload on change"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self.current()
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="demand-index-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.poll_interval + 1)
+            self._watcher = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            if self._file_stat_key() != self._stat_key and self.reload():
+                print(f"Demand index reloaded: {self._current.summary()}")
+
+    def _file_stat_key(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+# Shared store for the API process
+demand_index = DemandIndexStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the job-postings demand index")
+    parser.add_argument("--index", default=DEFAULT_PATH, help="Demand index file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="Add a JSONL dump of job postings")
+    ingest.add_argument("postings", help="JSONL file, one posting per line")
+    ingest.add_argument("--append", action="store_true", help="Add to the existing index instead of replacing it")
+    ingest.add_argument("--short-half-life", type=float, default=DEFAULT_HALF_LIVES[0], help="Days")
+    ingest.add_argument("--long-half-life", type=float, default=DEFAULT_HALF_LIVES[1], help="Days")
+    show = commands.add_parser("show", help="Print demand and rising skills")
+    show.add_argument("--industry", default=None)
+    show.add_argument("--skills", default="", help="Comma-separated skills to look up")
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        from knowledge_base import knowledge_base
+        start = time.perf_counter()
+        os.makedirs(os.path.dirname(os.path.abspath(args.index)), exist_ok=True)
+        with file_lock(args.index + ".lock"):
+            if args.append and os.path.exists(args.index):
+                counters = DemandCounters.from_index(DemandIndex(args.index))
+            else:
+                counters = DemandCounters((args.short_half_life, args.long_half_life))
+            counts = counters.ingest(args.postings, knowledge_base.current().industry_of)
+            counters.publish(args.index)
+        elapsed = time.perf_counter() - start
+        print(f"Ingested {counts['added']} postings ({counts['skipped']} skipped) in {elapsed:.2f}s: "
+              f"{DemandIndex(args.index).summary()}")
+    else:
+        index = DemandIndex(args.index)
+        print(json.dumps(index.summary(), indent=2))
+        if args.skills:
+            print(json.dumps(index.skill_demand([s for s in args.skills.split(",") if s.strip()], args.industry), indent=2))
+        print(json.dumps(index.rising(args.industry, limit=10), indent=2))
@@ -0,0 +1,220 @@
+"""
+Embedding backends for the Chroma collections.
+
+Two backends, both usable without network access:
+
+- ``hashing``: signed feature hashing of word and character n-grams, with
+  sublinear term frequencies, optional IDF weights and L2 normalization. It
+  needs no model files. Its cost is linear in the text length, so the
+  per-query cost is predictable.
+- ``onnx``: a sentence-transformer exported to ONNX (all-MiniLM-L6-v2 by
+  default), read from a local directory. One InferenceSession is shared with
+  an explicit thread count. Concurrent requests are coalesced into micro-
+  batches by a background thread.
+
+``SKILLNEX_EMBEDDING`` picks the backend: ``auto`` (the default) uses ONNX
+when the model files are present, and hashing otherwise.
+"""
+
+import os
+import queue
+import re
+import threading
+import zlib
+from concurrent.futures import Future
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from memory_budget import lru_entry_bytes
+
+DEFAULT_MODEL_DIR = os.environ.get(
+    "SKILLNEX_EMBEDDING_MODEL",
+    str(Path.home() / ".cache" / "chroma" / "onnx_models" / "all-MiniLM-L6-v2" / "onnx")
+)
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+
+
+class HashingEmbeddingFunction:
+    """Feature-hashed word and character n-gram vectors; deterministic across processes"""
+
+    def __init__(self, dim: int = 384, char_ngrams: Tuple[int, int] = (3, 5), idf: Optional[np.ndarray] = None,
+                 cache_size: int = 50000):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.idf = idf
+        # Vocabulary repeats heavily, so each word is hashed once
+        self._word_features = lru_cache(maxsize=cache_size)(self._hash_word)
+        self._entry_bytes = lru_entry_bytes("developer", self._hash_word("developer"))
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        return self.embed(input).tolist()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts) x dim) float32 matrix of unit vectors"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets, signs = self._features(text)
+            if not buckets:
+                continue
+            counts = np.bincount(buckets, weights=signs, minlength=self.dim)
+            # Sublinear tf keeps long descriptions from drowning out short ones
+            vector = np.sign(counts) * np.log1p(np.abs(counts))
+            if self.idf is not None:
+                vector *= self.idf
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                matrix[row] = vector / norm
+        return matrix
+
+    def cache_info(self):
+        """lru_cache statistics of the per-word feature cache"""
+        return self._word_features.cache_info()
+
+    def cache_bytes(self) -> int:
+        """Estimated memory held by the word feature cache"""
+        return self.cache_info().currsize * self._entry_bytes
+
+    def cache_clear(self) -> None:
+        self._word_features.cache_clear()
+
+    def fit_idf(self, corpus: Sequence[str]) -> "HashingEmbeddingFunction":
+        """Weight buckets by inverse document frequency over ``corpus``"""
+        document_frequency = np.zeros(self.dim)
+        for text in corpus:
+            buckets, _ = self._features(text)
+            document_frequency[list(set(buckets))] += 1
+        self.idf = np.log((1 + len(corpus)) / (1 + document_frequency)) + 1
+        return self
+
+    def _features(self, text: str) -> Tuple[List[int], List[float]]:
+        buckets: List[int] = []
+        signs: List[float] = []
+        for word in _WORD.findall(str(text).lower()):
+            word_buckets, word_signs = self._word_features(word)
+            buckets.extend(word_buckets)
+            signs.extend(word_signs)
+        return buckets, signs
+
+    def _hash_word(self, word: str) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+        """Buckets and signs of a word and its padded character n-grams"""
+        low, high = self.char_ngrams
+        padded = f"<{word}>"
+        grams = [word]
+        for n in range(low, high + 1):
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        # crc32 is stable across processes, unlike hash()
+        hashes = [zlib.crc32(gram.encode()) for gram in grams]
+        return tuple(h % self.dim for h in hashes), tuple(1.0 if h & 0x80000000 else -1.0 for h in hashes)
+
+
+class MicroBatcher:
+    """Coalesces concurrent embedding calls into batched model runs on one thread"""
+
+    def __init__(self, run_batch, max_batch: int = 64, max_wait: float = 0.005):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            size = len(pending[0][0])
+            # Wait briefly for more callers, but never past max_batch texts
+            while size < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=self.max_wait)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            texts = [text for batch, _ in pending for text in batch]
+            try:
+                vectors = self.run_batch(texts)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for batch, future in pending:
+                future.set_result(vectors[offset:offset + len(batch)])
+                offset += len(batch)
+
+
+class OnnxEmbeddingFunction:
+    """Mean-pooled sentence-transformer embeddings from a local ONNX model"""
+
+    def __init__(self, model_dir: str = DEFAULT_MODEL_DIR, threads: int = 2, max_length: int = 256,
+                 max_batch: int = 64, max_wait: float = 0.005):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_dir = model_dir
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        # Pad to the longest text in each batch rather than to max_length
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.batcher = MicroBatcher(self._run_batch, max_batch=max_batch, max_wait=max_wait)
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        return self.embed(input).tolist()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self.batcher.submit(list(texts)).result()
+
+    def _run_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        norms[norms == 0] = 1e-12
+        return (pooled / norms).astype(np.float32)
+
+
+def model_available(model_dir: str = DEFAULT_MODEL_DIR) -> bool:
+    return all(os.path.isfile(os.path.join(model_dir, name)) for name in ("model.onnx", "tokenizer.json"))
+
+
+def create_embedding_function(backend: Optional[str] = None):
+    """Embedding function for ``backend`` (hashing, onnx or auto); never downloads anything"""
+    backend = (backend or os.environ.get("SKILLNEX_EMBEDDING", "auto")).lower()
+    if backend not in ("auto", "hashing", "onnx"):
+        raise ValueError(f"Unknown embedding backend '{backend}'")
+    if backend == "onnx" or (backend == "auto" and model_available()):
+        threads = int(os.environ.get("SKILLNEX_EMBEDDING_THREADS", min(4, os.cpu_count() or 1)))
+        try:
+            return OnnxEmbeddingFunction(DEFAULT_MODEL_DIR, threads=threads)
+        except Exception as e:
+            if backend == "onnx":
+                raise
+            print(f"ONNX embeddings unavailable, using hashing: {e}")
+    return HashingEmbeddingFunction(dim=int(os.environ.get("SKILLNEX_EMBEDDING_DIM", 384)))
@@ -0,0 +1,227 @@
+"""
+Append-only history of analysis results.
+
+Request handlers call ``history_store.record(...)``, which only puts the
+result on a bounded in-memory queue. A background writer thread drains the
+queue and writes batches in single SQLite transactions (WAL mode), so saving
+history adds no latency to requests.
+
+When the queue is full, the overflow policy decides what happens:
+  - "drop_newest": discard the new record (default, never blocks a request)
+  - "drop_oldest": discard the oldest queued record to make room
+  - "block":       wait up to ``block_timeout`` seconds (backpressure), then drop
+"""
+
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("SKILLNEX_DATA_DIR", os.path.join(BASE_DIR, "data"))
+
+OVERFLOW_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    cohort TEXT,
+    kind TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    score REAL,
+    request TEXT NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_user_time ON analyses (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_analyses_kind_time ON analyses (kind, created_at);
+"""
+
+_STOP = object()
+
+
+class HistoryStore:
+    """SQLite-backed analysis history fed by a batching writer thread"""
+
+    def __init__(self, path: str, max_queue: int = 10000, batch_size: int = 256,
+                 flush_interval: float = 0.5, overflow: str = "drop_newest", block_timeout: float = 0.05):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}', expected one of {', '.join(OVERFLOW_POLICIES)}")
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._local = threading.local()
+        self._writer = None
+        self._start_lock = threading.Lock()
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def _count(self, name: str, n: int = 1) -> None:
+        """Bump one counter; request threads and the writer thread all update them"""
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def start(self) -> None:
+        """Start the writer thread (idempotent)"""
+        with self._start_lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything still queued and stop the writer"""
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+        self._writer = None
+
+    def record(self, kind: str, result: Dict[str, Any], request: Optional[Dict[str, Any]] = None,
+               user_id: Optional[str] = None, cohort: Optional[str] = None, score: Optional[float] = None) -> bool:
+        """Queue one analysis for persistence; returns False if it was dropped"""
+        if self._writer is None:
+            self.start()
+        # Ids come from request bodies; SQLite only binds scalars
+        user_id = None if user_id is None else str(user_id)
+        cohort = None if cohort is None else str(cohort)
+        item = (user_id, cohort, kind, time.time(), score, request or {}, result)
+        try:
+            if self.overflow == "block":
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            if self.overflow != "drop_oldest":
+                self._count("dropped")
+                return False
+            try:
+                self._queue.get_nowait()
+                self._count("dropped")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._count("dropped")
+                return False
+        self._count("enqueued")
+        return True
+
+    def _run(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch = [] if first is _STOP else [first]
+                stopping = first is _STOP
+                while not stopping and len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                    else:
+                        batch.append(item)
+                if stopping:
+                    # Drain whatever is left before exiting
+                    while True:
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is not _STOP:
+                            batch.append(item)
+                if batch:
+                    self._write_batch(conn, batch)
+                if stopping:
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[tuple]) -> None:
+        try:
+            rows = [
+                (user_id, cohort, kind, created_at, score, json.dumps(request), json.dumps(result))
+                for user_id, cohort, kind, created_at, score, request, result in batch
+            ]
+            with conn:
+                conn.executemany(
+                    "INSERT INTO analyses (user_id, cohort, kind, created_at, score, request, result) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        except Exception as e:
+            # Anything escaping here would end the writer thread
+            if len(batch) == 1:
+                self._count("errors")
+                print(f"Error writing an analysis to history: {e}")
+                return
+            # One row at a time, so a bad row only loses itself
+            for item in batch:
+                self._write_batch(conn, [item])
+            return
+        self._count("written", len(batch))
+        self._count("batches")
+
+    def recent(self, user_id: str, limit: int = 20, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent analyses for a user, newest first"""
+        sql = "SELECT id, kind, cohort, created_at, score, result FROM analyses WHERE user_id = ?"
+        params: List[Any] = [user_id]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        return [
+            {
+                "id": row["id"],
+                "kind": row["kind"],
+                "cohort": row["cohort"],
+                "createdAt": row["created_at"],
+                "score": row["score"],
+                "result": json.loads(row["result"]),
+            }
+            for row in self._reader().execute(sql, params)
+        ]
+
+    def queue_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return dict(stats, queued=self._queue.qsize(), capacity=self._queue.maxsize, overflow=self.overflow)
+
+
+# Shared store for the API process
+history_store = HistoryStore(
+    os.environ.get("SKILLNEX_HISTORY_DB", os.path.join(DATA_DIR, "history.sqlite3")),
+    overflow=os.environ.get("SKILLNEX_HISTORY_OVERFLOW", "drop_newest")
+)
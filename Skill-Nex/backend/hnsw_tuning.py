@@ -0,0 +1,192 @@
+"""
+HNSW tuning for the Chroma collections.
+
+Rebuilds a throwaway collection for every candidate combination of distance
+metric, M, construction ef and search ef. For each one it measures build
+time, recall@k against exact brute-force search, per-query latency
+percentiles and an estimate of the index memory, then picks the fastest
+setting that reaches the target recall. Put the winner in
+SKILLNEX_HNSW_CONFIG (see chroma_service.py).
+
+Usage:
+    python hnsw_tuning.py --synthetic 20000 --dim 384
+    python hnsw_tuning.py --vectors embeddings.npy --M 8,16,32 --search-ef 10,50,100 --json results.json
+    python hnsw_tuning.py --texts catalogue.txt    # one text per line, embedded with the configured backend
+"""
+
+import argparse
+import itertools
+import json
+import math
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+import chromadb
+import numpy as np
+from chromadb.config import Settings
+
+from chroma_service import DEFAULT_HNSW, HNSW_SPACES, hnsw_metadata
+from embeddings import create_embedding_function
+
+TUNING_COLLECTION = "hnsw_tuning"
+ADD_BATCH = 5000
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 50, seed: int = 0) -> np.ndarray:
+    """Clustered Gaussian data; uniform noise makes every index look equally good or bad"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=n)
+    return (centers[labels] + rng.normal(scale=0.35, size=(n, dim))).astype(np.float32)
+
+
+def exact_neighbors(data: np.ndarray, queries: np.ndarray, k: int, space: str, chunk: int = 256) -> np.ndarray:
+    """Brute-force top-k indices for each query under Chroma's distance for ``space``"""
+    if space == "cosine":
+        data = data / np.maximum(np.linalg.norm(data, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    data_norms = (data * data).sum(axis=1)
+    result = np.empty((len(queries), k), dtype=np.int64)
+    for start in range(0, len(queries), chunk):
+        block = queries[start:start + chunk]
+        dots = block @ data.T
+        # Squared L2 without the per-query constant; ip and cosine rank by 1 - dot
+        distances = data_norms - 2 * dots if space == "l2" else -dots
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(distances, top, axis=1), axis=1)
+        result[start:start + chunk] = np.take_along_axis(top, order, axis=1)
+    return result
+
+
+def estimate_index_bytes(n: int, dim: int, m: int) -> int:
+    """
+    hnswlib's footprint: level-0 links (2M neighbours), the vector, label and
+    level bookkeeping per element, plus the expected upper-level links
+    (an element reaches level 1 with probability 1/M).
+    """
+    level0 = 2 * m * 4 + 4 + dim * 4 + 8
+    upper = (m * 4 + 4) / max(m - 1, 1)
+    bookkeeping = 8 + 4 + 40  # link list pointer, level, label lookup entry
+    return int(n * (level0 + upper + bookkeeping))
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(q / 100 * len(ordered))) - 1)]
+
+
+def evaluate(client, data: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int, hnsw: Dict[str, Any]) -> Dict[str, Any]:
+    """Build one collection with ``hnsw`` settings and measure it"""
+    try:
+        client.delete_collection(TUNING_COLLECTION)
+    except ValueError:
+        pass
+    collection = client.create_collection(TUNING_COLLECTION, metadata=hnsw_metadata(hnsw), embedding_function=None)
+
+    start = time.perf_counter()
+    for offset in range(0, len(data), ADD_BATCH):
+        batch = data[offset:offset + ADD_BATCH]
+        collection.add(ids=[str(i) for i in range(offset, offset + len(batch))], embeddings=batch.tolist())
+    build_seconds = time.perf_counter() - start
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])["ids"][0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(map(int, found)) & set(expected.tolist()))
+    client.delete_collection(TUNING_COLLECTION)
+
+    return {
+        **hnsw,
+        "buildSeconds": round(build_seconds, 2),
+        "recall": round(hits / (len(queries) * k), 4),
+        "p50Ms": round(_percentile(latencies, 50), 3),
+        "p95Ms": round(_percentile(latencies, 95), 3),
+        "estimatedIndexMB": round(estimate_index_bytes(len(data), data.shape[1], hnsw["M"]) / 2**20, 1),
+    }
+
+
+def tune(data: np.ndarray, queries: np.ndarray, k: int, grid: Dict[str, List[Any]], target_recall: float) -> Dict[str, Any]:
+    """Evaluate every combination in ``grid``; returns all results and the recommended one"""
+    client = chromadb.EphemeralClient(Settings(anonymized_telemetry=False, allow_reset=True))
+    truth_by_space = {space: exact_neighbors(data, queries, k, space) for space in grid["space"]}
+    results = []
+    for space, m, construction_ef, search_ef in itertools.product(
+        grid["space"], grid["M"], grid["construction_ef"], grid["search_ef"]
+    ):
+        hnsw = {"space": space, "M": m, "construction_ef": construction_ef, "search_ef": max(search_ef, k)}
+        result = evaluate(client, data, queries, truth_by_space[space], k, hnsw)
+        results.append(result)
+        print(_format_row(result), file=sys.stderr)
+
+    # Fastest setting that is accurate enough, memory as the tie-breaker
+    good = [r for r in results if r["recall"] >= target_recall]
+    if good:
+        best = min(good, key=lambda r: (r["p95Ms"], r["estimatedIndexMB"]))
+    else:
+        best = max(results, key=lambda r: (r["recall"], -r["p95Ms"]))
+    return {"vectors": len(data), "dim": int(data.shape[1]), "k": k, "targetRecall": target_recall,
+            "results": results, "recommended": best, "metTarget": bool(good)}
+
+
+def _format_row(r: Dict[str, Any]) -> str:
+    return (f"{r['space']:>6} M={r['M']:<3} construction_ef={r['construction_ef']:<4} search_ef={r['search_ef']:<4} "
+            f"build={r['buildSeconds']:>7.2f}s recall={r['recall']:.4f} p50={r['p50Ms']:.3f}ms "
+            f"p95={r['p95Ms']:.3f}ms index~{r['estimatedIndexMB']}MB")
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure recall, latency and memory of HNSW settings for Chroma")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--vectors", help="float32 .npy matrix of embeddings (rows are items)")
+    source.add_argument("--texts", help="Text file with one item per line, embedded with SKILLNEX_EMBEDDING")
+    source.add_argument("--synthetic", type=int, help="Generate this many clustered random vectors")
+    parser.add_argument("--dim", type=int, default=384, help="Dimension of synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Held-out query vectors")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--space", default=DEFAULT_HNSW["space"], help=f"Comma-separated, from {', '.join(HNSW_SPACES)}")
+    parser.add_argument("--M", default="8,16,32")
+    parser.add_argument("--construction-ef", default="100,200")
+    parser.add_argument("--search-ef", default="10,50,100")
+    parser.add_argument("--target-recall", type=float, default=0.95)
+    parser.add_argument("--json", help="Write all results to this file")
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    elif args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+        vectors = np.asarray(create_embedding_function()(lines), dtype=np.float32)
+    else:
+        vectors = synthetic_vectors(args.synthetic + args.queries, args.dim)
+    rng = np.random.default_rng(1)
+    held_out = rng.choice(len(vectors), size=min(args.queries, len(vectors) // 10 or 1), replace=False)
+    mask = np.ones(len(vectors), dtype=bool)
+    mask[held_out] = False
+
+    spaces = [s for s in args.space.split(",") if s]
+    unknown = set(spaces) - set(HNSW_SPACES)
+    if unknown:
+        parser.error(f"unknown space: {', '.join(sorted(unknown))}")
+    report = tune(vectors[mask], vectors[held_out], args.k, {
+        "space": spaces,
+        "M": _int_list(args.M),
+        "construction_ef": _int_list(args.construction_ef),
+        "search_ef": _int_list(args.search_ef),
+    }, args.target_recall)
+
+    best = report["recommended"]
+    verdict = "meets" if report["metTarget"] else "is closest to"
+    print(f"\nRecommended ({verdict} recall {args.target_recall}):\n{_format_row(best)}")
+    print("SKILLNEX_HNSW_CONFIG=" + json.dumps({"default": {key: best[key] for key in DEFAULT_HNSW}}))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
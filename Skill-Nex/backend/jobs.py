@@ -0,0 +1,364 @@
+"""
+Persistent background jobs for analyses too large for one HTTP request.
+
+``job_queue.submit(kind, payload)`` stores a job in SQLite and returns its
+id at once. Worker threads claim jobs highest priority first (oldest first
+within a priority) and run the handler registered for the job's kind.
+Clients then poll the status and fetch the result. The queue lives in a
+local SQLite file, so it needs no outside services, survives restarts and
+can be shared by several worker processes. A claim is a single
+transaction, so each job runs in one place at a time.
+
+- Progress: handlers report ``done``/``total`` through their JobContext,
+  and the status shows it while the job runs.
+- Retries: a failing job is re-queued with exponential backoff until it
+  has used ``max_attempts``.
+- Leases: a running job holds a lease that progress updates renew. Jobs
+  whose worker died are picked up again once the lease expires, or failed
+  if that was their last attempt.
+- Expiry: finished jobs and their results are deleted ``result_ttl``
+  seconds after they finish.
+- Cancellation: queued jobs are cancelled immediately. A running job stops
+  at its next progress report. A job running in this process also has its
+  ``cancelled`` event set at once, so handlers blocked on a wait can stop.
+"""
+
+import atexit
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("SKILLNEX_DATA_DIR", os.path.join(BASE_DIR, "data"))
+
+STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+FINISHED = ("succeeded", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    total INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    run_after REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_expiry ON jobs (expires_at);
+"""
+
+# Minimum seconds between progress writes of one job
+PROGRESS_INTERVAL = 0.5
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job was cancelled"""
+
+
+class JobContext:
+    """Handed to a handler: reports progress and notices cancellation"""
+
+    def __init__(self, queue: "JobQueue", job_id: str, attempt: int):
+        self.queue = queue
+        self.job_id = job_id
+        self.attempt = attempt
+        # Set once cancellation is noticed, for handlers that wait on something other than progress
+        self.cancelled = threading.Event()
+        self._last_write = 0.0
+
+    def progress(self, done: int, total: Optional[int] = None, force: bool = False) -> None:
+        """Record progress and renew the lease; raises JobCancelled if the job was cancelled or reclaimed"""
+        now = time.time()
+        if not force and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        if self.queue._heartbeat(self.job_id, self.attempt, done, total):
+            self.cancelled.set()
+            raise JobCancelled(self.job_id)
+
+
+class JobQueue:
+    """SQLite-backed priority queue of jobs with a local pool of worker threads"""
+
+    def __init__(self, path: str, workers: int = 2, max_attempts: int = 3, backoff: float = 2.0,
+                 lease: float = 300.0, result_ttl: float = 3600.0, poll_interval: float = 1.0):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self.handlers: Dict[str, Callable[[Dict[str, Any], JobContext], Any]] = {}
+        self._local = threading.local()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._start_lock = threading.Lock()
+        # Contexts of the jobs this process is running, so a local cancel reaches them at once
+        self._running: Dict[str, JobContext] = {}
+        self._running_lock = threading.Lock()
+        self._last_purge = 0.0
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0, "retried": 0, "cancelled": 0, "expired": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str, n: int = 1) -> None:
+        """Bump one counter; every worker thread and request thread updates them"""
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any], JobContext], Any]) -> None:
+        """``handler(payload, context)`` returns the JSON-serializable result of one job"""
+        self.handlers[kind] = handler
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit; claims open their own write transaction
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def start(self) -> None:
+        """Start the worker threads (idempotent)"""
+        with self._start_lock:
+            if any(t.is_alive() for t in self._threads):
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            atexit.register(self.stop)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop taking jobs; running jobs are left to their lease and resumed by the next worker"""
+        self._stop.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, kind: str, payload: Dict[str, Any], priority: int = 0, max_attempts: Optional[int] = None) -> str:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind '{kind}', expected one of {', '.join(sorted(self.handlers))}")
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, status, priority, payload, max_attempts, created_at, run_after) "
+            "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+            (job_id, kind, int(priority), json.dumps(payload), max_attempts or self.max_attempts, now, now)
+        )
+        self._count("submitted")
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def status(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Job state and progress, or None for unknown and expired jobs"""
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or (row["expires_at"] is not None and row["expires_at"] < time.time()):
+            return None
+        job = {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "priority": row["priority"],
+            "attempts": row["attempts"],
+            "maxAttempts": row["max_attempts"],
+            "progress": {
+                "done": row["done"],
+                "total": row["total"],
+                "percent": round(100 * row["done"] / row["total"], 1) if row["total"] else None,
+            },
+            "createdAt": row["created_at"],
+            "startedAt": row["started_at"],
+            "finishedAt": row["finished_at"],
+            "expiresAt": row["expires_at"],
+            "error": row["error"],
+        }
+        if row["status"] == "queued" and row["run_after"] > time.time():
+            job["retryAt"] = row["run_after"]
+        if include_result:
+            job["result"] = json.loads(row["result"]) if row["result"] is not None else None
+        return job
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a job; returns its resulting status, or None if it does not exist"""
+        conn = self._conn()
+        now = time.time()
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ?, expires_at = ? WHERE id = ? AND status = 'queued'",
+            (now, now + self.result_ttl, job_id)
+        )
+        if cursor.rowcount:
+            self._count("cancelled")
+            return "cancelled"
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+        with self._running_lock:
+            context = self._running.get(job_id)
+        if context is not None:
+            context.cancelled.set()
+        job = self.status(job_id)
+        return job["status"] if job else None
+
+    def counts(self) -> Dict[str, Any]:
+        """Jobs per status in the store, plus this process's counters"""
+        rows = self._conn().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        by_status = {status: 0 for status in STATUSES}
+        by_status.update({row["status"]: row["n"] for row in rows})
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return dict(stats, jobs=by_status, workers=sum(t.is_alive() for t in self._threads))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._purge_expired()
+            job = self._claim()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            self._execute(job)
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        conn = self._conn()
+        now = time.time()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # A job that took its worker down on every attempt (OOM, segfault) is not run again
+            lost = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL, expires_at = ? "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts",
+                ("Worker lost on the last attempt", now, now + self.result_ttl, now)
+            ).rowcount
+            # Running jobs whose lease ran out lost their worker; they count as queued again
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = 'queued' AND run_after <= ?) "
+                "OR (status = 'running' AND lease_until < ? AND attempts < max_attempts) "
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, lease_until = ? WHERE id = ?",
+                    (now, now + self.lease, row["id"])
+                )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            print(f"Error claiming job: {e}")
+            return None
+        self._count("failed", lost)
+        return row
+
+    def _execute(self, row: sqlite3.Row) -> None:
+        job_id = row["id"]
+        attempt = row["attempts"] + 1
+        handler = self.handlers.get(row["kind"])
+        context = JobContext(self, job_id, attempt)
+        with self._running_lock:
+            self._running[job_id] = context
+        try:
+            self._run_handler(row, handler, context)
+        finally:
+            with self._running_lock:
+                self._running.pop(job_id, None)
+
+    def _run_handler(self, row: sqlite3.Row, handler, context: JobContext) -> None:
+        job_id = row["id"]
+        attempt = context.attempt
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job kind '{row['kind']}'")
+            result = handler(json.loads(row["payload"]), context)
+            self._finish(job_id, attempt, "succeeded", result=json.dumps(result))
+            self._count("succeeded")
+        except JobCancelled:
+            self._finish(job_id, attempt, "cancelled")
+            self._count("cancelled")
+        except Exception as e:
+            if context.cancelled.is_set():
+                # Whatever the handler raised on its way out, the job was cancelled, not failed
+                self._finish(job_id, attempt, "cancelled")
+                self._count("cancelled")
+                return
+            if attempt < row["max_attempts"]:
+                # Exponential backoff with jitter, so a burst of failures does not retry in lockstep
+                delay = self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                self._conn().execute(
+                    "UPDATE jobs SET status = 'queued', run_after = ?, lease_until = NULL, error = ? "
+                    "WHERE id = ? AND attempts = ?",
+                    (time.time() + delay, str(e), job_id, attempt)
+                )
+                self._count("retried")
+            else:
+                print(f"Job {job_id} ({row['kind']}) failed after {attempt} attempts: {e}")
+                self._finish(job_id, attempt, "failed", error=str(e))
+                self._count("failed")
+
+    def _finish(self, job_id: str, attempt: int, status: str, result: Optional[str] = None,
+                error: Optional[str] = None) -> None:
+        """Store the outcome, unless the lease ran out and another worker has claimed the job since"""
+        now = time.time()
+        self._conn().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL, expires_at = ? "
+            "WHERE id = ? AND attempts = ?",
+            (status, result, error, now, now + self.result_ttl, job_id, attempt)
+        )
+
+    def _heartbeat(self, job_id: str, attempt: int, done: int, total: Optional[int]) -> bool:
+        """Write progress and renew the lease; True when cancellation was requested or the job was reclaimed"""
+        conn = self._conn()
+        cursor = conn.execute(
+            "UPDATE jobs SET done = ?, total = COALESCE(?, total), lease_until = ? WHERE id = ? AND attempts = ?",
+            (int(done), total, time.time() + self.lease, job_id, attempt)
+        )
+        if not cursor.rowcount:
+            # The lease ran out and another attempt owns the job now; this one stops
+            return True
+        row = conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        cursor = self._conn().execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at < ?", (now,))
+        self._count("expired", cursor.rowcount)
+
+
+# Shared queue for the API process
+job_queue = JobQueue(
+    os.environ.get("SKILLNEX_JOBS_DB", os.path.join(DATA_DIR, "jobs.sqlite3")),
+    workers=int(os.environ.get("SKILLNEX_JOB_WORKERS", 2)),
+    result_ttl=float(os.environ.get("SKILLNEX_JOB_RESULT_TTL", 3600))
+)
@@ -0,0 +1,300 @@
+"""
+Knowledge base for the AI service.
+
+The career, skill, project and trait tables live in a versioned JSON file
+(knowledge/knowledge_base.json). The JSON is compiled once into a compact
+binary snapshot next to it, so later starts only unpickle the snapshot. A
+watcher thread polls the source file and swaps in a freshly compiled
+KnowledgeBase when it changes.
+
+Request handlers grab ``knowledge_base.current()`` once and pass that object
+down. A reload only replaces the store's reference, so requests that are
+already running finish on the version they started with.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from answer_matching import AnswerMatcher
+from career_matching import CareerMatcher, compile_career_matrix
+from project_index import ProjectIndex
+from skill_graph import SkillGraph, compile_skill_graph
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SOURCE = os.environ.get(
+    "SKILLNEX_KNOWLEDGE_BASE",
+    os.path.join(BASE_DIR, "knowledge", "knowledge_base.json")
+)
+
+# Snapshot layout: magic, format version, source mtime_ns, source size, source sha256, pickle payload
+SNAPSHOT_MAGIC = b"SNKB"
+SNAPSHOT_FORMAT = 3
+_HEADER = struct.Struct("<4sHqq32s")
+
+# Tables every knowledge base file must provide
+TABLES = (
+    "traits",
+    "trait_descriptions",
+    "personality_types",
+    "strength_descriptions",
+    "development_descriptions",
+    "learning_styles",
+    "careers",
+    "trait_skills",
+    "career_skill_map",
+    "skill_prerequisites",
+    "industries",
+    "career_requirements",
+    "skill_categories",
+    "in_demand_skills",
+    "project_templates",
+    "assessment_questions",
+)
+
+
+class KnowledgeBaseError(ValueError):
+    """Raised when a knowledge base file is missing tables or malformed"""
+
+
+class KnowledgeBase:
+    """Read-only view over one compiled version of the knowledge tables"""
+
+    def __init__(self, tables: Dict[str, Any], source_hash: str = ""):
+        self.version = tables["version"]
+        self.source_hash = source_hash
+        self.tables = tables
+        for name in TABLES:
+            setattr(self, name, tables[name])
+        self.career_matcher = CareerMatcher(self.careers, self.traits, tables["career_matrix"])
+        self.skill_graph = SkillGraph(tables["skill_graph"])
+        self.project_index = ProjectIndex(self.project_templates)
+        self.industry_of = {career: industry for industry, careers in self.industries.items() for career in careers}
+        # Built on load rather than stored, so rule changes in code never meet a stale snapshot
+        self.answer_matcher = AnswerMatcher(self.traits, self.assessment_questions)
+
+    def summary(self) -> Dict[str, Any]:
+        """Sizes of the main tables, for logs and health output"""
+        return {
+            "version": self.version,
+            "hash": self.source_hash[:12],
+            "careers": len(self.careers),
+            "careerPaths": len(self.career_skill_map),
+            "skills": len(self.skill_graph.names),
+            "skillCategories": len(self.skill_categories),
+            "projectTemplates": len(self.project_index),
+        }
+
+
+def _validate(tables: Dict[str, Any]) -> None:
+    """Check the raw JSON has the shape the analyzers expect"""
+    if not isinstance(tables, dict):
+        raise KnowledgeBaseError("Knowledge base root must be an object")
+    if "version" not in tables:
+        raise KnowledgeBaseError("Knowledge base is missing 'version'")
+    missing = [name for name in TABLES if name not in tables]
+    if missing:
+        raise KnowledgeBaseError(f"Knowledge base is missing tables: {', '.join(missing)}")
+
+    traits = set(tables["traits"])
+    for table in ("trait_descriptions", "personality_types", "strength_descriptions", "development_descriptions"):
+        unknown = set(tables[table]) - traits
+        if unknown:
+            raise KnowledgeBaseError(f"'{table}' references unknown traits: {', '.join(sorted(unknown))}")
+
+    skills = set(tables["skill_prerequisites"])
+    for career, tiers in tables["career_skill_map"].items():
+        unknown = {skill for tier in tiers.values() for skill in tier} - skills
+        if unknown:
+            raise KnowledgeBaseError(f"Career path '{career}' uses skills without prerequisites: {', '.join(sorted(unknown))}")
+
+
+def _compile(tables: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn validated source tables into the structure stored in the snapshot"""
+    _validate(tables)
+    compiled = dict(tables)
+    try:
+        compiled["career_matrix"] = compile_career_matrix(tables["careers"], tables["traits"])
+        compiled["skill_graph"] = compile_skill_graph(tables["skill_prerequisites"])
+    except ValueError as e:
+        raise KnowledgeBaseError(str(e)) from e
+    return compiled
+
+
+def _read_source(source_path: str) -> Tuple[bytes, os.stat_result]:
+    with open(source_path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        return f.read(), stat
+
+
+def compile_knowledge_base(source_path: str = DEFAULT_SOURCE, snapshot_path: Optional[str] = None) -> KnowledgeBase:
+    """Compile the JSON source and write its binary snapshot atomically"""
+    snapshot_path = snapshot_path or _snapshot_path_for(source_path)
+    raw, stat = _read_source(source_path)
+    digest = hashlib.sha256(raw).digest()
+
+    try:
+        tables = json.loads(raw.decode("utf-8"))
+    except ValueError as e:
+        raise KnowledgeBaseError(f"Invalid knowledge base JSON in {source_path}: {e}") from e
+    compiled = _compile(tables)
+
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, stat.st_mtime_ns, stat.st_size, digest)
+    payload = pickle.dumps(compiled, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_path, snapshot_path)
+    except OSError as e:
+        # A read-only deployment can still run from the in-memory compile
+        print(f"Could not write knowledge base snapshot {snapshot_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return KnowledgeBase(compiled, digest.hex())
+
+
+def _read_snapshot_header(snapshot_path: str) -> Optional[Tuple[int, int, bytes]]:
+    try:
+        with open(snapshot_path, "rb") as f:
+            header = f.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(header) != _HEADER.size:
+        return None
+    magic, fmt, mtime_ns, size, digest = _HEADER.unpack(header)
+    if magic != SNAPSHOT_MAGIC or fmt != SNAPSHOT_FORMAT:
+        return None
+    return mtime_ns, size, digest
+
+
+def load_knowledge_base(source_path: str = DEFAULT_SOURCE, snapshot_path: Optional[str] = None) -> KnowledgeBase:
+    """Load the snapshot if it matches the source, recompiling it otherwise"""
+    snapshot_path = snapshot_path or _snapshot_path_for(source_path)
+    header = _read_snapshot_header(snapshot_path)
+
+    if header is not None:
+        mtime_ns, size, digest = header
+        stat = os.stat(source_path)
+        fresh = stat.st_mtime_ns == mtime_ns and stat.st_size == size
+        if not fresh:
+            # Touched but unchanged files do not need a recompile
+            raw, _ = _read_source(source_path)
+            fresh = hashlib.sha256(raw).digest() == digest
+        if fresh:
+            try:
+                with open(snapshot_path, "rb") as f:
+                    f.seek(_HEADER.size)
+                    return KnowledgeBase(pickle.load(f), digest.hex())
+            except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError, ImportError) as e:
+                # Truncated, damaged or written by another Python/numpy: rebuild it from the source
+                print(f"Knowledge base snapshot {snapshot_path} is unreadable, recompiling: {e}")
+
+    return compile_knowledge_base(source_path, snapshot_path)
+
+
+def _snapshot_path_for(source_path: str) -> str:
+    return os.path.splitext(source_path)[0] + ".snapshot"
+
+
+class KnowledgeBaseStore:
+    """Holds the live KnowledgeBase and hot-reloads it when the source file changes"""
+
+    def __init__(self, source_path: str = DEFAULT_SOURCE, snapshot_path: Optional[str] = None, poll_interval: float = 2.0):
+        self.source_path = source_path
+        self.snapshot_path = snapshot_path or _snapshot_path_for(source_path)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._stat_key = None
+        self._current = None
+        self.reloads = 0
+        self.last_error = None
+
+    def current(self) -> KnowledgeBase:
+        """Return the live version; callers should hold on to it for a whole request"""
+        kb = self._current
+        if kb is None:
+            with self._lock:
+                if self._current is None:
+                    self._stat_key = self._source_stat_key()
+                    self._current = load_knowledge_base(self.source_path, self.snapshot_path)
+                kb = self._current
+        return kb
+
+    def reload(self, force: bool = False) -> bool:
+        """Recompile if the source changed; returns True when a new version was swapped in"""
+        with self._lock:
+            stat_key = self._source_stat_key()
+            if not force and self._current is not None and stat_key == self._stat_key:
+                return False
+            try:
+                kb = load_knowledge_base(self.source_path, self.snapshot_path)
+            except (OSError, KnowledgeBaseError) as e:
+                # Keep serving the previous version until the file is fixed
+                self.last_error = str(e)
+                self._stat_key = stat_key
+                print(f"Knowledge base reload failed, keeping version {getattr(self._current, 'version', None)}: {e}")
+                return False
+            self._stat_key = stat_key
+            self.last_error = None
+            changed = self._current is None or kb.source_hash != self._current.source_hash
+            self._current = kb
+            if changed:
+                self.reloads += 1
+            return changed
+
+    def start_watcher(self) -> None:
+        """Poll the source file in a daemon thread and reload on change"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self.current()
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="knowledge-base-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.poll_interval + 1)
+            self._watcher = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            if self._source_stat_key() != self._stat_key and self.reload():
+                print(f"Knowledge base reloaded: {self._current.summary()}")
+
+    def _source_stat_key(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.source_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+# Shared store for the API process
+knowledge_base = KnowledgeBaseStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile the knowledge base JSON into its binary snapshot")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="Knowledge base JSON file")
+    parser.add_argument("--snapshot", default=None, help="Snapshot output path (defaults next to the source)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    compiled = compile_knowledge_base(args.source, args.snapshot)
+    print(f"Compiled in {(time.perf_counter() - start) * 1000:.1f}ms: {compiled.summary()}")
+
+    start = time.perf_counter()
+    load_knowledge_base(args.source, args.snapshot)
+    print(f"Snapshot loads in {(time.perf_counter() - start) * 1000:.2f}ms")
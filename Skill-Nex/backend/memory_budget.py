@@ -0,0 +1,276 @@
+"""
+Memory accounting for the caches and indexes of one worker.
+
+Each cache or index registers a component: a function that estimates its
+size in bytes and, if the component can give memory back, an ``evict``
+function and a priority. A daemon thread sums the estimates every few
+seconds. When the total exceeds the budget, it evicts from the evictable
+components, lowest priority first and the largest first within a
+priority, until the estimate is back under the budget. Caches that refill
+on demand get low priorities. Data that is lost when evicted gets high
+ones.
+
+Estimates are what the component reports (entries x bytes per entry, or a
+deep ``sys.getsizeof`` walk for structures that only change on reload).
+They do not include the interpreter or libraries, so the process RSS is
+reported next to them.
+
+AllocationTracker wraps tracemalloc for leak hunts in long-running
+workers. It is off by default. Once started, each snapshot reports the
+top allocation sites and the difference from the previous snapshot.
+"""
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Budget for the registered components, in MB; 0 only reports
+DEFAULT_BUDGET_MB = float(os.environ.get("SKILLNEX_MEMORY_BUDGET_MB", 512))
+# Seconds between checks
+DEFAULT_CHECK_INTERVAL = float(os.environ.get("SKILLNEX_MEMORY_CHECK_INTERVAL", 15))
+# lru_cache's linked-list node and dict slot per entry
+_LRU_ENTRY_OVERHEAD = 200
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """Approximate bytes held by ``obj`` and everything it references; numpy arrays count their buffers"""
+    seen = set() if seen is None else seen
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, np.ndarray):
+            # Views into a mapping or another array own no buffer
+            total += sys.getsizeof(item) if item.base is not None else item.nbytes + 112
+            continue
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif not isinstance(item, (str, bytes, int, float, bool, type(None))):
+            attributes = getattr(item, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+    return total
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size of this process, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Component:
+    """One registered cache or index"""
+
+    def __init__(self, name: str, size: Callable[[], int], evict: Optional[Callable[[int], Any]] = None,
+                 priority: int = 0, shared: bool = False):
+        self.name = name
+        self.size = size
+        self.evict = evict
+        self.priority = priority
+        # Mapped files are shared with the other workers; they are reported but not counted
+        self.shared = shared
+        self.bytes = 0
+        self.error: Optional[str] = None
+        self.evictions = 0
+        self.freed = 0
+
+    def measure(self) -> int:
+        try:
+            self.bytes = int(self.size() or 0)
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+        return self.bytes
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "bytes": self.bytes,
+            "priority": self.priority if self.evict else None,
+            "evictable": self.evict is not None,
+            "shared": self.shared,
+            "evictions": self.evictions,
+            "freedBytes": self.freed,
+            "error": self.error,
+        }
+
+
+class MemoryBudget:
+    """Registered component sizes against one budget, with eviction by priority"""
+
+    def __init__(self, limit_bytes: int, check_interval: float = DEFAULT_CHECK_INTERVAL):
+        self.limit_bytes = limit_bytes
+        self.check_interval = check_interval
+        self._components: Dict[str, Component] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"checks": 0, "overBudget": 0, "evictions": 0, "freedBytes": 0}
+        self.last_eviction: Optional[float] = None
+
+    def register(self, name: str, size: Callable[[], int], evict: Optional[Callable[[int], Any]] = None,
+                 priority: int = 0, shared: bool = False) -> None:
+        """
+        Track a component. ``size`` returns its estimated bytes. ``evict(bytes)``
+        tries to free at least that much; what it freed is measured afterwards.
+        Lower priorities are evicted first. Registering a name again replaces it.
+        """
+        with self._lock:
+            self._components[name] = Component(name, size, evict, priority, shared)
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._components.pop(name, None)
+
+    def _measure(self) -> int:
+        return sum(c.measure() for c in self._components.values() if not c.shared)
+
+    def check(self) -> int:
+        """Measure every component and evict while over budget; returns the bytes freed"""
+        with self._lock:
+            self.stats["checks"] += 1
+            total = self._measure()
+            if not self.limit_bytes or total <= self.limit_bytes:
+                return 0
+            self.stats["overBudget"] += 1
+            candidates = sorted(
+                (c for c in self._components.values() if c.evict is not None and not c.shared and c.bytes > 0),
+                key=lambda c: (c.priority, -c.bytes)
+            )
+            freed = 0
+            for component in candidates:
+                if total - freed <= self.limit_bytes:
+                    break
+                before = component.bytes
+                try:
+                    component.evict(total - freed - self.limit_bytes)
+                except Exception as e:
+                    component.error = f"eviction failed: {e}"
+                    print(f"Could not evict from {component.name}: {e}")
+                    continue
+                released = max(before - component.measure(), 0)
+                component.evictions += 1
+                component.freed += released
+                self.stats["evictions"] += 1
+                freed += released
+                print(f"Memory budget: evicted {released} bytes from {component.name}")
+            self.stats["freedBytes"] += freed
+            self.last_eviction = time.time()
+            return freed
+
+    def start(self) -> None:
+        """Check periodically in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-budget", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.check_interval + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            self.check()
+
+    def snapshot(self, measure: bool = False) -> Dict[str, Any]:
+        """Gauges per component, as of the last check unless ``measure`` is set"""
+        with self._lock:
+            total = self._measure() if measure else sum(c.bytes for c in self._components.values() if not c.shared)
+            return dict(
+                self.stats,
+                limitBytes=self.limit_bytes or None,
+                estimatedBytes=total,
+                sharedBytes=sum(c.bytes for c in self._components.values() if c.shared),
+                rssBytes=rss_bytes(),
+                lastEviction=self.last_eviction,
+                components={name: c.snapshot() for name, c in sorted(self._components.items())},
+            )
+
+
+def lru_entry_bytes(sample_key: Any, sample_value: Any) -> int:
+    """Estimated bytes per functools.lru_cache entry, from one representative key and value"""
+    return deep_sizeof((sample_key, sample_value)) + _LRU_ENTRY_OVERHEAD
+
+
+class AllocationTracker:
+    """tracemalloc on demand: top allocation sites, and growth since the previous snapshot"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self.started_at: Optional[float] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self.started_at = time.time()
+            self._previous = None
+
+    def stop(self) -> None:
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+            self.started_at = None
+
+    def snapshot(self, limit: int = 20, group_by: str = "lineno") -> Dict[str, Any]:
+        """Top ``limit`` sites by size, and the largest changes since the last call"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("tracemalloc is not running; start it first")
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ))
+            current, peak = tracemalloc.get_traced_memory()
+            result = {
+                "tracedBytes": current,
+                "peakBytes": peak,
+                "top": [
+                    {"where": self._where(stat.traceback), "bytes": stat.size, "count": stat.count}
+                    for stat in snapshot.statistics(group_by)[:limit]
+                ],
+                "diff": None,
+            }
+            if self._previous is not None:
+                result["diff"] = [
+                    {"where": self._where(stat.traceback), "bytes": stat.size, "bytesDiff": stat.size_diff,
+                     "countDiff": stat.count_diff}
+                    for stat in snapshot.compare_to(self._previous, group_by)[:limit]
+                ]
+            self._previous = snapshot
+            return result
+
+    @staticmethod
+    def _where(traceback: tracemalloc.Traceback) -> List[str]:
+        return [f"{frame.filename}:{frame.lineno}" for frame in traceback]
+
+    def status(self) -> Dict[str, Any]:
+        return {"tracing": self.tracing, "startedAt": self.started_at, "frames": tracemalloc.get_traceback_limit()}
+
+
+# Shared budget and tracker for the API process
+memory_budget = MemoryBudget(int(DEFAULT_BUDGET_MB * 1024 * 1024))
+allocation_tracker = AllocationTracker()
@@ -0,0 +1,255 @@
+"""
+"Portfolios like mine": analyzed portfolios in Chroma's portfolio_analysis collection.
+
+Request handlers call ``portfolio_index.record(...)``, which only puts a
+compact summary on a bounded in-memory queue. A background writer thread
+drains the queue in batches: one upsert per batch, so the embedding model
+runs once for many portfolios. A student's newest analysis replaces the
+previous one, and anonymous portfolios are keyed by content.
+
+Every ``prune_interval`` seconds the writer deletes entries older than
+``max_age`` and then the oldest entries beyond ``max_entries``. The index
+stays small, so nearest-neighbour queries stay fast.
+
+The collection lives wherever the Chroma service keeps it. With the
+default in-memory client, every worker only sees the portfolios it
+analyzed. Set SKILLNEX_CHROMA_URL so all workers share one index.
+"""
+
+import atexit
+import hashlib
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from cooccurrence import skill_key
+from portfolio_pipeline import portfolio_pipeline
+
+# Metadata values must be scalars, so skill lists are joined with this
+SKILL_SEPARATOR = "|"
+
+_STOP = object()
+
+
+def portfolio_document(projects: List[Dict[str, Any]], skills: List[str]) -> str:
+    """Text that is embedded for a portfolio, and for the query that looks for similar ones"""
+    titles = [str(p.get("title") or p.get("name") or "") for p in projects if isinstance(p, dict)]
+    return (
+        f"Skills: {', '.join(portfolio_skills(projects, skills))}\n"
+        f"Projects: {'; '.join(t for t in titles if t)}"
+    )
+
+
+def portfolio_skills(projects: List[Dict[str, Any]], skills: List[str]) -> List[str]:
+    """Listed skills and project technologies, once each, in first-seen spelling"""
+    names: Dict[str, str] = {}
+    technologies = [t for p in projects if isinstance(p, dict) for t in (p.get("technologies") or [])]
+    for name in list(skills) + technologies:
+        key = skill_key(name)
+        if key:
+            names.setdefault(key, " ".join(str(name).split()))
+    return list(names.values())
+
+
+class PortfolioIndex:
+    """Batching writer and similar-portfolio search over the portfolio_analysis collection"""
+
+    def __init__(self, vector_service: Callable[[], Any], max_entries: int = 5000, max_age: float = 180 * 86400,
+                 max_queue: int = 10000, batch_size: int = 64, flush_interval: float = 1.0,
+                 prune_interval: float = 300.0):
+        self.vector_service = vector_service
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.prune_interval = prune_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._writer = None
+        self._start_lock = threading.Lock()
+        self._last_prune = 0.0
+        self.stats = {"enqueued": 0, "written": 0, "dropped": 0, "batches": 0, "pruned": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str, n: int = 1) -> None:
+        """Bump one counter; request threads and the writer thread all update them"""
+        with self._stats_lock:
+            self.stats[name] += n
+
+    def start(self) -> None:
+        """Start the writer thread (idempotent)"""
+        with self._start_lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._run, name="portfolio-index-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush everything still queued and stop the writer"""
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+        self._writer = None
+
+    def record(self, analysis: Dict[str, Any], projects: List[Dict[str, Any]], skills: List[str],
+               user_id: Optional[str] = None, cohort: Optional[str] = None) -> bool:
+        """Queue one analyzed portfolio for the index; returns False if it was dropped"""
+        if self._writer is None:
+            self.start()
+        strength = analysis.get("portfolioStrength", {})
+        careers = analysis.get("careerAlignment") or []
+        top_career = max(careers, key=lambda c: c["alignment"])["career"] if careers else ""
+        document = portfolio_document(projects, skills)
+        metadata = {
+            "user_id": str(user_id) if user_id else "",
+            # Chroma only stores scalar metadata; ids come from request bodies
+            "cohort": str(cohort) if cohort is not None else "",
+            "strength": strength.get("score", 0),
+            "rating": strength.get("rating", ""),
+            "complexity": analysis.get("projectAnalysis", {}).get("complexity", ""),
+            "top_career": top_career,
+            "projects": len(projects),
+            "skills": SKILL_SEPARATOR.join(portfolio_skills(projects, skills)),
+            "created_at": time.time(),
+        }
+        try:
+            self._queue.put_nowait((self._entry_id(user_id, document), document, metadata))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+        return True
+
+    @staticmethod
+    def _entry_id(user_id: Optional[str], document: str) -> str:
+        if user_id:
+            return f"user:{user_id}"
+        return "anon:" + hashlib.sha1(document.encode("utf-8")).hexdigest()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                first = None
+            stopping = first is _STOP
+            batch = [] if first is None or stopping else [first]
+            while not stopping and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+            if stopping:
+                # Drain whatever is left before exiting
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+            if batch:
+                self._write_batch(batch)
+            if time.time() - self._last_prune >= self.prune_interval and self.stats["written"]:
+                self.prune()
+            if stopping:
+                return
+
+    def _write_batch(self, batch: List[tuple]) -> None:
+        # The same student twice in one batch keeps the newest analysis
+        entries = {entry_id: (document, metadata) for entry_id, document, metadata in batch}
+        service = self.vector_service()
+        if service is None:
+            self._count("errors")
+            print(f"Error writing {len(entries)} portfolios to the similarity index: vector service unavailable")
+            return
+        self._write_entries(service, entries)
+
+    def _write_entries(self, service, entries: Dict[str, tuple]) -> None:
+        try:
+            service.add_portfolios(
+                list(entries),
+                [document for document, _ in entries.values()],
+                [metadata for _, metadata in entries.values()]
+            )
+        except Exception as e:
+            if len(entries) == 1:
+                self._count("errors")
+                print(f"Error writing a portfolio to the similarity index: {e}")
+                return
+            # One entry at a time, so a bad entry only loses itself
+            for entry_id, entry in entries.items():
+                self._write_entries(service, {entry_id: entry})
+            return
+        self._count("written", len(entries))
+        self._count("batches")
+
+    def prune(self) -> int:
+        """Drop entries past the age and count limits; returns how many were removed"""
+        self._last_prune = time.time()
+        try:
+            service = self.vector_service()
+            if service is None:
+                return 0
+            pruned = service.prune_portfolios(self.max_entries, created_before=time.time() - self.max_age)
+        except Exception as e:
+            self._count("errors")
+            print(f"Error pruning the portfolio similarity index: {e}")
+            return 0
+        self._count("pruned", pruned)
+        return pruned
+
+    def similar(self, projects: List[Dict[str, Any]], skills: List[str], limit: int = 5,
+                user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        The ``limit`` nearest analyzed portfolios, excluding the student's own,
+        with their strength and the skills they have that this portfolio lacks
+        """
+        service = self.vector_service()
+        if service is None:
+            raise RuntimeError("vector service unavailable")
+        document = portfolio_document(projects, skills)
+        own = self._entry_id(user_id, document)
+        known = {skill_key(s) for s in portfolio_skills(projects, skills)}
+        # One extra result in case the portfolio itself is indexed
+        neighbours = service.similar_portfolios(
+            document, limit + 1, where={"user_id": {"$ne": str(user_id)}} if user_id else None
+        )
+        peers = []
+        for neighbour in neighbours:
+            if neighbour["id"] == own:
+                continue
+            metadata = neighbour["metadata"]
+            peer_skills = [s for s in metadata.get("skills", "").split(SKILL_SEPARATOR) if s]
+            peers.append({
+                "similarity": round(neighbour["similarity"], 4),
+                "portfolioStrength": metadata.get("strength"),
+                "rating": metadata.get("rating"),
+                "complexity": metadata.get("complexity"),
+                "topCareer": metadata.get("top_career"),
+                "projects": metadata.get("projects"),
+                "cohort": metadata.get("cohort") or None,
+                "skillsYouLack": [s for s in peer_skills if skill_key(s) not in known],
+            })
+        return peers[:limit]
+
+    def queue_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return dict(stats, queued=self._queue.qsize(), maxEntries=self.max_entries,
+                    maxAgeDays=round(self.max_age / 86400, 2))
+
+
+# Shared index writer for the API process
+portfolio_index = PortfolioIndex(
+    portfolio_pipeline.vector_service,
+    max_entries=int(os.environ.get("SKILLNEX_PORTFOLIO_INDEX_MAX", 5000)),
+    max_age=float(os.environ.get("SKILLNEX_PORTFOLIO_INDEX_MAX_AGE_DAYS", 180)) * 86400,
+)
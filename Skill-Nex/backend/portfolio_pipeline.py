@@ -0,0 +1,562 @@
+"""
+Portfolio analysis as one pipeline of shared stages, served in tiers.
+
+Every analysis runs the same rule stages over the knowledge base tables:
+strength, projects, skill gaps, recommendations, career alignment, industry
+demand and competitive position. They cost tens of microseconds. The
+vector tier adds one retrieval step against the Chroma collections, and
+that retrieval replaces the rule-based skill gaps and career alignment
+with the nearest skills and careers.
+
+- ``fast``: rules only.
+- ``full``: rules plus vector retrieval.
+- ``auto``: rules, escalating to ``full`` only when the fast result has
+  low confidence. That means many of the listed skills are unknown to the
+  knowledge base, or no career aligns well.
+
+Sections are computed lazily. A request may select some of them with
+``fields``, and then only those sections and the stages they depend on
+run. Retrieval runs only when a selected section uses its hits, so a
+request for ``portfolioStrength`` alone never touches Chroma, whatever
+the tier.
+
+Industry demand is read from the job-postings demand index when postings
+have been ingested (see demand_index), and from rules otherwise.
+
+Chroma is imported on first use, so a worker that only serves ``fast``
+never loads it. When the vector tier is unavailable, the fast result is
+returned and ``analysisTier`` says why.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from demand_index import MIN_DEMAND, TRENDING_RATIO, demand_index, demand_level
+from quantile_sketch import population_stats
+
+TIERS = ("fast", "full", "auto")
+DEFAULT_TIER = os.environ.get("SKILLNEX_ANALYSIS_TIER", "fast")
+if DEFAULT_TIER not in TIERS:
+    raise ValueError(f"SKILLNEX_ANALYSIS_TIER must be one of {', '.join(TIERS)}")
+
+# auto escalates when confidence in the fast result is below this
+ESCALATE_BELOW = float(os.environ.get("SKILLNEX_ESCALATE_BELOW", 0.6))
+# Best rule-based career alignment (percent) that counts as a confident match
+CONFIDENT_ALIGNMENT = 50.0
+
+# Seconds before a failed Chroma import is tried again
+VECTOR_RETRY_AFTER = 60.0
+
+# Response sections in output order
+PORTFOLIO_SECTIONS = ("portfolioStrength", "projectAnalysis", "recommendations", "skillGaps",
+                      "careerAlignment", "industryDemand", "competitiveAnalysis", "analysisTier")
+
+
+def select_portfolio_sections(fields: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """The selected sections in output order; every section when ``fields`` is None"""
+    if fields is None:
+        return PORTFOLIO_SECTIONS
+    fields = set(fields)
+    unknown = fields - set(PORTFOLIO_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown portfolio fields: {', '.join(sorted(unknown))}")
+    return tuple(section for section in PORTFOLIO_SECTIONS if section in fields)
+
+
+class AnalysisContext:
+    """One request's inputs and the values derived from them that several stages share"""
+
+    def __init__(self, projects: List[Dict[str, Any]], skills: List[str], achievements: str, kb,
+                 career_goal: Optional[str] = None, experience_level: Optional[str] = None):
+        self.projects = projects
+        self.skills = skills
+        self.achievements = achievements
+        self.kb = kb
+        self.career_goal = career_goal
+        self.experience_level = experience_level
+        self.achievement_lines = [line.strip() for line in achievements.split('\n') if line.strip()] if achievements else []
+        self.all_techs = set()
+        for project in projects:
+            self.all_techs.update(project.get('technologies', []))
+        # Skills listed and technologies used in projects both count as known
+        self.known_skills = list(dict.fromkeys(skills + [t for project in projects for t in project.get('technologies', [])]))
+        # Vector search hits, present only in the full tier
+        self.retrieval: Optional[Dict[str, Any]] = None
+
+
+def career_skills(title: str, kb) -> List[str]:
+    """Skills that define a career: its path's essential and recommended tiers, else its key skills"""
+    path = kb.career_skill_map.get(title)
+    if path:
+        return path["essential"] + path["recommended"]
+    return next((c.get("keySkills", []) for c in kb.careers if c["title"] == title), [])
+
+
+# --- Stages ---
+
+def portfolio_strength(ctx: AnalysisContext) -> Dict[str, Any]:
+    # Projects: 0-40 points (5 points per project, max 8 projects)
+    project_score = min(len(ctx.projects) * 5, 40)
+    # Skills: 0-30 points (2 points per skill, max 15 skills)
+    skill_score = min(len(ctx.skills) * 2, 30)
+    # Achievements: 0-30 points (only count non-empty lines)
+    achievement_score = min(len(ctx.achievement_lines) * 6, 30)
+    total_score = project_score + skill_score + achievement_score
+
+    if total_score >= 85:
+        rating, color = "Excellent", "#10B981"
+    elif total_score >= 65:
+        rating, color = "Good", "#3B82F6"
+    elif total_score >= 40:
+        rating, color = "Fair", "#F59E0B"
+    else:
+        rating, color = "Needs Improvement", "#EF4444"
+
+    return {
+        "score": total_score,
+        "rating": rating,
+        "color": color,
+        "breakdown": {"projects": project_score, "skills": skill_score, "achievements": achievement_score}
+    }
+
+
+def project_analysis(ctx: AnalysisContext) -> Dict[str, Any]:
+    projects = ctx.projects
+    total_projects = len(projects)
+    complexity = "Advanced" if total_projects >= 5 else "Intermediate" if total_projects >= 3 else "Beginner"
+    diversity = (len(ctx.all_techs) / max(sum(len(p.get('technologies', [])) for p in projects), 1)) * 100
+
+    # Projects contribute most (10 each), then skills (2 each) and achievements (2 each)
+    impact_score = min(total_projects * 10 + len(ctx.skills) * 2 + len(ctx.achievement_lines) * 2, 100)
+
+    return {
+        "totalProjects": total_projects,
+        "complexity": complexity,
+        "diversity": round(diversity, 1),
+        "impactScore": impact_score,
+        "highlights": [
+            {
+                "name": project.get("name", ""),
+                "description": project.get("description", ""),
+                "technologies": project.get("technologies", [])
+            }
+            for project in projects[:3]
+        ],
+        "techStack": list(ctx.all_techs)
+    }
+
+
+def skill_gaps(ctx: AnalysisContext) -> List[Dict[str, Any]]:
+    hits = ((ctx.retrieval or {}).get("skills") or {}).get("metadatas") or [[]]
+    if hits[0]:
+        # Nearest missing skills, grouped by category in rank order
+        by_category: Dict[str, List[Dict[str, Any]]] = {}
+        for metadata in hits[0]:
+            by_category.setdefault(metadata["category"], []).append(metadata)
+        return [
+            {
+                "category": category,
+                "missingSkills": [m["name"] for m in found[:3]],
+                "priority": ("High", "Medium", "Low")[min(m["level_rank"] for m in found)]
+            }
+            for category, found in by_category.items()
+        ]
+
+    gaps = []
+    for category, category_skills in ctx.kb.skill_categories.items():
+        missing = [s for s in category_skills if s not in ctx.skills]
+        if missing:
+            gaps.append({
+                "category": category,
+                "missingSkills": missing[:3],
+                "priority": "High" if category in ["Frontend", "Backend"] else "Medium"
+            })
+    return gaps
+
+
+def recommendations(ctx: AnalysisContext, gaps: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    skills = ctx.skills
+    total_projects = len(ctx.projects)
+    recs = []
+
+    if total_projects == 0:
+        recs.append({
+            "type": "Projects",
+            "priority": "High",
+            "title": "Create Your First Project",
+            "description": "Start building projects to demonstrate your skills. Even a simple project shows initiative and practical knowledge.",
+            "action": "Build a basic web app or tool using your current skills"
+        })
+    elif total_projects < 3:
+        recs.append({
+            "type": "Projects",
+            "priority": "High",
+            "title": f"Build More Projects (Currently: {total_projects})",
+            "description": "Aim for at least 3-5 quality projects. Each project should solve a real problem or demonstrate specific skills.",
+            "action": "Plan your next project focusing on a different technology or problem domain"
+        })
+    elif total_projects < 5:
+        recs.append({
+            "type": "Projects",
+            "priority": "Medium",
+            "title": "Add More Complex Projects",
+            "description": "You have a good foundation. Now focus on building more complex, full-stack applications.",
+            "action": "Consider building a project with authentication, database, and API integration"
+        })
+
+    if len(skills) == 0:
+        recs.append({
+            "type": "Skills",
+            "priority": "High",
+            "title": "Add Your Technical Skills",
+            "description": "List all programming languages, frameworks, and tools you know. This helps match you with career opportunities.",
+            "action": "Add at least 5-10 skills you're comfortable with"
+        })
+    elif len(skills) < 8:
+        recs.append({
+            "type": "Skills",
+            "priority": "High",
+            "title": f"Expand Your Skill Set (Currently: {len(skills)})",
+            "description": "Aim for 10-15 diverse skills. Focus on both breadth (different areas) and depth (mastery).",
+            "action": "Learn complementary skills to what you already know"
+        })
+    elif len(skills) < 15:
+        recs.append({
+            "type": "Skills",
+            "priority": "Medium",
+            "title": "Learn Advanced Technologies",
+            "description": "You have a solid foundation. Consider learning advanced or specialized technologies.",
+            "action": "Explore cloud platforms, DevOps tools, or specialized frameworks"
+        })
+
+    if not any(skill in skills for skill in ["Docker", "Kubernetes", "AWS", "CI/CD", "Jenkins"]):
+        recs.append({
+            "type": "DevOps",
+            "priority": "Medium",
+            "title": "Learn DevOps Fundamentals",
+            "description": "DevOps skills are highly valued. Understanding deployment and containerization makes you more marketable.",
+            "action": "Start with Docker basics and learn about CI/CD pipelines"
+        })
+
+    if len(ctx.achievement_lines) == 0:
+        recs.append({
+            "type": "Achievements",
+            "priority": "Medium",
+            "title": "Add Achievements and Certifications",
+            "description": "Certifications, hackathon wins, or notable contributions make your portfolio stand out.",
+            "action": "List any certifications, awards, or significant accomplishments"
+        })
+
+    if not any(skill in skills for skill in ["React", "Vue", "Angular", "Svelte"]):
+        recs.append({
+            "type": "Frontend",
+            "priority": "High",
+            "title": "Learn a Modern Frontend Framework",
+            "description": "Modern frontend frameworks like React, Vue, or Angular are essential for web development roles.",
+            "action": "Start with React - it's the most in-demand framework"
+        })
+
+    # Retrieved gaps are specific to this portfolio, so the top two become their own advice
+    if ctx.retrieval:
+        for gap in gaps[:2]:
+            recs.append({
+                "type": "Skills",
+                "priority": gap['priority'],
+                "title": f"Learn {gap['category']} Technologies",
+                "description": f"Consider learning: {', '.join(gap['missingSkills'])}",
+                "action": f"Take a course in {gap['missingSkills'][0]}"
+            })
+
+    return recs
+
+
+def career_alignment(ctx: AnalysisContext) -> List[Dict[str, Any]]:
+    kb = ctx.kb
+    careers = (ctx.retrieval or {}).get("careers") or {}
+    hits = careers.get("metadatas") or [[]]
+    if hits[0]:
+        # 60% skill coverage, 40% similarity of the whole portfolio to the career
+        known = {s.lower() for s in ctx.known_skills}
+        alignments = []
+        for metadata, similarity in zip(hits[0], careers["similarities"][0]):
+            skills = career_skills(metadata["title"], kb)
+            matching = [s for s in skills if s.lower() in known]
+            coverage = len(matching) / len(skills) if skills else 0
+            alignments.append({
+                "career": metadata["title"],
+                "alignment": round(100 * (0.6 * coverage + 0.4 * similarity)),
+                "matchingSkills": matching,
+                "missingSkills": [s for s in skills if s.lower() not in known][:3]
+            })
+        alignments.sort(key=lambda a: a["alignment"], reverse=True)
+        return alignments[:3]
+    return rule_career_alignment(ctx)
+
+
+def rule_career_alignment(ctx: AnalysisContext) -> List[Dict[str, Any]]:
+    """Share of each career's required skills listed, for every career"""
+    kb = ctx.kb
+    alignments = []
+    for career, required in kb.career_requirements.items():
+        alignments.append({
+            "career": career,
+            "alignment": round((sum(1 for s in required if s in ctx.skills) / len(required)) * 100, 1),
+            "matchingSkills": [s for s in required if s in ctx.skills],
+            "missingSkills": [s for s in required if s not in ctx.skills]
+        })
+    return alignments
+
+
+def industry_demand(ctx: AnalysisContext, strength: Dict[str, Any]) -> Dict[str, Any]:
+    index = demand_index.current()
+    if index is not None:
+        return posting_demand(ctx, strength, index)
+    skills = ctx.skills
+    total_score = strength["score"]
+    trending_skills = []
+    if "React" in skills or "Vue" in skills or "Angular" in skills:
+        trending_skills.append("Modern Frontend Frameworks")
+    if "Docker" in skills or "Kubernetes" in skills:
+        trending_skills.append("DevOps & Containerization")
+    if "Python" in skills:
+        trending_skills.append("AI/ML & Data Science")
+    if "AWS" in skills or "Azure" in skills:
+        trending_skills.append("Cloud Computing")
+
+    return {
+        "overallDemand": "High" if len(skills) >= 12 else "Medium" if len(skills) >= 6 else "Low",
+        "trendingSkills": trending_skills if trending_skills else ["No trending skills identified yet"],
+        "marketValue": "Above Average" if total_score >= 65 else "Average" if total_score >= 35 else "Below Average",
+        "growthPotential": min(100 - total_score, 100)  # How much room for growth
+    }
+
+
+def posting_demand(ctx: AnalysisContext, strength: Dict[str, Any], index) -> Dict[str, Any]:
+    """Industry demand from job postings, for the goal's industry when it has postings of its own"""
+    total_score = strength["score"]
+    industry, _ = index.row(ctx.kb.industry_of.get(ctx.career_goal))
+    demand = index.skill_demand(ctx.known_skills, industry)
+    mean_demand = sum(d["demand"] for d in demand) / len(ctx.known_skills) if ctx.known_skills else 0.0
+    trending = sorted(
+        (d for d in demand if d["trend"] >= TRENDING_RATIO and d["demand"] >= MIN_DEMAND),
+        key=lambda d: -d["trend"]
+    )
+
+    return {
+        "overallDemand": demand_level(mean_demand),
+        "trendingSkills": [d["skill"] for d in trending[:5]] or ["No trending skills identified yet"],
+        "marketValue": "Above Average" if total_score >= 65 else "Average" if total_score >= 35 else "Below Average",
+        "growthPotential": min(100 - total_score, 100),
+        "skillDemand": demand,
+        "risingSkills": index.rising(industry, exclude=ctx.known_skills),
+        "source": {"industry": industry, "postings": index.postings, "latest": index.meta["latest"]}
+    }
+
+
+def record_population(strength: Dict[str, Any]) -> None:
+    """Add one portfolio's strength and section scores to the population it is ranked against"""
+    population_stats.observe(dict(strength["breakdown"], strength=strength["score"]))
+
+
+def competitive_analysis(ctx: AnalysisContext, strength: Dict[str, Any], record: bool = True) -> Dict[str, Any]:
+    skills = ctx.skills
+    total_projects = len(ctx.projects)
+    total_score = strength["score"]
+    section_scores = strength["breakdown"]
+
+    standout_features = []
+    if total_projects >= 5:
+        standout_features.append("Strong project portfolio")
+    elif total_projects >= 3:
+        standout_features.append("Good project portfolio")
+    if len(skills) >= 15:
+        standout_features.append("Diverse skill set")
+    elif len(skills) >= 10:
+        standout_features.append("Solid skill foundation")
+    if len(ctx.all_techs) >= 8:
+        standout_features.append("Modern tech stack")
+    elif len(ctx.all_techs) >= 5:
+        standout_features.append("Varied technology experience")
+    if len(ctx.achievement_lines) >= 3:
+        standout_features.append("Notable achievements")
+    elif len(ctx.achievement_lines) >= 1:
+        standout_features.append("Has achievements")
+
+    # Rank against every portfolio analyzed so far, once there are enough of them
+    percentile = population_stats.percentile("strength", total_score)
+    if percentile is None:
+        percentile = 100 - total_score if total_score < 50 else min(total_score, 99)
+    section_percentiles = {
+        section: population_stats.percentile(section, score)
+        for section, score in section_scores.items()
+    }
+    if record:
+        record_population(strength)
+
+    areas_to_improve = []
+    if total_projects == 0:
+        areas_to_improve.append("Add projects to showcase your work")
+    elif total_projects < 3:
+        areas_to_improve.append("Build more projects (aim for 3-5)")
+    elif total_projects < 5:
+        areas_to_improve.append("Add more complex projects")
+    if len(skills) == 0:
+        areas_to_improve.append("Add your technical skills")
+    elif len(skills) < 8:
+        areas_to_improve.append("Expand skill set (aim for 10-15 skills)")
+    elif len(skills) < 15:
+        areas_to_improve.append("Learn advanced technologies")
+    if not any(skill in skills for skill in ["Docker", "Kubernetes", "AWS", "CI/CD"]):
+        areas_to_improve.append("Learn DevOps tools")
+    if not any(skill in skills for skill in ["React", "Vue", "Angular"]):
+        areas_to_improve.append("Learn modern frontend framework")
+    if len(ctx.achievement_lines) == 0:
+        areas_to_improve.append("Add achievements and certifications")
+
+    return {
+        "percentile": percentile,
+        "sectionPercentiles": section_percentiles,
+        "comparison": "Above Average" if total_score >= 65 else "Average" if total_score >= 35 else "Below Average",
+        "standoutFeatures": standout_features if standout_features else ["No standout features yet - keep building!"],
+        "areasToImprove": areas_to_improve if areas_to_improve else ["Keep up the great work!"]
+    }
+
+
+def confidence(ctx: AnalysisContext, alignments: List[Dict[str, Any]]) -> float:
+    """
+    How much the rules can be trusted for this portfolio, from 0 to 1: half
+    from the share of known skills the knowledge base recognizes, half from
+    how well the best career aligns
+    """
+    graph = ctx.kb.skill_graph
+    recognized = sum(1 for s in ctx.known_skills if s in graph) / len(ctx.known_skills) if ctx.known_skills else 1.0
+    best = max((a["alignment"] for a in alignments), default=0)
+    return round(0.5 * recognized + 0.5 * min(best / CONFIDENT_ALIGNMENT, 1.0), 2)
+
+
+class _Lazy:
+    """Stage results computed on first ``get``; stages ask for the results they depend on the same way"""
+
+    def __init__(self, stages: Dict[str, Callable[["_Lazy"], Any]]):
+        self._stages = stages
+        self._values: Dict[str, Any] = {}
+
+    def get(self, name: str) -> Any:
+        if name not in self._values:
+            self._values[name] = self._stages[name](self)
+        return self._values[name]
+
+
+class PortfolioPipeline:
+    """Runs the stages for a tier; loads the vector tier on first use"""
+
+    def __init__(self, escalate_below: float = ESCALATE_BELOW):
+        self.escalate_below = escalate_below
+        self.stats = {"fast": 0, "full": 0, "escalated": 0, "vectorErrors": 0}
+        self._vector = None
+        self._vector_error: Optional[str] = None
+        self._vector_failed_at = 0.0
+        self._lock = threading.Lock()
+        # Separate from _lock, which is held while Chroma loads
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        """Bump one tier counter; analyses run on many request threads at once"""
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def vector_service(self):
+        """The Chroma service, imported on first call; None while it cannot be loaded"""
+        if self._vector is not None:
+            return self._vector
+        with self._lock:
+            if self._vector is None and time.time() - self._vector_failed_at >= VECTOR_RETRY_AFTER:
+                try:
+                    from chroma_service import chroma_service
+                    self._vector = chroma_service
+                    self._vector_error = None
+                except Exception as e:
+                    print(f"Vector tier unavailable: {e}")
+                    self._vector_error = str(e)
+                    self._vector_failed_at = time.time()
+        return self._vector
+
+    @property
+    def loaded_vector_service(self):
+        """The Chroma service if something has already loaded it, without loading it"""
+        return self._vector
+
+    def analyze(self, projects: List[Dict[str, Any]], skills: List[str], achievements: str, kb,
+                tier: str = DEFAULT_TIER, career_goal: Optional[str] = None, experience_level: Optional[str] = None,
+                record: bool = True, retriever=None, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Analysis of one portfolio in the requested tier, limited to the sections
+        in ``fields`` when given. ``retriever`` overrides the vector service (it
+        must provide ``retrieve``); record=False keeps the portfolio out of the
+        score population.
+        """
+        if tier not in TIERS:
+            raise ValueError(f"Analysis tier must be one of {', '.join(TIERS)}")
+        sections = select_portfolio_sections(fields)
+        ctx = AnalysisContext(projects, skills, achievements, kb, career_goal, experience_level)
+        served = {"tier": "fast"}
+
+        def retrieval(values):
+            return self._retrieve(ctx, tier, retriever, values, served)
+
+        def gaps(values):
+            values.get("retrieval")
+            return skill_gaps(ctx)
+
+        def alignments(values):
+            return career_alignment(ctx) if values.get("retrieval") else values.get("ruleAlignment")
+
+        def tier_info(values):
+            meta = {"requested": tier, "served": served["tier"], "confidence": values.get("confidence")}
+            if "error" in served:
+                meta["error"] = served["error"]
+            return meta
+
+        values = _Lazy({
+            "portfolioStrength": lambda values: portfolio_strength(ctx),
+            "projectAnalysis": lambda values: project_analysis(ctx),
+            # Rule-based alignment, which confidence is scored from
+            "ruleAlignment": lambda values: rule_career_alignment(ctx),
+            "confidence": lambda values: confidence(ctx, values.get("ruleAlignment")),
+            "retrieval": retrieval,
+            "skillGaps": gaps,
+            "careerAlignment": alignments,
+            "recommendations": lambda values: recommendations(ctx, values.get("skillGaps")),
+            "industryDemand": lambda values: industry_demand(ctx, values.get("portfolioStrength")),
+            "competitiveAnalysis": lambda values: competitive_analysis(ctx, values.get("portfolioStrength"), record),
+            # Last in output order, so it reports whether retrieval ran for the other sections
+            "analysisTier": tier_info,
+        })
+        analysis = {section: values.get(section) for section in sections}
+        if served["tier"] == "fast":
+            self._count("fast")
+        return analysis
+
+    def _retrieve(self, ctx: AnalysisContext, tier: str, retriever, values: _Lazy,
+                  served: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Vector hits for the full tier, or for auto when the rules are not confident; None otherwise"""
+        if tier == "fast" or (tier == "auto" and values.get("confidence") >= self.escalate_below):
+            return None
+        service = retriever or self.vector_service()
+        try:
+            if service is None:
+                raise RuntimeError(self._vector_error or "vector service not loaded")
+            ctx.retrieval = service.retrieve(ctx)
+            served["tier"] = "full"
+            self._count("escalated" if tier == "auto" else "full")
+        except Exception as e:
+            print(f"Vector analysis failed, serving the fast tier: {e}")
+            self._count("vectorErrors")
+            served["error"] = str(e)
+        return ctx.retrieval
+
+
+# Shared pipeline for the API process
+portfolio_pipeline = PortfolioPipeline()
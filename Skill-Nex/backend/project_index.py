@@ -0,0 +1,93 @@
+"""
+Project suggestion ranking.
+
+Project templates are indexed by technology and by career. A query visits
+only the postings for the user's skills, for the skills they still need for
+their goal, and for the goal itself. It adds up a weighted overlap per
+template and keeps the best few in a bounded heap. Cost depends on the size
+of those postings, not the size of the template library. Templates with no
+overlap are never scored.
+"""
+
+import heapq
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# Weight of each kind of overlap between a template and the user
+GOAL_WEIGHT = 3.0
+MISSING_WEIGHTS = {"essential": 3.0, "recommended": 2.0, "advanced": 1.0}
+KNOWN_WEIGHT = 1.0
+
+
+class ProjectIndex:
+    """Inverted index from technology and career to project templates, per experience level"""
+
+    def __init__(self, project_templates: Dict[str, List[Dict[str, Any]]]):
+        self.levels = list(project_templates)
+        self.templates: List[Dict[str, Any]] = []
+        self.by_level: Dict[str, List[int]] = {}
+        # Postings are kept per level, so a query never walks other levels' entries
+        self.by_technology: Dict[str, Dict[str, List[int]]] = {}
+        self.by_career: Dict[str, Dict[str, List[int]]] = {}
+        for level, templates in project_templates.items():
+            ids = self.by_level[level] = []
+            technologies = self.by_technology[level] = {}
+            careers = self.by_career[level] = {}
+            for template in templates:
+                template_id = len(self.templates)
+                self.templates.append(template)
+                ids.append(template_id)
+                for technology in dict.fromkeys(t.lower() for t in template.get("technologies", [])):
+                    technologies.setdefault(technology, []).append(template_id)
+                for career in template.get("careers", []):
+                    careers.setdefault(career, []).append(template_id)
+
+    def __len__(self) -> int:
+        return len(self.templates)
+
+    def suggest(self, current_skills: Sequence[str], career_goal: str, level: str,
+                missing: Optional[Dict[str, Iterable[str]]] = None, top_k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Best templates at ``level`` for the user. ``missing`` maps tiers of the
+        career skill map to skills the user still lacks for their goal.
+        Templates that overlap nothing only fill up the remaining slots, in library order.
+        """
+        if level not in self.by_level:
+            level = self.levels[0]
+        technologies = self.by_technology[level]
+        scores: Dict[int, float] = {}
+
+        def add(postings: List[int], weight: float):
+            for template_id in postings:
+                scores[template_id] = scores.get(template_id, 0.0) + weight
+
+        add(self.by_career[level].get(career_goal, []), GOAL_WEIGHT)
+        missing_keys = set()
+        for tier, skills in (missing or {}).items():
+            weight = MISSING_WEIGHTS.get(tier, 1.0)
+            for skill in skills:
+                key = skill.lower()
+                if key not in missing_keys:
+                    missing_keys.add(key)
+                    add(technologies.get(key, []), weight)
+        known_keys = {skill.lower() for skill in current_skills} - missing_keys
+        for key in known_keys:
+            add(technologies.get(key, []), KNOWN_WEIGHT)
+
+        # Higher score first, then library order
+        best = heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
+        if len(best) < top_k:
+            # Pad with the level's other templates, as suggested before any matching
+            chosen = {template_id for template_id, _ in best}
+            best += [(i, 0.0) for i in self.by_level[level] if i not in chosen][:top_k - len(best)]
+
+        suggestions = []
+        for template_id, score in best:
+            template = self.templates[template_id]
+            technologies_used = template.get("technologies", [])
+            suggestions.append(dict(
+                template,
+                matchScore=round(score, 2),
+                teaches=[t for t in technologies_used if t.lower() in missing_keys],
+                buildsOn=[t for t in technologies_used if t.lower() in known_keys],
+            ))
+        return suggestions
@@ -0,0 +1,297 @@
+"""
+Streaming population statistics for portfolio scores.
+
+KLLSketch is a mergeable quantile sketch. It keeps a fixed number of
+compactors (about k * 3 items in total), so memory stays flat no matter how
+many scores are added, and an update is O(1) amortized.
+
+PopulationStats keeps one sketch per metric. Each worker adds new scores to a
+local delta. Every few seconds it merges the delta into a shared file under a
+file lock and reloads the merged population. Percentile lookups use a cached,
+sorted CDF of that population, so a request only pays for one bisect.
+"""
+
+import atexit
+import bisect
+import json
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get("SKILLNEX_DATA_DIR", os.path.join(BASE_DIR, "data"))
+
+
+class KLLSketch:
+    """KLL quantile sketch (Karnin, Lang, Liberty) with lazy compaction"""
+
+    def __init__(self, k: int = 200, c: float = 2 / 3, seed: Optional[int] = None):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.compactors: List[List[float]] = [[]]
+        self._size = 0
+        self._max_size = 0
+        self._random = random.Random(seed)
+        self._update_max_size()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _update_max_size(self) -> None:
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, value: float) -> None:
+        self.compactors[0].append(float(value))
+        self._size += 1
+        self.n += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self) -> None:
+        for level, items in enumerate(self.compactors):
+            if len(items) < self._capacity(level):
+                continue
+            if level + 1 == len(self.compactors):
+                self.compactors.append([])
+                self._update_max_size()
+
+            items.sort()
+            # An odd item stays behind so no weight is lost
+            keep = [items.pop()] if len(items) % 2 else []
+            offset = self._random.randint(0, 1)
+            promoted = items[offset::2]
+            self.compactors[level + 1].extend(promoted)
+            self._size -= len(items) - len(promoted)
+            self.compactors[level] = keep
+            # Lazy compaction: one level per call keeps updates O(1) amortized
+            if self._size < self._max_size:
+                break
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Fold another sketch into this one in place"""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.n += other.n
+        self._size = sum(len(items) for items in self.compactors)
+        self._update_max_size()
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    def weighted_items(self) -> List[Tuple[float, int]]:
+        """Stored items with their weights (2 ** level)"""
+        return [(value, 1 << level) for level, items in enumerate(self.compactors) for value in items]
+
+    def cdf(self) -> "SketchCDF":
+        return SketchCDF(self.weighted_items())
+
+    def to_dict(self) -> Dict:
+        return {"k": self.k, "c": self.c, "n": self.n, "compactors": self.compactors}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "KLLSketch":
+        sketch = cls(data.get("k", 200), data.get("c", 2 / 3))
+        sketch.n = data.get("n", 0)
+        sketch.compactors = [list(map(float, items)) for items in data.get("compactors", [[]])] or [[]]
+        sketch._size = sum(len(items) for items in sketch.compactors)
+        sketch._update_max_size()
+        return sketch
+
+    def __len__(self) -> int:
+        return self.n
+
+
+class SketchCDF:
+    """Sorted, cumulative view of a sketch for O(log n) rank lookups"""
+
+    def __init__(self, weighted_items: Iterable[Tuple[float, int]]):
+        self.values: List[float] = []
+        self.cumulative: List[int] = []
+        total = 0
+        for value, weight in sorted(weighted_items):
+            total += weight
+            if self.values and self.values[-1] == value:
+                self.cumulative[-1] = total
+            else:
+                self.values.append(value)
+                self.cumulative.append(total)
+        self.total = total
+
+    def percentile(self, value: float) -> float:
+        """Share of the population below value, counting ties as half"""
+        if not self.total:
+            return 50.0
+        lo = bisect.bisect_left(self.values, value)
+        below = self.cumulative[lo - 1] if lo else 0
+        equal = 0
+        if lo < len(self.values) and self.values[lo] == value:
+            equal = self.cumulative[lo] - below
+        return (below + equal / 2) / self.total * 100
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.total:
+            return None
+        target = q * self.total
+        index = bisect.bisect_left(self.cumulative, target)
+        return self.values[min(index, len(self.values) - 1)]
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Cross-process exclusive lock on a side file"""
+    with open(lock_path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class PopulationStats:
+    """Per-metric KLL sketches shared across workers through one persisted file"""
+
+    def __init__(self, path: str, k: int = 200, persist_interval: float = 30.0,
+                 refresh_every: int = 64, min_samples: int = 30):
+        self.path = path
+        self.k = k
+        self.persist_interval = persist_interval
+        self.refresh_every = refresh_every
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._base: Dict[str, KLLSketch] = self._read_file()
+        self._delta: Dict[str, KLLSketch] = {}
+        self._views: Dict[str, SketchCDF] = {}
+        self._pending = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def observe(self, values: Dict[str, float]) -> None:
+        """Add one analysis' scores to the local delta"""
+        with self._lock:
+            for metric, value in values.items():
+                sketch = self._delta.get(metric)
+                if sketch is None:
+                    sketch = self._delta[metric] = KLLSketch(self.k)
+                sketch.update(value)
+            self._pending += 1
+            if self._pending >= self.refresh_every:
+                self._pending = 0
+                self._views.clear()
+
+    def percentile(self, metric: str, value: float) -> Optional[int]:
+        """Percentile of value within the population, or None while it is too small"""
+        view = self._views.get(metric)
+        if view is None:
+            view = self._rebuild_view(metric)
+        if view.total < self.min_samples:
+            return None
+        return int(min(max(round(view.percentile(value)), 1), 99))
+
+    def _count(self, metric: str) -> int:
+        base, delta = self._base.get(metric), self._delta.get(metric)
+        return (base.n if base else 0) + (delta.n if delta else 0)
+
+    def _rebuild_view(self, metric: str) -> SketchCDF:
+        with self._lock:
+            items = []
+            for sketches in (self._base, self._delta):
+                if metric in sketches:
+                    items.extend(sketches[metric].weighted_items())
+            view = self._views[metric] = SketchCDF(items)
+            return view
+
+    def persist(self) -> None:
+        """Merge the local delta into the shared file and reload everyone's population"""
+        with self._lock:
+            delta, self._delta = self._delta, {}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            with file_lock(self.path + ".lock"):
+                merged = self._read_file()
+                for metric, sketch in delta.items():
+                    merged.setdefault(metric, KLLSketch(self.k)).merge(sketch)
+                if delta:
+                    self._write_file(merged)
+        except OSError as e:
+            print(f"Could not persist population sketches: {e}")
+            with self._lock:
+                # Put the scores back so they are not lost
+                for metric, sketch in delta.items():
+                    self._delta.setdefault(metric, KLLSketch(self.k)).merge(sketch)
+            return
+        with self._lock:
+            self._base = merged
+            self._views.clear()
+
+    def _read_file(self) -> Dict[str, KLLSketch]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable population sketch file {self.path}: {e}")
+            return {}
+        return {metric: KLLSketch.from_dict(sketch) for metric, sketch in data.get("metrics", {}).items()}
+
+    def _write_file(self, sketches: Dict[str, KLLSketch]) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"updatedAt": time.time(), "metrics": {m: s.to_dict() for m, s in sketches.items()}}, f)
+        os.replace(tmp_path, self.path)
+
+    def start(self) -> None:
+        """Persist periodically in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="population-stats", daemon=True)
+        self._thread.start()
+        atexit.register(self.persist)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.persist()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.persist_interval):
+            self.persist()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            metrics = set(self._base) | set(self._delta)
+            return {metric: self._count(metric) for metric in sorted(metrics)}
+
+
+# Shared population for the API process
+population_stats = PopulationStats(
+    os.environ.get("SKILLNEX_POPULATION_SKETCH", os.path.join(DATA_DIR, "population_sketch.json"))
+)
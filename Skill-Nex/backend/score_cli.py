@@ -0,0 +1,342 @@
+"""
+Offline bulk scoring of LMS exports.
+
+Streams portfolio or assessment records from JSONL or CSV through the same
+analysis code as the API (portfolio_pipeline and assessment_engine) in a
+pool of worker processes, without HTTP or the server's background threads.
+The input is read in chunks, and at most ``2 x workers`` chunks are in
+flight at once. Memory stays flat however large the export is.
+
+Records use the API request bodies: ``projects``/``skills``/``achievements``
+(plus optional ``careerGoal``, ``experienceLevel``) for portfolios, and
+``answers`` for assessments. An ``id`` or ``userId`` field is carried to the
+output. In CSV, cells holding JSON (``[...]`` or ``{...}``) are decoded,
+plain ``skills`` are split on ``;``, and assessment answers may be given as
+one column per question id. Each output line is
+``{"index", "id", "analysis"}``, or ``"error"`` for a record that failed.
+
+A checkpoint next to the output records which chunks are written and how
+many output bytes they cover. ``--resume`` truncates anything written after
+it and continues from there. ``--unordered`` writes chunks as they finish
+instead of in input order.
+
+Usage:
+    python score_cli.py portfolio INPUT [--out PATH] [--workers N] [--chunk-size N] [--fields A,B]
+                        [--unordered] [--resume] [--tier fast|full|auto] [--record]
+    python score_cli.py assessment INPUT [--out PATH] [--workers N] [--chunk-size N] [--fields A,B]
+                        [--unordered] [--resume]
+"""
+
+import argparse
+import csv
+import json
+import os
+import queue
+import signal
+import sys
+import time
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from assessment_engine import analyze_assessment_batch, select_assessment_sections
+from knowledge_base import knowledge_base
+from portfolio_pipeline import DEFAULT_TIER, TIERS, portfolio_pipeline, select_portfolio_sections
+from quantile_sketch import population_stats
+
+KINDS = ("portfolio", "assessment")
+FORMATS = ("jsonl", "csv")
+CHECKPOINT_VERSION = 1
+# Seconds between checkpoint writes and between throughput readouts
+CHECKPOINT_INTERVAL = 2.0
+PROGRESS_INTERVAL = 5.0
+
+
+def _init_worker() -> None:
+    # The parent handles Ctrl-C and saves the checkpoint; workers just stop with the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    knowledge_base.current()
+
+
+def _decode_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    record = {}
+    for key, value in row.items():
+        if key is None or value is None:
+            continue
+        value = value.strip()
+        if value[:1] in ("[", "{"):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        record[key] = value
+    if isinstance(record.get("skills"), str):
+        record["skills"] = [s.strip() for s in record["skills"].split(";") if s.strip()]
+    if "answers" not in record:
+        # One column per question id
+        answers = {key: value for key, value in record.items() if key.isdigit() and value}
+        if answers:
+            record["answers"] = answers
+    return record
+
+
+def _parse(item: Any) -> Dict[str, Any]:
+    """JSONL lines arrive as raw bytes and are parsed here, in the worker; CSV rows arrive as dicts"""
+    record = json.loads(item) if isinstance(item, bytes) else _decode_csv_row(item)
+    if not isinstance(record, dict):
+        raise ValueError("Record is not a JSON object")
+    return record
+
+
+def _line(index: int, record: Optional[Dict[str, Any]], analysis=None, error: Optional[str] = None) -> str:
+    record = record or {}
+    entry = {"index": index, "id": record.get("id", record.get("userId"))}
+    if error is None:
+        entry["analysis"] = analysis
+    else:
+        entry["error"] = error
+    return json.dumps(entry, ensure_ascii=False)
+
+
+def _score_assessments(items: List[Any], first_index: int, kb, fields: Optional[List[str]]) -> Tuple[List[str], int]:
+    parsed = []
+    for index, item in enumerate(items, first_index):
+        try:
+            record = _parse(item)
+            if not isinstance(record.get("answers"), dict):
+                raise ValueError("No assessment answers provided")
+            parsed.append((index, record, None))
+        except ValueError as e:
+            parsed.append((index, None, str(e)))
+    valid = [record for _, record, error in parsed if error is None]
+    # One vectorized batch per chunk, as in the batch endpoint
+    analyses = iter(analyze_assessment_batch([record["answers"] for record in valid], kb, fields))
+    lines = [_line(index, record, next(analyses)) if error is None else _line(index, record, error=error)
+             for index, record, error in parsed]
+    return lines, len(parsed) - len(valid)
+
+
+def _score_portfolios(items: List[Any], first_index: int, kb, tier: str, record_scores: bool,
+                      fields: Optional[List[str]]) -> Tuple[List[str], int]:
+    lines, errors = [], 0
+    for index, item in enumerate(items, first_index):
+        record = None
+        try:
+            record = _parse(item)
+            analysis = portfolio_pipeline.analyze(
+                record.get("projects") or [], record.get("skills") or [], record.get("achievements") or "", kb,
+                tier=tier, career_goal=record.get("careerGoal"),
+                experience_level=record.get("experienceLevel"), record=record_scores, fields=fields
+            )
+            lines.append(_line(index, record, analysis))
+        except Exception as e:
+            errors += 1
+            lines.append(_line(index, record, error=str(e)))
+    return lines, errors
+
+
+def _score_chunk(kind: str, items: List[Any], first_index: int, tier: str, record_scores: bool,
+                 fields: Optional[List[str]] = None) -> Tuple[bytes, int]:
+    """Score one chunk in a worker; returns its output lines and error count"""
+    kb = knowledge_base.current()
+    if kind == "assessment":
+        lines, errors = _score_assessments(items, first_index, kb, fields)
+    else:
+        lines, errors = _score_portfolios(items, first_index, kb, tier, record_scores, fields)
+        if record_scores:
+            population_stats.persist()
+    return ("\n".join(lines) + "\n").encode("utf-8"), errors
+
+
+def _read_chunks(path: str, fmt: str, chunk_size: int, start_chunk: int = 0,
+                 start_offset: Optional[int] = None) -> Iterator[Tuple[int, List[Any], Optional[int]]]:
+    """
+    (chunk index, items, input offset after the chunk) from ``start_chunk`` on.
+    JSONL is read as bytes so the offset can be seeked to on resume; CSV
+    has no usable offset and is skipped row by row.
+    """
+    index = start_chunk
+    if fmt == "jsonl":
+        with open(path, "rb") as f:
+            if start_chunk:
+                f.seek(start_offset)
+            items = []
+            for line in f:
+                if line.strip():
+                    items.append(line)
+                    if len(items) == chunk_size:
+                        yield index, items, f.tell()
+                        index, items = index + 1, []
+            if items:
+                yield index, items, f.tell()
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        items = []
+        for position, row in enumerate(csv.DictReader(f)):
+            if position < start_chunk * chunk_size:
+                continue
+            items.append(row)
+            if len(items) == chunk_size:
+                yield index, items, None
+                index, items = index + 1, []
+        if items:
+            yield index, items, None
+
+
+def _load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def score_file(kind: str, input_path: str, out_path: str, fmt: str = "jsonl", workers: int = os.cpu_count() or 1,
+               chunk_size: int = 1000, ordered: bool = True, resume: bool = False, tier: str = DEFAULT_TIER,
+               record_scores: bool = False, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Score every record of ``input_path`` into ``out_path`` (JSONL) and return
+    the final checkpoint state. With ``resume``, continue from the checkpoint
+    of an earlier run over the same input and settings. ``fields`` limits
+    each analysis to those sections; partial portfolio analyses are never
+    recorded in the population.
+    """
+    select = select_assessment_sections if kind == "assessment" else select_portfolio_sections
+    fields = list(select(fields)) if fields is not None else None
+    record_scores = record_scores and fields is None
+    checkpoint_path = out_path + ".checkpoint"
+    settings = {"version": CHECKPOINT_VERSION, "kind": kind, "input": os.path.abspath(input_path),
+                "format": fmt, "chunkSize": chunk_size, "ordered": ordered, "tier": tier, "fields": fields}
+    state = _load_checkpoint(checkpoint_path) if resume else None
+    if state is not None:
+        changed = [key for key, value in settings.items() if state.get(key) != value]
+        if changed:
+            raise ValueError(f"Checkpoint {checkpoint_path} was written with different {', '.join(changed)}")
+        if state["complete"]:
+            return state
+    else:
+        state = dict(settings, watermark=0, inputOffset=0, done={}, outputBytes=0, records=0, errors=0, complete=False)
+
+    # Chunks written ahead of the watermark (unordered runs), with the input offset after each
+    done = {int(index): end for index, end in state["done"].items()}
+    already_written = set(done)
+    results: "queue.Queue[Tuple[int, Any]]" = queue.Queue()
+    buffered: Dict[int, Tuple[bytes, int, int]] = {}
+    ends: Dict[int, Optional[int]] = {}
+    window = 2 * workers
+    outstanding = 0
+    start = last_checkpoint = last_progress = time.perf_counter()
+    first_records = state["records"]
+
+    out = open(out_path, "r+b" if state["outputBytes"] else "wb")
+    out.truncate(state["outputBytes"])
+    out.seek(state["outputBytes"])
+
+    def checkpoint():
+        out.flush()
+        state.update(outputBytes=out.tell(), done={str(index): end for index, end in done.items()})
+        _save_checkpoint(checkpoint_path, state)
+
+    def write(index, data, count, errors):
+        nonlocal outstanding, last_checkpoint, last_progress
+        out.write(data)
+        outstanding -= 1
+        state["records"] += count
+        state["errors"] += errors
+        done[index] = ends.pop(index)
+        while state["watermark"] in done:
+            state["inputOffset"] = done.pop(state["watermark"])
+            state["watermark"] += 1
+        now = time.perf_counter()
+        if now - last_checkpoint >= CHECKPOINT_INTERVAL:
+            checkpoint()
+            last_checkpoint = now
+        if now - last_progress >= PROGRESS_INTERVAL:
+            _report(state, state["records"] - first_records, now - start)
+            last_progress = now
+
+    def collect(block):
+        while True:
+            try:
+                index, outcome = results.get(block=block)
+            except queue.Empty:
+                return
+            block = False
+            if isinstance(outcome, BaseException):
+                raise outcome
+            data, errors = outcome
+            count = data.count(b"\n")
+            if not ordered:
+                write(index, data, count, errors)
+                continue
+            buffered[index] = (data, count, errors)
+            while state["watermark"] in buffered:
+                write(state["watermark"], *buffered.pop(state["watermark"]))
+
+    try:
+        with Pool(workers, initializer=_init_worker) as pool:
+            for index, items, end in _read_chunks(input_path, fmt, chunk_size, state["watermark"], state["inputOffset"]):
+                if index in already_written:
+                    continue
+                # Bounded in-flight work keeps memory flat
+                while outstanding >= window:
+                    collect(block=True)
+                ends[index] = end
+                outstanding += 1
+                pool.apply_async(
+                    _score_chunk, (kind, items, index * chunk_size, tier, record_scores, fields),
+                    callback=lambda result, index=index: results.put((index, result)),
+                    error_callback=lambda error, index=index: results.put((index, error)),
+                )
+                collect(block=False)
+            while outstanding:
+                collect(block=True)
+        state["complete"] = True
+    finally:
+        checkpoint()
+        out.close()
+    _report(state, state["records"] - first_records, time.perf_counter() - start)
+    return state
+
+
+def _report(state: Dict[str, Any], records: int, elapsed: float) -> None:
+    rate = records / elapsed if elapsed > 0 else 0.0
+    print(f"{state['records']:,} records scored ({state['errors']:,} errors), "
+          f"{rate:,.0f} records/s over {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score portfolio or assessment exports offline")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("input", help="JSONL or CSV export, one record per line or row")
+    parser.add_argument("--out", help="Output JSONL (defaults to INPUT.scored.jsonl)")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (defaults from the file extension)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Records per task sent to a worker")
+    parser.add_argument("--unordered", action="store_true", help="Write chunks as they finish, not in input order")
+    parser.add_argument("--resume", action="store_true", help="Continue from the output's checkpoint")
+    parser.add_argument("--tier", choices=TIERS, default=DEFAULT_TIER, help="Portfolio analysis tier")
+    parser.add_argument("--fields", help="Comma-separated sections to compute (defaults to all)")
+    parser.add_argument("--record", action="store_true", help="Add portfolio scores to the shared population")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    out_path = args.out or os.path.splitext(args.input)[0] + ".scored.jsonl"
+    try:
+        summary = score_file(args.kind, args.input, out_path, fmt, max(args.workers, 1), max(args.chunk_size, 1),
+                             ordered=not args.unordered, resume=args.resume, tier=args.tier,
+                             record_scores=args.record,
+                             fields=[f.strip() for f in args.fields.split(",") if f.strip()] if args.fields else None)
+    except KeyboardInterrupt:
+        print(f"Interrupted; continue with --resume (checkpoint {out_path}.checkpoint)", file=sys.stderr)
+        sys.exit(130)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Wrote {summary['records']:,} results to {out_path}")
@@ -0,0 +1,176 @@
+"""
+Read-only tables shared by every worker process through one memory-mapped file.
+
+Each worker used to build its own copy of the skill and career embedding
+matrices and the tables around them, so memory grew with the worker count.
+In shared mode, the first worker to start publishes them to a single file:
+
+    magic, format, header length | JSON header | 64-byte aligned arrays
+
+The header holds the vocabularies (ids, documents, metadata per collection),
+a signature of what was embedded and with which model, and the dtype, shape
+and offset of every array. Workers map the file read-only and wrap the
+arrays with ``np.frombuffer``. Nothing is copied, and the operating system
+keeps one set of pages for all processes.
+
+SharedCollection answers the subset of Chroma's collection API that the
+analyzers use. It runs an exact nearest-neighbour search over the mapped
+matrix, and ``where`` filters use Chroma's operator syntax.
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bm25 import matches_where
+from quantile_sketch import file_lock
+
+MAGIC = b"SNST"
+FORMAT = 1
+# magic, format, header length
+_PREAMBLE = struct.Struct("<4sHxxQ")
+ALIGNMENT = 64
+
+
+def publish(path: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]) -> None:
+    """Write arrays and metadata to ``path`` atomically; readers of the old file keep their mapping"""
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({"meta": meta, "arrays": layout}).encode("utf-8")
+    # Arrays start on an aligned boundary after the header
+    data_start = -(-(_PREAMBLE.size + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+class SharedTables:
+    """A published file mapped read-only; arrays are views into the mapping"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, header_len = _PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC or fmt != FORMAT:
+            raise ValueError(f"{path} is not a shared tables file of format {FORMAT}")
+        header = json.loads(self._mmap[_PREAMBLE.size:_PREAMBLE.size + header_len].decode("utf-8"))
+        self.meta: Dict[str, Any] = header["meta"]
+        data_start = -(-(_PREAMBLE.size + header_len) // ALIGNMENT) * ALIGNMENT
+        self.arrays: Dict[str, np.ndarray] = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            self.arrays[name] = np.frombuffer(
+                self._mmap, dtype=dtype, count=count, offset=data_start + spec["offset"]
+            ).reshape(spec["shape"])
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._mmap)
+
+
+def _attach_matching(path: str, signature: Dict[str, Any]) -> Optional[SharedTables]:
+    try:
+        tables = SharedTables(path)
+    except (OSError, ValueError):
+        return None
+    return tables if tables.meta.get("signature") == signature else None
+
+
+def attach_or_publish(path: str, signature: Dict[str, Any],
+                      build: Callable[[], Tuple[Dict[str, np.ndarray], Dict[str, Any]]]) -> Tuple[SharedTables, bool]:
+    """
+    Attach to the published file if it was built for ``signature``, otherwise
+    build and publish it. Only one process builds; the rest wait on the lock
+    and attach. Returns the tables and whether this call published them.
+    """
+    tables = _attach_matching(path, signature)
+    if tables is not None:
+        return tables, False
+    with file_lock(path + ".lock"):
+        tables = _attach_matching(path, signature)
+        if tables is not None:
+            return tables, False
+        arrays, meta = build()
+        publish(path, arrays, dict(meta, signature=signature))
+    return SharedTables(path), True
+
+
+def collection_arrays(name: str, embeddings: np.ndarray) -> Dict[str, np.ndarray]:
+    """Arrays stored for one collection: its embedding matrix and the squared row norms"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return {f"{name}.embeddings": embeddings, f"{name}.norms": (embeddings * embeddings).sum(axis=1)}
+
+
+class SharedCollection:
+    """Read-only, Chroma-compatible view of one published collection"""
+
+    def __init__(self, tables: SharedTables, name: str, embedding_function, space: str = "l2"):
+        self.name = name
+        self.metadata = {"hnsw:space": space}
+        self.embedding_function = embedding_function
+        entry = tables.meta["collections"][name]
+        self.ids: List[str] = entry["ids"]
+        self.documents: List[str] = entry["documents"]
+        self.metadatas: List[Dict[str, Any]] = entry["metadatas"]
+        self.embeddings = tables.arrays[f"{name}.embeddings"]
+        self.norms = tables.arrays[f"{name}.norms"]
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def query(self, query_texts: Sequence[str], n_results: int = 10, where: Optional[Dict[str, Any]] = None,
+              include: Sequence[str] = ("metadatas", "distances")) -> Dict[str, Any]:
+        queries = np.asarray(self.embedding_function(list(query_texts)), dtype=np.float32)
+        if where:
+            rows = np.array([i for i, m in enumerate(self.metadatas) if matches_where(m, where)], dtype=np.int64)
+        else:
+            rows = np.arange(len(self.ids))
+        result = {"ids": [], "metadatas": [], "distances": []}
+        for query in queries:
+            distances = self._distances(query, rows)
+            k = min(n_results, len(rows))
+            if 0 < k < len(rows):
+                # Keep every row tied with the k-th distance, so ties resolve by row order below
+                kth = np.partition(distances, k - 1)[k - 1]
+                top = np.flatnonzero(distances <= kth)
+            else:
+                top = np.arange(len(rows))
+            top = top[np.argsort(distances[top], kind="stable")][:k]
+            result["ids"].append([self.ids[rows[i]] for i in top])
+            result["metadatas"].append([self.metadatas[rows[i]] for i in top])
+            result["distances"].append([float(distances[i]) for i in top])
+        return result
+
+    def _distances(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Chroma's distance for the collection's space, against the given rows"""
+        matrix = self.embeddings if len(rows) == len(self.ids) else self.embeddings[rows]
+        dots = matrix @ query
+        space = self.metadata["hnsw:space"]
+        if space == "l2":
+            norms = self.norms if len(rows) == len(self.ids) else self.norms[rows]
+            return norms + float(query @ query) - 2 * dots
+        if space == "cosine":
+            norms = self.norms if len(rows) == len(self.ids) else self.norms[rows]
+            return 1 - dots / np.maximum(np.sqrt(norms) * np.linalg.norm(query), 1e-12)
+        return 1 - dots
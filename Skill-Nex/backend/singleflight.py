@@ -0,0 +1,119 @@
+"""
+Coalescing of identical in-flight work.
+
+When many identical requests arrive together (a teacher sharing one sample
+portfolio with a class), a result cache does not help: every request misses
+until the first one finishes. SingleFlight lets the first caller for a key
+(the leader) run the computation on its own thread. Callers that arrive
+while it runs wait for that one result instead of starting another. The
+key is forgotten when the computation ends, so nothing is cached beyond
+the flight itself.
+
+Each waiter has its own timeout and may cancel independently. Giving up
+never affects the leader or the other waiters. Results are shared between
+all callers and must be treated as read-only.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class FlightTimeout(TimeoutError):
+    """The shared computation did not finish within the waiter's timeout"""
+
+
+class FlightCancelled(Exception):
+    """The waiter's cancel event was set before the shared computation finished"""
+
+
+# Granularity at which a waiting caller checks its cancel event
+_CANCEL_POLL = 0.05
+
+
+def payload_key(*parts: Any) -> str:
+    """sha256 of a canonical JSON encoding, so key order and whitespace never split a flight"""
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _Call:
+    __slots__ = ("done", "value", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """At most one running computation per key; concurrent callers share its result"""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {"executed": 0, "coalesced": 0, "timeouts": 0, "cancelled": 0, "errors": 0}
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None,
+           cancel: Optional[threading.Event] = None) -> Any:
+        """
+        Result of ``fn()``, computed once for all concurrent callers with the same key.
+        Waiters raise FlightTimeout after ``timeout`` seconds, or FlightCancelled once
+        ``cancel`` is set; the leader's errors are re-raised in every waiter.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["executed"] += 1
+            else:
+                call.waiters += 1
+                self.stats["coalesced"] += 1
+
+        if leader:
+            try:
+                call.value = fn()
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    self.stats["errors"] += 1
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.value
+
+        if not self._wait(call, timeout, cancel):
+            with self._lock:
+                call.waiters -= 1
+                self.stats["cancelled" if cancel is not None and cancel.is_set() else "timeouts"] += 1
+            if cancel is not None and cancel.is_set():
+                raise FlightCancelled(f"Stopped waiting for in-flight computation {key[:12]}")
+            raise FlightTimeout(f"In-flight computation {key[:12]} did not finish within {timeout}s")
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    @staticmethod
+    def _wait(call: _Call, timeout: Optional[float], cancel: Optional[threading.Event]) -> bool:
+        if cancel is None:
+            return call.done.wait(timeout)
+        remaining = timeout
+        while not cancel.is_set():
+            step = _CANCEL_POLL if remaining is None else min(_CANCEL_POLL, remaining)
+            if call.done.wait(step):
+                return True
+            if remaining is not None:
+                remaining -= step
+                if remaining <= 0:
+                    return False
+        return call.done.is_set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus the computations and waiters in flight right now"""
+        with self._lock:
+            return dict(self.stats, inFlight=len(self._calls), waiting=sum(c.waiters for c in self._calls.values()))
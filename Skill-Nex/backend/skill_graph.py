@@ -0,0 +1,170 @@
+"""
+Skill prerequisite graph and learning path planning.
+
+The knowledge base lists each skill's prerequisites and an effort estimate
+in weeks. At compile time the skills are renumbered in topological order,
+and every skill gets its transitive prerequisite closure as a bitset (a
+Python int with one bit per skill). This ordering has a useful property:
+the set bits of any mask, read from the lowest index up, are already in a
+valid learning order.
+
+So a query like "what must I learn before Kubernetes, given what I know" is
+an OR over the closures of the known skills, an AND NOT, and a walk over
+the remaining set bits. No graph traversal happens at request time.
+"""
+
+import heapq
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+# Skills in each tier that become phase goals; their missing prerequisites join them
+PHASE_TARGETS = 3
+
+# (tier, title, priority) of each phase, one per tier of the career skill map
+PHASES = (
+    ("essential", "Foundation Skills", "High"),
+    ("recommended", "Intermediate Skills", "Medium"),
+    ("advanced", "Advanced Skills", "Low"),
+)
+
+
+def compile_skill_graph(prerequisites: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Topologically number the skills and precompute prerequisite closures"""
+    names = list(prerequisites)
+    position = {name: i for i, name in enumerate(names)}
+    dependants: Dict[str, List[str]] = {name: [] for name in names}
+    pending = {}
+    for name, entry in prerequisites.items():
+        requires = entry.get("requires", [])
+        for required in requires:
+            if required not in position:
+                raise ValueError(f"Skill '{name}' requires unknown skill '{required}'")
+            dependants[required].append(name)
+        pending[name] = len(set(requires))
+
+    # Kahn's algorithm; ties keep the source file order so the numbering is deterministic
+    ready = [position[name] for name in names if not pending[name]]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        name = names[heapq.heappop(ready)]
+        order.append(name)
+        for dependant in dict.fromkeys(dependants[name]):
+            pending[dependant] -= 1
+            if not pending[dependant]:
+                heapq.heappush(ready, position[dependant])
+    if len(order) != len(names):
+        cycle = sorted(name for name in names if pending[name])
+        raise ValueError(f"Skill prerequisites contain a cycle through: {', '.join(cycle)}")
+
+    index = {name: i for i, name in enumerate(order)}
+    closures = []
+    for name in order:
+        # Prerequisites come earlier in the order, so their closures are already final
+        closure = 0
+        for required in prerequisites[name].get("requires", []):
+            closure |= closures[index[required]] | (1 << index[required])
+        closures.append(closure)
+
+    return {
+        "names": order,
+        "weeks": [int(prerequisites[name].get("weeks", 1)) for name in order],
+        "closures": closures,
+    }
+
+
+class SkillGraph:
+    """Answers prerequisite and learning path queries with bitset operations"""
+
+    def __init__(self, compiled: Dict[str, Any]):
+        self.names: List[str] = compiled["names"]
+        self.weeks: List[int] = compiled["weeks"]
+        self.closures: List[int] = compiled["closures"]
+        self.index = {name.lower(): i for i, name in enumerate(self.names)}
+
+    def __contains__(self, skill: str) -> bool:
+        return skill.lower() in self.index
+
+    def known_mask(self, skills: Iterable[str]) -> int:
+        """Skills the user has plus everything those skills build on"""
+        mask = 0
+        for skill in skills:
+            i = self.index.get(skill.lower())
+            if i is not None:
+                mask |= self.closures[i] | (1 << i)
+        return mask
+
+    def required_mask(self, targets: Iterable[str], known: int = 0) -> int:
+        """Targets and all of their prerequisites that are not in ``known``"""
+        needed = 0
+        for target in targets:
+            i = self.index.get(target.lower())
+            if i is not None:
+                needed |= self.closures[i] | (1 << i)
+        return needed & ~known
+
+    def skills_in(self, mask: int) -> List[str]:
+        """Names of the skills in a mask, in a valid learning order"""
+        return [self.names[i] for i in _bits(mask)]
+
+    def total_weeks(self, mask: int) -> int:
+        return sum(self.weeks[i] for i in _bits(mask))
+
+    def missing_prerequisites(self, skill: str, current_skills: Sequence[str]) -> Dict[str, Any]:
+        """What is still to learn before ``skill``, in learning order"""
+        i = self.index.get(skill.lower())
+        if i is None:
+            return {"skill": skill, "known": False, "missing": [], "estimatedWeeks": 0}
+        missing = self.closures[i] & ~self.known_mask(current_skills)
+        return {
+            "skill": self.names[i],
+            "known": True,
+            "missing": [{"name": self.names[j], "weeks": self.weeks[j]} for j in _bits(missing)],
+            "estimatedWeeks": self.total_weeks(missing),
+        }
+
+    def learning_path(self, tiers: Dict[str, List[str]], current_skills: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Phases of a learning path for the missing skills in each tier.
+        Each phase covers its tier's first few targets plus any prerequisites
+        not already covered, so every skill appears after what it depends on.
+        """
+        covered = self.known_mask(current_skills)
+        path = []
+        for tier, title, priority in PHASES:
+            targets = tiers.get(tier, [])[:PHASE_TARGETS]
+            if not targets:
+                continue
+            mask = self.required_mask(targets, covered)
+            # Targets missing from the graph still get a slot at the end of their phase
+            extra = [target for target in targets if target not in self]
+            if not mask and not extra:
+                continue
+            weeks = self.total_weeks(mask)
+            covered |= mask
+            path.append({
+                "phase": len(path) + 1,
+                "title": title,
+                "duration": _format_duration(weeks),
+                "estimatedWeeks": weeks,
+                "skills": self.skills_in(mask) + extra,
+                "priority": priority,
+            })
+        return path
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """Indices of the set bits, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _format_duration(weeks: int) -> str:
+    if weeks <= 1:
+        return "1 week"
+    if weeks < 8:
+        return f"{weeks} weeks"
+    months = weeks / 4.3
+    low, high = int(months), int(months + 0.99)
+    return f"{low} months" if low == high else f"{low}-{high} months"
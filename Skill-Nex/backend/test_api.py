@@ -113,6 +113,178 @@ try:
 except Exception as e:
     print(f"   ✗ Recommendations request failed: {e}")
 
+# Test 5: Analysis History
+print("\n5. Testing Analysis History Endpoint...")
+try:
+    requests.post(
+        'http://localhost:5000/api/ai/portfolio/analyze',
+        json=dict(test_portfolio, userId="test-user"),
+        headers={'Content-Type': 'application/json'}
+    )
+    time.sleep(1)  # History is written by a background thread
+    start = time.time()
+    response = requests.get('http://localhost:5000/api/ai/history/test-user?limit=5')
+    elapsed = time.time() - start
+
+    if response.status_code == 200:
+        data = response.json()
+        if data.get('success') and data['history']:
+            print(f"   ✓ History retrieved successfully ({elapsed:.2f}s)")
+            print(f"   Entries: {len(data['history'])}, latest score: {data['history'][0]['score']}")
+        else:
+            print(f"   ✗ History empty or failed: {data.get('error')}")
+    else:
+        print(f"   ✗ Request failed with status {response.status_code}")
+except Exception as e:
+    print(f"   ✗ History request failed: {e}")
+
+# Test 6: Batch Assessment Analysis
+print("\n6. Testing Batch Assessment Endpoint...")
+try:
+    students = [
+        {"id": f"student-{i}", "answers": {"0": "Work independently and at my own pace", "1": "Solving complex problems", "4": "Hands-on practice"}}
+        for i in range(500)
+    ]
+    start = time.time()
+    response = requests.post(
+        'http://localhost:5000/api/ai/assessment/analyze/batch',
+        json={"students": students, "cohort": "test-cohort"},
+        headers={'Content-Type': 'application/json'}
+    )
+    elapsed = time.time() - start
+
+    if response.status_code == 200:
+        data = response.json()
+        if data.get('success'):
+            print(f"   ✓ Batch analyzed successfully ({elapsed:.2f}s)")
+            print(f"   Students: {data['count']}, first type: {data['results'][0]['analysis']['personalityType']['type']}")
+        else:
+            print(f"   ✗ Batch analysis failed: {data.get('error')}")
+    else:
+        print(f"   ✗ Request failed with status {response.status_code}")
+except Exception as e:
+    print(f"   ✗ Batch request failed: {e}")
+
+# Test 7: Skill Prerequisites
+print("\n7. Testing Skill Prerequisites Endpoint...")
+try:
+    start = time.time()
+    response = requests.post(
+        'http://localhost:5000/api/ai/skills/prerequisites',
+        json={"skill": "Kubernetes", "currentSkills": ["Git"]},
+        headers={'Content-Type': 'application/json'}
+    )
+    elapsed = time.time() - start
+
+    if response.status_code == 200:
+        data = response.json()
+        if data.get('success'):
+            prerequisites = data['prerequisites']
+            print(f"   ✓ Prerequisites retrieved successfully ({elapsed:.2f}s)")
+            print(f"   Missing: {[skill['name'] for skill in prerequisites['missing']]}, {prerequisites['estimatedWeeks']} weeks")
+        else:
+            print(f"   ✗ Prerequisites failed: {data.get('error')}")
+    else:
+        print(f"   ✗ Request failed with status {response.status_code}")
+except Exception as e:
+    print(f"   ✗ Prerequisites request failed: {e}")
+
+# Test 8: Readiness
+print("\n8. Testing Readiness Endpoint...")
+try:
+    response = requests.get('http://localhost:5000/api/ai/health/ready')
+    data = response.json()
+    warmup = data.get('warmup', {})
+    if response.status_code == 200:
+        print(f"   ✓ Service is ready (warm-up took {warmup.get('durationMs')}ms)")
+    elif response.status_code == 503:
+        print(f"   … Still warming up: {warmup.get('completed')}/{warmup.get('total')} steps, at {warmup.get('currentStep')}")
+    else:
+        print(f"   ✗ Request failed with status {response.status_code}")
+    print(f"   Indexes: {data.get('indexes', {}).get('knowledgeBase')}")
+except Exception as e:
+    print(f"   ✗ Readiness request failed: {e}")
+
+# Test 9: Background Jobs
+print("\n9. Testing Background Job Endpoints...")
+try:
+    response = requests.post(
+        'http://localhost:5000/api/ai/jobs',
+        json={"kind": "portfolio.analyze", "payload": test_portfolio},
+        headers={'Content-Type': 'application/json'}
+    )
+    if response.status_code == 202:
+        job_id = response.json()['jobId']
+        print(f"   ✓ Job queued: {job_id}")
+        for _ in range(50):
+            response = requests.get(f'http://localhost:5000/api/ai/jobs/{job_id}/result')
+            if response.status_code != 202:
+                break
+            time.sleep(0.2)
+        data = response.json()
+        if response.status_code == 200:
+            print(f"   ✓ Job finished, score: {data['result']['analysis']['portfolioStrength']['score']}")
+        else:
+            print(f"   ✗ Job did not succeed: {data.get('error')}")
+    else:
+        print(f"   ✗ Request failed with status {response.status_code}")
+except Exception as e:
+    print(f"   ✗ Job request failed: {e}")
+
+# Test 10: Sparse Fieldsets
+print("\n10. Testing Portfolio Analysis with Selected Fields...")
+try:
+    response = requests.post(
+        'http://localhost:5000/api/ai/portfolio/analyze?fields=portfolioStrength',
+        json=test_portfolio,
+        headers={'Content-Type': 'application/json'}
+    )
+    if response.status_code == 200:
+        sections = list(response.json()['analysis'])
+        if sections == ['portfolioStrength']:
+            print(f"   ✓ Only the requested section was returned")
+        else:
+            print(f"   ✗ Unexpected sections: {sections}")
+    else:
+        print(f"   ✗ Request failed with status {response.status_code}")
+except Exception as e:
+    print(f"   ✗ Fields request failed: {e}")
+
+# Test 11: Learn Next
+print("\n11. Testing Learn Next Recommendations...")
+try:
+    response = requests.post(
+        'http://localhost:5000/api/ai/skills/learn-next',
+        json={"currentSkills": ["React"], "limit": 5},
+        headers={'Content-Type': 'application/json'}
+    )
+    if response.status_code == 200:
+        result = response.json()
+        print(f"   ✓ Learn next: {[s['skill'] for s in result['learnNext']]}")
+        print(f"   ✓ Model: {result['model']['projects']} projects, {result['model']['skills']} skills")
+    else:
+        print(f"   ✗ Request failed with status {response.status_code}")
+except Exception as e:
+    print(f"   ✗ Learn next request failed: {e}")
+
+# Test 12: Similar Portfolios
+print("\n12. Testing Similar Portfolio Search...")
+try:
+    response = requests.post(
+        'http://localhost:5000/api/ai/portfolio/similar',
+        json={"projects": test_portfolio["projects"], "skills": test_portfolio["skills"], "limit": 3},
+        headers={'Content-Type': 'application/json'}
+    )
+    if response.status_code == 200:
+        peers = response.json()['peers']
+        print(f"   ✓ Found {len(peers)} similar portfolios")
+        for peer in peers:
+            print(f"     - strength {peer['portfolioStrength']}, lacks {peer['skillsYouLack'][:3]}")
+    else:
+        print(f"   ✗ Request failed with status {response.status_code}")
+except Exception as e:
+    print(f"   ✗ Similar portfolio request failed: {e}")
+
 print("\n" + "=" * 50)
 print("Testing complete!")
 
@@ -0,0 +1,43 @@
+from cooccurrence import CooccurrenceCounts
+
+
+def long_tail(singles=100):
+    """One pair seen twice, plus ``singles`` pairs seen once each"""
+    counts = CooccurrenceCounts()
+    counts.add_project(["React", "Node.js"])
+    counts.add_project(["React", "Node.js"])
+    for i in range(singles):
+        counts.add_project([f"Tool {i}", f"Library {i}"])
+    return counts
+
+
+def test_compact_keeps_exactly_max_pairs_when_counts_tie():
+    counts = long_tail()
+    assert counts.pair_count() == 101
+
+    dropped = counts.compact(50)
+
+    assert dropped == 51
+    assert counts.pair_count() == 50
+    # The most frequent pair always survives
+    assert counts.pairs["react"]["node.js"] == 2
+
+
+def test_compact_is_deterministic_across_workers():
+    first, second = long_tail(), long_tail()
+    first.compact(20)
+    second.compact(20)
+    assert sorted(first.pair_items()) == sorted(second.pair_items())
+
+
+def test_compact_drops_skills_left_without_pairs():
+    counts = long_tail()
+    counts.compact(10)
+    assert set(counts.skills) == set(counts.pairs)
+    assert set(counts.names) == set(counts.pairs)
+
+
+def test_compact_under_budget_is_a_no_op():
+    counts = long_tail(5)
+    assert counts.compact(50) == 0
+    assert counts.pair_count() == 6
@@ -0,0 +1,182 @@
+"""
+Startup warm-up and readiness.
+
+A freshly started worker is slow on its first requests. It still has to
+load the knowledge base snapshot. The answer-matching and embedding caches
+are empty, the Chroma collections are unseeded and the embedding model has
+not run yet. Warmup runs a list of named steps on a background thread, and
+the worker reports ready only once every required step has succeeded. The
+steps replay representative requests built from the knowledge base through
+the real endpoints. Required steps that fail are retried with exponential
+backoff, so a dependency that was down at boot delays readiness instead of
+keeping the worker out of rotation until it restarts.
+
+Optional steps (the vector index) also run before the worker reports
+ready, so the first tier=full and tier=auto requests do not pay for
+loading Chroma and the embedding model. Their failure is recorded but does
+not keep the worker out of rotation: those tiers fall back to the fast
+tier while the vector service is unavailable.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Requests carrying this header are warm-up traffic: served normally, never recorded
+WARMUP_HEADER = "X-Skillnex-Warmup"
+
+# Cap on how many careers and profiles each warm-up step replays
+MAX_PROFILES = 6
+# Seconds before failed required steps are retried, doubling up to the cap
+RETRY_BACKOFF = float(os.environ.get("SKILLNEX_WARMUP_RETRY", 5))
+MAX_RETRY_BACKOFF = 300.0
+
+
+class Warmup:
+    """Named warm-up steps run once, in order, with progress for the readiness probe"""
+
+    def __init__(self, enabled: bool = True, retry_backoff: float = RETRY_BACKOFF):
+        self.enabled = enabled
+        self.retry_backoff = retry_backoff
+        self._steps: List[Tuple[str, Callable[[], Any], bool]] = []
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.status = "pending" if enabled else "disabled"
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.retry_at: Optional[float] = None
+
+    def add(self, name: str, run: Callable[[], Any], required: bool = True) -> None:
+        self._steps.append((name, run, required))
+        self._results[name] = {"name": name, "status": "pending", "required": required}
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "disabled")
+
+    def start(self) -> None:
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def run(self) -> None:
+        self.started_at = time.time()
+        self.status = "running"
+        failed = self._run_steps(self._steps)
+        backoff = self.retry_backoff
+        # A worker that cannot serve its own sample requests stays out of rotation until they pass;
+        # a dependency that was briefly down at boot must not keep it out until a restart
+        while failed:
+            self.status = "failed"
+            self.retry_at = time.time() + backoff
+            time.sleep(backoff)
+            backoff = min(backoff * 2, MAX_RETRY_BACKOFF)
+            self.status = "running"
+            failed = self._run_steps(failed)
+        self.retry_at = None
+        self.finished_at = time.time()
+        self.status = "ready"
+
+    def _run_steps(self, steps: List[Tuple[str, Callable[[], Any], bool]]) -> List[Tuple[str, Callable[[], Any], bool]]:
+        """Run steps in order; returns the required ones that failed"""
+        failed = []
+        for name, run, required in steps:
+            attempts = self._results[name].get("attempts", 0) + 1
+            self._update(name, status="running", attempts=attempts)
+            start = time.perf_counter()
+            try:
+                run()
+            except Exception as e:
+                print(f"Warm-up step '{name}' failed: {e}")
+                self._update(name, status="failed", error=str(e))
+                if required:
+                    failed.append((name, run, required))
+                continue
+            self._update(name, status="done", error=None, durationMs=round((time.perf_counter() - start) * 1000, 1))
+        return failed
+
+    def progress(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = [dict(self._results[name]) for name, _, _ in self._steps]
+        done = sum(1 for step in steps if step["status"] in ("done", "failed"))
+        end = self.finished_at or time.time()
+        return {
+            "status": self.status,
+            "completed": done,
+            "total": len(steps),
+            "percent": round(100 * done / len(steps)) if steps else 100,
+            "currentStep": next((step["name"] for step in steps if step["status"] == "running"), None),
+            "durationMs": round((end - self.started_at) * 1000) if self.started_at else None,
+            "retryAt": self.retry_at,
+            "steps": steps,
+        }
+
+    def _update(self, name: str, **fields) -> None:
+        with self._lock:
+            self._results[name].update(fields)
+
+
+def cache_fill(info) -> Dict[str, Any]:
+    """functools.lru_cache statistics as JSON, with the fill ratio"""
+    fill = info.currsize / info.maxsize if info.maxsize else None
+    return dict(info._asdict(), fill=round(fill, 3) if fill is not None else None)
+
+
+def representative_requests(kb) -> Dict[str, List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Sample requests for each endpoint, derived from the knowledge base so
+    they follow its careers, skills, levels and questions. Sent with
+    WARMUP_HEADER, they reach neither the history nor the score population.
+    """
+    careers = list(kb.career_skill_map)[:MAX_PROFILES]
+    levels = list(kb.project_templates)
+    questions = kb.assessment_questions
+
+    # Catalogue answers cycle through every option; one free-text answer exercises the matcher's regex path
+    answer_sets = []
+    for offset in range(max((len(q["options"]) for q in questions), default=0)):
+        answer_sets.append({str(q["id"]): q["options"][offset % len(q["options"])] for q in questions})
+    if questions:
+        answer_sets.append({str(questions[0]["id"]): "I enjoy analyzing data and building things with a team"})
+
+    profiles = []
+    for i, career in enumerate(careers):
+        path = kb.career_skill_map[career]
+        level = levels[i % len(levels)] if levels else "Beginner"
+        templates = kb.project_templates.get(level, [])[:2]
+        profiles.append({
+            "career": career,
+            "level": level,
+            "skills": path["essential"][:4],
+            "projects": [{"name": t["title"], "description": t.get("description", ""),
+                          "technologies": t.get("technologies", [])} for t in templates],
+        })
+
+    return {
+        "assessment": [("/api/ai/assessment/analyze", {"answers": answers}) for answers in answer_sets] + [
+            ("/api/ai/assessment/analyze/batch", {"students": [{"answers": answers} for answers in answer_sets]})
+        ],
+        "portfolio": [
+            ("/api/ai/portfolio/analyze", {"projects": p["projects"], "skills": p["skills"], "achievements": "Won a hackathon"})
+            for p in profiles
+        ],
+        "suggestions": [
+            ("/api/ai/portfolio/suggestions", {"currentSkills": p["skills"], "careerGoal": p["career"], "experienceLevel": p["level"]})
+            for p in profiles
+        ],
+        "skills": [
+            ("/api/ai/skills/recommend", {"currentSkills": p["skills"][:1], "careerGoal": p["career"]})
+            for p in profiles
+        ] + [
+            ("/api/ai/skills/prerequisites", {"skill": skill, "currentSkills": p["skills"][:1]})
+            for p in profiles
+            for skill in kb.career_skill_map[p["career"]]["advanced"][:1]
+        ],
+    }
+
+
+# Warm-up for the API process; SKILLNEX_WARMUP=0 reports ready at once
+warmup = Warmup(enabled=os.environ.get("SKILLNEX_WARMUP", "1") != "0")